@@ -1,30 +1,35 @@
 # path/filename: search_algorithms/a_star.py
 import heapq
-import numpy as np
-from utils.node import Node
-from utils.search_utils import get_successors, find_positions
+from functools import partial
+from itertools import count
+from utils.maze_grid import MazeGrid
+from utils.node_store import NodeStore
+from utils.search_trace import collect_search, EXPAND, PUSH, FOUND, EXHAUSTED
 
 
-def a_star_search(maze):
+def a_star_search(maze, stats=None):
     """
     Performs A* search algorithm to find the shortest path from the start position to the goal position in a given maze.
 
     Parameters:
-    - maze (list of lists): The maze represented as a 2D list, where each element represents a cell in the maze. The maze can contain the following symbols:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze. The maze can contain the following symbols:
         - " ": Empty cell
         - "X": Obstacle cell
         - "S": Start cell
         - "G": Goal cell
+    - stats (SearchStats, optional): If given, collects counters of the search, see `utils.instrumentation`. Defaults to None.
 
     Returns:
     - path (list): A list of tuples representing the coordinates of the cells in the shortest path from the start position to the goal position.
     - num_explored (int): The number of nodes explored during the search process.
-    - steps (list): A list of maze states representing the search process. Each maze state is a 2D list with the same dimensions as the input maze, where each element represents a cell in the maze. The maze states show the progression of the search, with the following symbols:
-        - " ": Empty cell
+    - steps (SearchTrace): A trace of the search process. Indexing it materializes a maze state, a 2D array with the same dimensions as the input maze, where each element represents a cell in the maze. The maze states show the progression of the search, with the following symbols:
+        - ".": Empty cell
         - "X": Obstacle cell
         - "S": Start cell
         - "G": Goal cell
         - "E": Explored cell
+        - "F": Frontier cell
+        - "C": Current cell
         - "P": Path cell
 
     Example:
@@ -40,7 +45,7 @@ def a_star_search(maze):
     [(0, 0), (1, 0), (2, 0), (3, 0), (4, 0), (4, 1), (4, 2), (4, 3), (4, 4)]
     >>> print(num_explored)
     9
-    >>> print(steps)
+    >>> print(list(steps))
     [
         [
             ["S", " ", " ", " ", " "],
@@ -64,53 +69,75 @@ def a_star_search(maze):
     - The cost of a node is the sum of the cost to reach that node from the start position (g-score) and the estimated cost to reach the goal position from that node (h-score).
     - The g-score is the number of steps taken to reach the current node from the start position.
     - The h-score is the Manhattan distance between the current node and the goal position.
+    - The frontier is a lazy-deletion heap: improving the g-score of a cell pushes a new entry, and entries for cells that are already in the closed set are skipped when popped.
+    - Heap entries are single ints packing the f-score, a push counter that breaks ties in first-in first-out order, and the cell. The parent, g-score and action of every cell live in a NodeStore.
     - The search process stops when the goal position is reached or when there are no more nodes to explore.
     - The function returns the shortest path from the start position to the goal position, the number of nodes explored, and the maze states representing the search process.
+    - This is a thin wrapper that records the events of `iter_a_star_search` in a trace.
     """
-    start, goal = find_positions(maze, "S"), find_positions(maze, "G")
-    frontier = []
-    start_node = Node(start)
-    heapq.heappush(
-        frontier, (0, next(Node.id_generator), start_node)
-    )  # Start node with initial cost 0
-    explored = set()
-    g_scores = {start: 0}  # Dictionary to keep track of the lowest cost to reach a node
-    steps = [create_maze_state(maze, explored, start_node, goal)]
+    grid = MazeGrid.from_maze(maze)
+    return collect_search(iter_a_star_search(grid, stats), grid)
+
+
+def iter_a_star_search(maze, stats=None):
+    """
+    Performs A* search on a maze, yielding the events of the search as it runs.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects counters of the search, see `utils.instrumentation`. Defaults to None.
+
+    Yields:
+    - tuple: (kind, payload) events, see `utils.search_trace`. The search stops after a FOUND or EXHAUSTED event, and stopping the iteration earlier stops the search.
+    """
+    grid = MazeGrid.from_maze(maze)
+    stride = grid.stride
+    start, goal = grid.start, grid.goal
+    goal_position = divmod(goal, stride)
+    nodes = NodeStore(grid)
+    nodes.add_root(start)
+    parent, cost = nodes.parent, nodes.cost
+    action, action_codes = nodes.action, nodes.action_codes
+    # Entries are (f << tie_bits | tie) << cell_bits | cell, there are fewer pushes than 4 * cells
+    cell_bits = grid.cells.size.bit_length()
+    tie_bits, cell_mask = cell_bits + 2, (1 << cell_bits) - 1
+    ties = count(1)
+    frontier = [start]  # Start node with initial cost 0
+    push, pop = partial(heapq.heappush, frontier), partial(heapq.heappop, frontier)
+    successors = grid.successors
+    if stats is not None:
+        push, pop, successors = stats.track(push, pop, successors, len(frontier))
+    explored = nodes.closed  # Closed set of expanded cells
+    num_explored = 0
+    yield PUSH, start
 
     while frontier:
-        current_f, _, current_node = heapq.heappop(frontier)
-
-        if current_node.state == goal:
-            # Optional: Record final state for visualization
-            steps.append(create_maze_state(maze, explored, current_node, goal))
-            return [node.state for node in current_node.path()], len(explored), steps
-
-        explored.add(current_node)
-        # Optional: Record current state for visualization
-        steps.append(create_maze_state(maze, explored, current_node, goal))
-
-        for action, state in get_successors(maze, current_node.state):
-            if state not in explored or state not in [
-                node.state for _, _, node in frontier
-            ]:
-                g = (
-                    g_scores[current_node.state] + 1
-                )  # Assuming uniform cost for simplicity
-                h = manhattan_distance(state, goal)
-                f = g + h
-
-                if state not in g_scores or g < g_scores[state]:
-                    g_scores[state] = g
-                    heapq.heappush(
-                        frontier,
-                        (
-                            f,
-                            next(Node.id_generator),
-                            Node(state, current_node, action, g),
-                        ),
-                    )
-
-    return None, len(explored), steps
+        current = pop() & cell_mask
+        if explored[current]:
+            if stats is not None:
+                stats.stale_pops += 1
+            continue  # Stale entry superseded by a cheaper push
+
+        if current == goal:
+            path = [grid.to_state(cell) for cell in nodes.path(current)]
+            yield FOUND, (path, num_explored)
+            return
+
+        explored[current] = 1
+        num_explored += 1
+        yield EXPAND, current
+
+        g = cost[current] + 1  # Assuming uniform cost for simplicity
+        for state in successors(current):
+            if not explored[state] and (not parent[state] or g < cost[state]):
+                parent[state] = current + 1
+                cost[state] = g
+                action[state] = action_codes[state - current]
+                h = manhattan_distance(divmod(state, stride), goal_position)
+                push(((g + h) << tie_bits | next(ties)) << cell_bits | state)
+                yield PUSH, state
+
+    yield EXHAUSTED, num_explored
 
 
 def manhattan_distance(a, b):
@@ -134,33 +161,3 @@ def manhattan_distance(a, b):
     The Manhattan distance is the sum of the absolute differences between the x-coordinates and the y-coordinates of the two points. It represents the minimum number of moves required to reach one point from the other, considering only horizontal and vertical movements.
     """
     return abs(a[0] - b[0]) + abs(a[1] - b[1])
-
-
-def create_maze_state(maze, explored, current_node, goal):
-    """
-    Creates a new maze state by marking the explored nodes, the current node, and the goal position.
-
-    Parameters:
-    - maze (list of lists): The maze represented as a 2D list.
-    - explored (set): A set of tuples representing the positions of the explored nodes.
-    - current_node (Node or tuple): The current node or position.
-    - goal (tuple): The goal position.
-
-    Returns:
-    - maze_state (numpy array): The updated maze state with the explored nodes, current node, and goal marked.
-
-    Notes:
-    - The function modifies the original maze state by marking the explored nodes as "E", the current node as "C", and the goal position as "G".
-    - The function returns the updated maze state as a numpy array.
-
-    """
-    maze_state = np.array(
-        maze, dtype="object"
-    )  # Copy the maze to avoid altering the original
-    for node in explored:
-        maze_state[node.state] = "E"  # Mark explored nodes
-    path = [node.state for node in current_node.path()]
-    for state in path:
-        maze_state[state] = "P"  # Mark path nodes
-    maze_state[goal] = "G"  # Ensure the goal is always marked
-    return maze_state
@@ -0,0 +1,165 @@
+import os
+from collections import deque
+from itertools import islice
+import numpy as np
+from utils.maze_grid import MazeGrid, WALL
+from utils.search_trace import collect_search
+from algorithms.a_star import iter_a_star_search
+from algorithms.bfs_wavefront import grid_distance_field
+from algorithms.distance_cache import descend
+
+# Queries sharing a goal or a start are answered from one distance field when there are at least this many
+MIN_GROUP_SIZE = 2
+
+# Number of remaining queries sent to a worker process at a time
+QUERY_CHUNK_SIZE = 64
+
+# The grid of the maze in a worker process, set once by `_init_worker`
+_WORKER_GRID = None
+
+
+def solve_queries(maze, starts, goals, return_paths=False, workers=1):
+    """
+    Finds the shortest path lengths, and optionally the paths, of many (start, goal) pairs on the same maze.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze. Its own start and goal are ignored.
+    - starts (array-like): An (n, 2) array of (x, y) start positions.
+    - goals (array-like): An (n, 2) array of (x, y) goal positions.
+    - return_paths (bool, optional): Whether to also return the paths. Defaults to False.
+    - workers (int, optional): The number of worker processes for the queries that are not answered from a distance field. With 1 (the default) everything runs in the current process, with None one worker per CPU is used.
+
+    Returns:
+    - lengths (numpy array): An int64 array with the number of steps of the shortest path of every query, or -1 if its goal cannot be reached from its start.
+    - paths (list): Only returned if `return_paths` is True. The path of every query as a list of (x, y) positions, or None if its goal cannot be reached.
+
+    Notes:
+    - The maze is encoded and its neighbor table is built once for all the queries. No grid is built per query, since each query only replaces the start and goal of the shared grid.
+    - Queries are answered in three passes. First, the queries that share a goal with at least MIN_GROUP_SIZE - 1 others are answered from one distance field of that goal, computed by a vectorized breadth-first search, and their paths come from descending the field. Next, the remaining queries that share a start are answered the same way from the start. Finally, the remaining queries run `a_star_search`, fanned out over a process pool when there are several workers.
+    - Queries whose start or goal is a wall cannot be reached and get -1 without a search.
+
+    Raises:
+    - ValueError: If a start or goal is outside the maze.
+
+    Example usage:
+    lengths, paths = solve_queries(maze, [(0, 0), (3, 4)], [(9, 9), (9, 9)], return_paths=True)
+    """
+    grid = MazeGrid.from_maze(maze)
+    starts = np.asarray(starts, dtype=np.int64).reshape(-1, 2)
+    goals = np.asarray(goals, dtype=np.int64).reshape(-1, 2)
+    for name, positions in (("start", starts), ("goal", goals)):
+        outside = np.flatnonzero(
+            ((positions < 0) | (positions >= grid.shape)).any(axis=1)
+        )
+        if outside.size:
+            query = int(outside[0])
+            raise ValueError(
+                f"{name} {tuple(positions[query].tolist())} of query {query} "
+                f"is outside the {grid.shape[0]}x{grid.shape[1]} maze"
+            )
+    start_cells = (starts[:, 0] + 1) * grid.stride + starts[:, 1] + 1
+    goal_cells = (goals[:, 0] + 1) * grid.stride + goals[:, 1] + 1
+    lengths = np.full(start_cells.size, -1, dtype=np.int64)
+    paths = [None] * start_cells.size if return_paths else None
+
+    walled = (grid.cells[start_cells] == WALL) | (grid.cells[goal_cells] == WALL)
+    remaining = np.flatnonzero(~walled)
+    remaining = _solve_groups(grid, goal_cells, start_cells, remaining, lengths, paths)
+    remaining = _solve_groups(
+        grid, start_cells, goal_cells, remaining, lengths, paths, reverse=True
+    )
+
+    pairs = [
+        (query, int(start_cells[query]), int(goal_cells[query]))
+        for query in remaining.tolist()
+    ]
+    if workers == 1 or len(pairs) <= QUERY_CHUNK_SIZE:
+        grid.successors  # Build the neighbor table once, before it is shared by the queries
+        results = (_solve_pair(grid, pair) for pair in pairs)
+    else:
+        results = _solve_pairs_in_pool(grid, pairs, workers or os.cpu_count())
+    for query, path in results:
+        if path is not None:
+            lengths[query] = len(path) - 1
+            if return_paths:
+                paths[query] = path
+
+    if return_paths:
+        return lengths, paths
+    return lengths
+
+
+def _solve_groups(grid, roots, others, queries, lengths, paths, reverse=False):
+    """
+    Answers the queries that share a root cell with at least MIN_GROUP_SIZE - 1 others from one distance field per root, and returns the other queries.
+
+    The paths of a field run from the other cell to the root, so they are reversed when the roots are the starts.
+    """
+    if not queries.size:
+        return queries
+    shared, inverse, counts = np.unique(
+        roots[queries], return_inverse=True, return_counts=True
+    )
+    # The queries of every group are contiguous
+    order = np.argsort(inverse, kind="stable")
+    ends = np.cumsum(counts)
+    for group in np.flatnonzero(counts >= MIN_GROUP_SIZE).tolist():
+        members = queries[order[ends[group] - counts[group] : ends[group]]]
+        field = grid_distance_field(grid, int(shared[group]))
+        lengths[members] = field[others[members]]
+        if paths is not None:
+            for query in members.tolist():
+                cells = descend(grid, field, int(others[query]))
+                if cells is not None:
+                    if reverse:
+                        cells.reverse()
+                    paths[query] = [grid.to_state(cell) for cell in cells]
+    return queries[counts[inverse] < MIN_GROUP_SIZE]
+
+
+def _solve_pair(grid, pair):
+    """
+    Runs A* for one query on the shared grid and returns the query index and the path, or None.
+    """
+    query, start, goal = pair
+    path, _, _ = collect_search(iter_a_star_search(grid.with_endpoints(start, goal)))
+    return query, path
+
+
+def _solve_pairs_in_pool(grid, pairs, workers):
+    """
+    Runs the queries on a process pool in chunks and yields their results, with at most two chunks per worker in flight.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    cells = grid.cells.reshape(-1, grid.stride)
+    pairs = iter(pairs)
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(cells,)
+    ) as executor:
+        pending = deque()
+        while True:
+            while len(pending) < 2 * workers:
+                chunk = list(islice(pairs, QUERY_CHUNK_SIZE))
+                if not chunk:
+                    break
+                pending.append(executor.submit(_solve_chunk, chunk))
+            if not pending:
+                break
+            yield from pending.popleft().result()
+
+
+def _init_worker(cells):
+    """
+    Builds the grid of the maze and its neighbor table once in a worker process.
+    """
+    global _WORKER_GRID
+    _WORKER_GRID = MazeGrid(cells, padded=True)
+    _WORKER_GRID.successors
+
+
+def _solve_chunk(pairs):
+    """
+    Runs a chunk of queries in a worker process and returns their results.
+    """
+    return [_solve_pair(_WORKER_GRID, pair) for pair in pairs]
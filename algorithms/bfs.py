@@ -1,85 +1,75 @@
 from collections import deque
-import numpy as np
-from utils.node import Node
-from utils.search_utils import get_successors, find_positions
+from utils.maze_grid import MazeGrid
+from utils.node_store import NodeStore
+from utils.search_trace import collect_search, EXPAND, PUSH, FOUND, EXHAUSTED
 
 
-def bfs_search(maze):
+def bfs_search(maze, stats=None):
     """
-    Creates a new maze state by marking the explored nodes, the current node, and the goal position.
+    Performs a breadth-first search (BFS) on a maze to find the shortest path from the start position to the goal position.
 
     Parameters:
-    - maze (list of lists): The maze represented as a 2D list.
-    - explored (set): A set of tuples representing the positions of the explored nodes.
-    - current_node (Node or tuple): The current node or position.
-    - goal (tuple): The goal position.
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects counters of the search, see `utils.instrumentation`. Defaults to None.
 
     Returns:
-    - maze_state (numpy array): The updated maze state with the explored nodes, current node, and goal marked.
+    - path (list): A list of tuples representing the sequence of positions from the start to the goal.
+    - num_explored (int): The number of nodes explored during the search.
+    - steps (SearchTrace): A trace of the search process that materializes a maze state for each step on demand.
 
     Notes:
-    - The function modifies the original maze state by marking the explored nodes as "E", the current node as "C", and the goal position as "G".
-    - The function returns the updated maze state as a numpy array.
-
+    - The start position in the maze should be marked as "S" and the goal position should be marked as "G".
+    - The search algorithm uses a queue (FIFO) to keep track of the frontier of nodes to explore.
+    - Cells are marked as reached when they are enqueued, so every cell enters the queue at most once. The parent of every reached cell is kept in a NodeStore, whose parent array doubles as the reached set.
+    - Each expansion and each push onto the frontier is recorded as a single event in the trace instead of a full copy of the maze.
+    - This is a thin wrapper that records the events of `iter_bfs_search` in a trace.
     """
-    start, goal = find_positions(maze, "S"), find_positions(maze, "G")
-    frontier = deque([Node(start)])
-    explored = set()
-    start_node = Node(start)  # Create a Node object for the start position
-    steps = [create_maze_state(maze, explored, start_node, None)]  # Use start_node here
-
-    while frontier:
-        current_node = frontier.popleft()
-        if current_node.state == goal:
-            steps.append(
-                create_maze_state(maze, explored, goal, goal)
-            )  # Final visualization step
-            return [node.state for node in current_node.path()], len(explored), steps
-
-        explored.add(current_node.state)
-        steps.append(
-            create_maze_state(maze, explored, current_node.state, goal)
-        )  # Visualization at current step
-
-        for action, next_state in get_successors(maze, current_node.state):
-            if (
-                next_state not in explored
-                and maze[next_state] != "X"
-                and all(next_state != node.state for node in frontier)
-            ):
-                child = Node(next_state, current_node, action)
-                frontier.append(child)
-
-    return None, len(explored), steps
+    grid = MazeGrid.from_maze(maze)
+    return collect_search(iter_bfs_search(grid, stats), grid)
 
 
-def create_maze_state(maze, explored, current_node, goal):
+def iter_bfs_search(maze, stats=None):
     """
-    Creates a new maze state by marking the explored nodes, the current node, and the goal position.
+    Performs a breadth-first search (BFS) on a maze, yielding the events of the search as it runs.
 
     Parameters:
-    - maze (list of lists): The maze represented as a 2D list.
-    - explored (set): A set of tuples representing the positions of the explored nodes.
-    - current_node (Node or tuple): The current node or position.
-    - goal (tuple): The goal position.
-
-    Returns:
-    - maze_state (numpy array): The updated maze state with the explored nodes, current node, and goal marked.
-
-    Notes:
-    - The function modifies the original maze state by marking the explored nodes as "E", the current node as "C", and the goal position as "G".
-    - The function returns the updated maze state as a numpy array.
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects counters of the search, see `utils.instrumentation`. Defaults to None.
 
+    Yields:
+    - tuple: (kind, payload) events, see `utils.search_trace`. The search stops after a FOUND or EXHAUSTED event, and stopping the iteration earlier stops the search.
     """
-    maze_state = np.array(maze, dtype="object")
-    for state in explored:
-        maze_state[state] = "E"  # Mark explored nodes
-    if current_node:
-        # Check if current_node is a Node object or a tuple and act accordingly
-        current_pos = (
-            current_node.state if isinstance(current_node, Node) else current_node
-        )
-        maze_state[current_pos] = "C"  # Mark the current node
-    if goal:
-        maze_state[goal] = "G"  # Ensure the goal is always marked
-    return maze_state
+    grid = MazeGrid.from_maze(maze)
+    start, goal = grid.start, grid.goal
+    nodes = NodeStore(grid)
+    nodes.add_root(start)
+    parent, action, action_codes = nodes.parent, nodes.action, nodes.action_codes
+    frontier = deque([start])
+    push, pop, successors = (
+        frontier.append,
+        frontier.popleft,
+        grid.successors,
+    )
+    if stats is not None:
+        push, pop, successors = stats.track(push, pop, successors, len(frontier))
+    num_explored = 0
+    yield PUSH, start
+
+    while frontier:
+        current = pop()
+        if current == goal:
+            path = [grid.to_state(cell) for cell in nodes.path(current)]
+            yield FOUND, (path, num_explored)
+            return
+
+        num_explored += 1
+        yield EXPAND, current
+
+        for next_state in successors(current):
+            if not parent[next_state]:  # Not reached yet
+                parent[next_state] = current + 1
+                action[next_state] = action_codes[next_state - current]
+                push(next_state)
+                yield PUSH, next_state
+
+    yield EXHAUSTED, num_explored
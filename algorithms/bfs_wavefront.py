@@ -0,0 +1,207 @@
+import time
+import numpy as np
+from utils.maze_grid import MazeGrid, WALL
+from utils.search_trace import collect_search, EXPAND, PUSH, BATCH, FOUND, EXHAUSTED
+
+
+def wavefront_bfs_search(maze, return_distances=False, stats=None):
+    """
+    Performs a level-synchronous breadth-first search that expands a whole BFS level at once with NumPy.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - return_distances (bool, optional): Whether to also return the distance field of the start cell. Defaults to False.
+    - stats (SearchStats, optional): If given, collects counters of the search, see `utils.instrumentation`. The frontier is counted a level at a time, and the successor time is the time spent computing the levels. Defaults to None.
+
+    Returns:
+    - path (list): A list of tuples representing the sequence of positions from the start to the goal.
+    - num_explored (int): The number of nodes explored during the search.
+    - steps (SearchTrace): A trace of the search process that materializes a maze state for each step on demand.
+    - distances (numpy array): Only returned if `return_distances` is True. A 2D int32 array with the number of steps from the start to every cell, or -1 for cells that cannot be reached.
+
+    Notes:
+    - The path, the number of nodes explored and the trace are identical to those of `bfs_search`: within a level, cells are ordered by the queue position of the parent that first reaches them and then by direction, which is exactly the order in which the FIFO queue of `bfs_search` holds them.
+    - The frontier of each level is kept as an array of flat cell indices, so a level costs time proportional to its size rather than to the size of the maze.
+    - When `return_distances` is True the search keeps going after the goal is found, so that the distance field covers every reachable cell.
+    - This is a thin wrapper that records the events of `iter_wavefront_bfs_search` in a trace.
+    """
+    grid = MazeGrid.from_maze(maze)
+    distances = (
+        np.full(grid.cells.size, -1, dtype=np.int32) if return_distances else None
+    )
+    events = iter_wavefront_bfs_search(grid, stats, distances)
+    path, num_explored, steps = collect_search(events, grid)
+    if return_distances:
+        for _ in events:
+            pass  # Let the search fill in the rest of the distance field
+        return path, num_explored, steps, _crop(grid, distances)
+    return path, num_explored, steps
+
+
+def iter_wavefront_bfs_search(maze, stats=None, distances=None):
+    """
+    Performs a level-synchronous breadth-first search, yielding the events of each level as one batch.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects counters of the search, see `utils.instrumentation`. Defaults to None.
+    - distances (numpy array, optional): A flat int32 array with one entry per cell of the grid of the maze, initialized to -1. If given, the distance from the start is written to it for every cell reached. Defaults to None.
+
+    Yields:
+    - tuple: (kind, payload) events, see `utils.search_trace`. The expansions of a level and the pushes made by them come as a single BATCH event, in the order of `iter_bfs_search`. The search stops after a FOUND or EXHAUSTED event, and stopping the iteration earlier stops the search. If `distances` is given, resuming the iteration after FOUND fills in the rest of the distance field without yielding further events.
+    """
+    grid = MazeGrid.from_maze(maze)
+    start, goal = grid.start, grid.goal
+    yield PUSH, start
+    parents = np.zeros(grid.cells.size, dtype=np.int64)
+    found_goal, num_explored = False, 0
+
+    for level, frontier, children, parent_ranks in _bfs_levels(grid, start, stats):
+        if distances is not None:
+            distances[frontier] = level
+        if found_goal:
+            continue  # Only filling in the distance field
+
+        found = np.flatnonzero(frontier == goal)
+        if found.size:
+            # The queue reaches the goal before expanding the rest of this level
+            rank = int(found[0])
+            keep = parent_ranks < rank
+            frontier, children, parent_ranks = (
+                frontier[:rank],
+                children[keep],
+                parent_ranks[keep],
+            )
+
+        yield BATCH, _level_events(frontier, children, parent_ranks)
+        parents[children] = frontier[parent_ranks]
+        num_explored += frontier.size
+
+        if found.size:
+            found_goal = True
+            yield FOUND, (_reconstruct_path(grid, parents, goal), num_explored)
+            if distances is None:
+                return
+
+    if not found_goal:
+        yield EXHAUSTED, num_explored
+
+
+def bfs_distance_field(maze, source=None):
+    """
+    Computes the number of steps from a source cell to every cell of a maze.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - source (tuple, optional): The (x, y) position to measure distances from. Defaults to the start position "S".
+
+    Returns:
+    - distances (numpy array): A 2D int32 array with the same shape as the maze, holding the distance from the source to every cell, or -1 for cells that cannot be reached.
+
+    Example:
+    >>> maze = [
+    ...     ["S", " ", "X"],
+    ...     ["X", " ", "G"],
+    ... ]
+    >>> bfs_distance_field(maze)
+    array([[ 0,  1, -1],
+           [-1,  2,  3]], dtype=int32)
+    """
+    grid = MazeGrid.from_maze(maze)
+    source = grid.start if source is None else grid.to_cell(source)
+    return _crop(grid, grid_distance_field(grid, source))
+
+
+def grid_distance_field(grid, source, stats=None):
+    """
+    Computes the number of steps from a source cell to every cell of a grid, indexed by flat cell index.
+
+    Parameters:
+    - grid (MazeGrid): The grid to measure distances on.
+    - source (int): The flat index of the cell to measure distances from.
+    - stats (SearchStats, optional): If given, collects counters of the search. Defaults to None.
+
+    Returns:
+    - distances (numpy array): A flat int32 array with one entry per cell of the padded grid, holding the distance from the source, or -1 for walls, border cells and cells that cannot be reached.
+    """
+    distances = np.full(grid.cells.size, -1, dtype=np.int32)
+    for level, frontier, _, _ in _bfs_levels(grid, source, stats):
+        distances[frontier] = level
+    return distances
+
+
+def _bfs_levels(grid, source, stats=None):
+    """
+    Yields the BFS levels of a grid as (level, frontier, children, parent_ranks).
+
+    `frontier` holds the cells of the level in queue order, `children` the cells of the next level
+    in queue order and `parent_ranks` the position in `frontier` of the parent of each child.
+    If `stats` is given, each level is counted in it once computed.
+    """
+    offsets = np.array(grid.offsets, dtype=np.int64)
+    reached = grid.cells == WALL  # Walls can never be reached
+    reached[source] = True
+    frontier = np.array([source], dtype=np.int64)
+    level = 0
+    if stats is not None:
+        stats.frontier_size += 1  # The source
+        stats.max_frontier = max(stats.max_frontier, stats.frontier_size)
+    while frontier.size:
+        started = time.perf_counter() if stats is not None else 0.0
+        # Candidates in row-major order are sorted by (parent rank, direction)
+        candidates = (frontier[:, None] + offsets).ravel()
+        order = np.flatnonzero(~reached[candidates])
+        # Keep only the first parent to reach each cell, as the FIFO queue would
+        _, first = np.unique(candidates[order], return_index=True)
+        order = order[np.sort(first)]
+        children = candidates[order]
+        reached[children] = True
+        if stats is not None:
+            stats.count(
+                pushes=children.size,
+                pops=frontier.size,
+                generated=int(np.count_nonzero(grid.cells[candidates] != WALL)),
+                seconds=time.perf_counter() - started,
+            )
+        yield level, frontier, children, order // offsets.size
+        frontier = children
+        level += 1
+
+
+def _level_events(frontier, children, parent_ranks):
+    """
+    Returns the kinds and cells of the expansions of a level and the pushes made by them, in queue order.
+    """
+    counts = np.bincount(parent_ranks, minlength=frontier.size)
+    before = np.cumsum(counts) - counts  # Children pushed by earlier parents
+    expand_positions = np.arange(frontier.size) + before
+    push_positions = (
+        expand_positions[parent_ranks]
+        + 1
+        + np.arange(children.size)
+        - before[parent_ranks]
+    )
+    kinds = np.full(frontier.size + children.size, PUSH, dtype=np.int8)
+    kinds[expand_positions] = EXPAND
+    cells = np.empty(kinds.size, dtype=np.int64)
+    cells[expand_positions] = frontier
+    cells[push_positions] = children
+    return kinds, cells
+
+
+def _reconstruct_path(grid, parents, goal):
+    """
+    Follows the parent pointers from the goal back to the start.
+    """
+    path, cell = [goal], goal
+    while cell != grid.start:
+        cell = int(parents[cell])
+        path.append(cell)
+    return [grid.to_state(cell) for cell in reversed(path)]
+
+
+def _crop(grid, values):
+    """
+    Reshapes a flat per-cell array of a grid to the maze shape, dropping the border.
+    """
+    return values.reshape(-1, grid.stride)[1:-1, 1:-1]
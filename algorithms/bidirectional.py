@@ -0,0 +1,223 @@
+import heapq
+from functools import partial
+from itertools import count
+from utils.maze_grid import MazeGrid
+from utils.search_trace import collect_search, EXPAND, PUSH, FOUND, EXHAUSTED
+from algorithms.a_star import manhattan_distance
+
+
+def bidirectional_bfs_search(maze, stats=None):
+    """
+    Performs a breadth-first search from the start and from the goal at the same time until the two searches meet.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects counters of both searches together, see `utils.instrumentation`. Defaults to None.
+
+    Returns:
+    - path (list): A list of tuples representing the shortest sequence of positions from the start to the goal.
+    - num_explored (int): The number of nodes explored by both searches together.
+    - steps (SearchTrace): A trace of the search process that materializes a maze state for each step on demand.
+
+    Notes:
+    - Each iteration expands one whole BFS level of the side with the smaller frontier.
+    - The searches stop after the first level that reaches a cell already reached by the other side. Cells reached in that level can meet the other side at different depths, so the meeting cell with the smallest total depth is used, which makes the path a shortest path.
+    - The path is reconstructed from the depth maps of both sides by stepping to a neighbor one level closer to the start or the goal.
+    - This is a thin wrapper that records the events of `iter_bidirectional_bfs_search` in a trace.
+    """
+    grid = MazeGrid.from_maze(maze)
+    return collect_search(iter_bidirectional_bfs_search(grid, stats), grid)
+
+
+def iter_bidirectional_bfs_search(maze, stats=None):
+    """
+    Performs a breadth-first search from the start and from the goal at the same time, yielding the events of the search as it runs.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects counters of both searches together, see `utils.instrumentation`. Defaults to None.
+
+    Yields:
+    - tuple: (kind, payload) events, see `utils.search_trace`. Both sides expand and push cells. The search stops after a FOUND or EXHAUSTED event, and stopping the iteration earlier stops the search.
+    """
+    grid = MazeGrid.from_maze(maze)
+    start, goal = grid.start, grid.goal
+    yield PUSH, start
+    yield PUSH, goal
+    if start == goal:
+        yield FOUND, ([grid.to_state(start)], 0)
+        return
+
+    depths = ({start: 0}, {goal: 0})  # Forward and backward depth maps
+    frontiers = ([start], [goal])
+    num_explored = 0
+    successors = grid.successors
+    if stats is not None:
+        _, _, successors = stats.track(None, None, successors, 2)
+
+    while frontiers[0] and frontiers[1]:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        depth, other = depths[side], depths[1 - side]
+        next_frontier, meetings = [], []
+        for cell in frontiers[side]:
+            num_explored += 1
+            yield EXPAND, cell
+            next_depth = depth[cell] + 1
+            for neighbor in successors(cell):
+                if neighbor not in depth:
+                    depth[neighbor] = next_depth
+                    next_frontier.append(neighbor)
+                    yield PUSH, neighbor
+                    if neighbor in other:
+                        meetings.append(neighbor)
+        if stats is not None:
+            # Levels are processed as a whole, so the frontier is counted per level
+            stats.count(pushes=len(next_frontier), pops=len(frontiers[side]))
+
+        if meetings:
+            meet = min(meetings, key=lambda cell: depths[0][cell] + depths[1][cell])
+            yield FOUND, (_join_paths(grid, depths, meet), num_explored)
+            return
+        frontiers = (
+            (next_frontier, frontiers[1])
+            if side == 0
+            else (frontiers[0], next_frontier)
+        )
+
+    yield EXHAUSTED, num_explored
+
+
+def bidirectional_a_star_search(maze, stats=None):
+    """
+    Performs an A* search from the start and from the goal at the same time until the best meeting point is proven optimal.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects counters of both searches together, see `utils.instrumentation`. Defaults to None.
+
+    Returns:
+    - path (list): A list of tuples representing the shortest sequence of positions from the start to the goal.
+    - num_explored (int): The number of nodes explored by both searches together.
+    - steps (SearchTrace): A trace of the search process that materializes a maze state for each step on demand.
+
+    Notes:
+    - Both searches use the balanced potential p(n) = (h_goal(n) - h_start(n)) / 2, where h_goal and h_start are the Manhattan distances to the goal and to the start, and the backward search uses -p(n). With these potentials both searches see the same nonnegative reduced edge costs, so they behave like a bidirectional Dijkstra search on the reduced graph.
+    - Each iteration expands the top node of the side whose smallest key is smaller, which keeps the two searches at the same reduced distance. Among nodes with the same key, the node with the larger g-score is expanded first, so that on open ground each search runs straight along its plateau of equal keys instead of widening it.
+    - Whenever a search relaxes a cell that the other search has already reached, the cost of the path through that cell becomes a candidate for the best path cost (mu).
+    - The search stops once the smallest keys of the two frontiers add up to at least mu, at which point no path through an unexpanded node can be shorter than mu. Keys are doubled to keep them integral.
+    - Both frontiers are lazy-deletion heaps, entries for cells that are already closed are discarded when they reach the top.
+    - The balanced potential is a weaker estimate than the Manhattan distance used by `a_star_search`. The search pays off on open or sparse mazes, where both searches dive straight at each other and expand a small fraction of the cells A* expands. On dense mazes, where the shortest path is dominated by detours, it expands about as many cells as A*, sometimes more.
+    - This is a thin wrapper that records the events of `iter_bidirectional_a_star_search` in a trace.
+    """
+    grid = MazeGrid.from_maze(maze)
+    return collect_search(iter_bidirectional_a_star_search(grid, stats), grid)
+
+
+def iter_bidirectional_a_star_search(maze, stats=None):
+    """
+    Performs an A* search from the start and from the goal at the same time, yielding the events of the search as it runs.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects counters of both searches together, see `utils.instrumentation`. Defaults to None.
+
+    Yields:
+    - tuple: (kind, payload) events, see `utils.search_trace`. Both sides expand and push cells. The search stops after a FOUND or EXHAUSTED event, and stopping the iteration earlier stops the search.
+    """
+    grid = MazeGrid.from_maze(maze)
+    stride = grid.stride
+    start, goal = grid.start, grid.goal
+    start_position, goal_position = divmod(start, stride), divmod(goal, stride)
+
+    def potential(cell, side):
+        # Twice the balanced potential, kept integral
+        position = divmod(cell, stride)
+        difference = manhattan_distance(position, goal_position) - manhattan_distance(
+            position, start_position
+        )
+        return difference if side == 0 else -difference
+
+    tie_breaker = count()
+    g_scores = ({start: 0}, {goal: 0})
+    parents = ({start: None}, {goal: None})
+    closed = (set(), set())
+    frontiers = (
+        [(potential(start, 0), 0, next(tie_breaker), start)],
+        [(potential(goal, 1), 0, next(tie_breaker), goal)],
+    )
+    pushes = [partial(heapq.heappush, frontier) for frontier in frontiers]
+    pops = [partial(heapq.heappop, frontier) for frontier in frontiers]
+    successors = neighbors = grid.successors
+    if stats is not None:
+        for side in (0, 1):
+            pushes[side], pops[side], successors = stats.track(
+                pushes[side], pops[side], neighbors, 1
+            )
+    yield PUSH, start
+    yield PUSH, goal
+    best_cost, meet = (0, start) if start == goal else (float("inf"), None)
+
+    while True:
+        for side in (0, 1):
+            # Discard stale entries so the heap tops are true key minimums
+            while frontiers[side] and frontiers[side][0][3] in closed[side]:
+                pops[side]()
+                if stats is not None:
+                    stats.stale_pops += 1
+        if not frontiers[0] or not frontiers[1]:
+            break
+        if frontiers[0][0][0] + frontiers[1][0][0] >= 2 * best_cost:
+            break
+
+        side = 0 if frontiers[0][0] <= frontiers[1][0] else 1  # Smaller top entry
+        g_side, g_other = g_scores[side], g_scores[1 - side]
+        _, _, _, current = pops[side]()
+        closed[side].add(current)
+        yield EXPAND, current
+
+        g = g_side[current] + 1
+        for neighbor in successors(current):
+            if neighbor not in closed[side] and g < g_side.get(neighbor, g + 1):
+                g_side[neighbor] = g
+                parents[side][neighbor] = current
+                key = 2 * g + potential(neighbor, side)
+                pushes[side]((key, -g, next(tie_breaker), neighbor))  # Deeper first
+                yield PUSH, neighbor
+                if neighbor in g_other and g + g_other[neighbor] < best_cost:
+                    best_cost, meet = g + g_other[neighbor], neighbor
+
+    num_explored = len(closed[0]) + len(closed[1])
+    if meet is None:
+        yield EXHAUSTED, num_explored
+        return
+
+    forward, backward = [], []
+    cell = meet
+    while cell is not None:
+        forward.append(cell)
+        cell = parents[0][cell]
+    cell = parents[1][meet]
+    while cell is not None:
+        backward.append(cell)
+        cell = parents[1][cell]
+    path = [grid.to_state(cell) for cell in forward[::-1] + backward]
+    yield FOUND, (path, num_explored)
+
+
+def _join_paths(grid, depths, meet):
+    """
+    Builds the path through a meeting cell by descending the forward and backward depth maps.
+    """
+    halves = []
+    for depth in depths:
+        half, cell = [meet], meet
+        while depth[cell]:
+            cell = next(
+                neighbor
+                for neighbor in grid.successors(cell)
+                if depth.get(neighbor) == depth[cell] - 1
+            )
+            half.append(cell)
+        halves.append(half)
+    forward, backward = halves
+    return [grid.to_state(cell) for cell in forward[::-1] + backward[1:]]
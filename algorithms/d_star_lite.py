@@ -0,0 +1,301 @@
+import heapq
+from functools import partial
+import numpy as np
+from utils.maze_grid import MazeGrid, OPEN, WALL, START, GOAL
+from utils.search_trace import collect_search, EXPAND, PUSH, FOUND, EXHAUSTED
+from algorithms.a_star import manhattan_distance
+
+# Cost of the cells that cannot reach the goal
+INF = 2**31 - 1
+
+
+class IncrementalPlanner:
+    """
+    A D* Lite planner that keeps its search between queries and only repairs what changes in the maze invalidate.
+
+    Attributes:
+        grid (MazeGrid): The planner's own copy of the maze, with the current walls, start and goal.
+        num_explored (int): The number of cells expanded by the last replanning.
+
+    The planner searches backwards from the goal. Every cell has a g-value, the number of steps to the goal
+    found so far, and an rhs-value, the lookahead 1 + the smallest g-value of its open neighbors. A cell is
+    consistent when both are equal, and only inconsistent cells are in the priority queue, ordered by
+    min(g, rhs) plus the Manhattan distance to the start. `replan` expands cells until the start is
+    consistent and no queued cell can shorten its path, which for the first call is a backward A* search.
+
+    `update_cells` only recomputes the rhs-values of the changed cells and of their neighbors, so the next
+    `replan` only expands the cells whose distance to the goal changed and that could matter for the start.
+    `move_start` moves the start along the path without discarding the search: the keys in the queue are
+    kept valid by adding the distance the start moved to the keys of later insertions.
+    """
+
+    def __init__(self, maze, start=None, goal=None):
+        """
+        Initializes a planner for a maze. No search runs before the first `replan`.
+
+        Args:
+            maze (MazeGrid or list of lists): The maze to plan on. The planner works on a copy, so the maze itself is never changed.
+            start (tuple, optional): The (x, y) start position. Defaults to the start position "S".
+            goal (tuple, optional): The (x, y) goal position. Defaults to the goal position "G".
+        """
+        grid = MazeGrid.from_maze(maze)
+        start = grid.start if start is None else grid.to_cell(start)
+        goal = grid.goal if goal is None else grid.to_cell(goal)
+        cells = grid.cells.reshape(-1, grid.stride).copy()
+        self.grid = MazeGrid(cells, padded=True, start=start, goal=goal)
+        if (start, goal) != (grid.start, grid.goal):
+            self.grid.update(
+                [c for c in (grid.start, grid.goal) if c is not None], OPEN
+            )
+            self.grid.update([start, goal], [START, GOAL])
+        self.num_explored = 0
+        self._cells = memoryview(self.grid.cells)
+        self._g = memoryview(np.full(cells.size, INF, dtype=np.int32))
+        self._rhs = memoryview(np.full(cells.size, INF, dtype=np.int32))
+        # Entries are (key, cell), entries whose key is not in _keys are stale
+        self._frontier = []
+        self._keys = {}  # Key of every queued cell
+        # The km term of D* Lite, the distance moved by the start so far
+        self._offset = 0
+        self._rhs[goal] = 0
+        self._queue(goal, partial(heapq.heappush, self._frontier))
+
+    @property
+    def start(self):
+        """
+        Returns the current start position.
+
+        Returns:
+            tuple: The (x, y) start position.
+        """
+        return self.grid.to_state(self.grid.start)
+
+    @property
+    def goal(self):
+        """
+        Returns the goal position.
+
+        Returns:
+            tuple: The (x, y) goal position.
+        """
+        return self.grid.to_state(self.grid.goal)
+
+    def update_cells(self, changes):
+        """
+        Adds or removes walls, and marks the cells whose distance to the goal may have changed.
+
+        Args:
+            changes (dict or iterable): The changed cells, as a dict or as (position, blocked) pairs, where position is an (x, y) position and blocked is True for a wall and False for an open cell.
+
+        Raises:
+            ValueError: If a change would put a wall on the start or the goal.
+
+        The plan is only repaired by the next `replan`, so several batches of changes can be made in between.
+        """
+        grid, cells = self.grid, self._cells
+        items = changes.items() if hasattr(changes, "items") else changes
+        changed, markings = [], []
+        for position, blocked in items:
+            cell = grid.to_cell(position)
+            marking = WALL if blocked else OPEN
+            if blocked and cell in (grid.start, grid.goal):
+                raise ValueError(f"cannot put a wall on the start or goal {position}")
+            if cells[cell] != marking and cells[cell] in (OPEN, WALL):
+                changed.append(cell)
+                markings.append(marking)
+        if not changed:
+            return
+
+        grid.update(changed, markings)
+        push = partial(heapq.heappush, self._frontier)
+        for cell in changed:
+            self._update(cell, push)
+            for neighbor in self._neighbors(cell):
+                self._update(neighbor, push)
+
+    def move_start(self, position):
+        """
+        Moves the start, e.g. after following the first steps of the path, keeping the search for the next `replan`.
+
+        Args:
+            position (tuple): The new (x, y) start position.
+
+        Raises:
+            ValueError: If the position is a wall.
+        """
+        grid = self.grid
+        cell = grid.to_cell(position)
+        if self._cells[cell] == WALL:
+            raise ValueError(f"cannot move the start onto the wall {position}")
+        stride = grid.stride
+        self._offset += manhattan_distance(
+            divmod(grid.start, stride), divmod(cell, stride)
+        )
+        if cell != grid.goal:
+            grid.update([grid.start, cell], [OPEN, START])
+        else:
+            grid.update([grid.start], [OPEN])
+        grid.start = cell
+
+    def replan(self, stats=None):
+        """
+        Repairs the plan after the changes made since the last replanning and returns the path from the start to the goal.
+
+        Args:
+            stats (SearchStats, optional): If given, collects counters of the replanning, see `utils.instrumentation`. Defaults to None.
+
+        Returns:
+            tuple: The path as a list of (x, y) positions (or None if the goal cannot be reached) and the number of cells expanded.
+        """
+        path, num_explored, _ = collect_search(self.iter_replan(stats))
+        return path, num_explored
+
+    def iter_replan(self, stats=None):
+        """
+        Repairs the plan after the changes made since the last replanning, yielding the events of the search.
+
+        Args:
+            stats (SearchStats, optional): If given, collects counters of the replanning, see `utils.instrumentation`. Defaults to None.
+
+        Yields:
+            tuple: (kind, payload) events, see `utils.search_trace`. Every expansion is yielded, including those that make a cell unreachable. The last event is FOUND or EXHAUSTED. Stopping the iteration earlier leaves the plan to be finished by the next replanning.
+        """
+        g, rhs, keys = self._g, self._rhs, self._keys
+        frontier, start = self._frontier, self.grid.start
+        push = partial(heapq.heappush, frontier)
+        pop = partial(heapq.heappop, frontier)
+        successors = self._neighbors
+        if stats is not None:
+            push, pop, successors = stats.track(push, pop, successors, len(frontier))
+        num_explored = 0
+
+        while frontier:
+            key, cell = frontier[0]
+            if keys.get(cell) != key:
+                pop()
+                if stats is not None:
+                    stats.stale_pops += 1
+                continue  # Stale entry of a cell that was requeued or became consistent
+            if key >= self._key(start) and rhs[start] <= g[start]:
+                break
+
+            pop()
+            del keys[cell]
+            if key < self._key(cell):
+                self._queue(cell, push)  # The start moved since the cell was queued
+                continue
+
+            num_explored += 1
+            yield EXPAND, cell
+            neighbors = successors(cell)
+            if g[cell] > rhs[cell]:
+                g[cell] = rhs[cell]
+            else:
+                g[cell] = INF
+                neighbors = neighbors + [cell]
+            for neighbor in neighbors:
+                if self._update(neighbor, push):
+                    yield PUSH, neighbor
+
+        self.num_explored = num_explored
+        if rhs[start] == INF:
+            yield EXHAUSTED, num_explored
+        else:
+            yield FOUND, (self._path(), num_explored)
+
+    def _update(self, cell, push):
+        """
+        Recomputes the rhs-value of a cell and queues it if it is inconsistent. Returns whether it was queued.
+        """
+        g, rhs = self._g, self._rhs
+        if cell != self.grid.goal:
+            best = INF
+            if self._cells[cell] != WALL:
+                for neighbor in self._neighbors(cell):
+                    if g[neighbor] < best:
+                        best = g[neighbor]
+                if best < INF:
+                    best += 1
+            rhs[cell] = best
+        if g[cell] != rhs[cell]:
+            return self._queue(cell, push)
+        self._keys.pop(cell, None)  # Its entries in the heap become stale
+        return False
+
+    def _queue(self, cell, push):
+        """
+        Queues a cell with its current key, unless it is already queued with it. Returns whether it was queued.
+        """
+        key = self._key(cell)
+        if self._keys.get(cell) == key:
+            return False
+        self._keys[cell] = key
+        push((key, cell))
+        return True
+
+    def _key(self, cell):
+        """
+        Returns the priority of a cell, as a single int ordering by f-score and then by distance to the goal.
+        """
+        stride = self.grid.stride
+        best = min(self._g[cell], self._rhs[cell])
+        h = manhattan_distance(divmod(cell, stride), divmod(self.grid.start, stride))
+        return (best + h + self._offset) * (INF + 1) + best
+
+    def _neighbors(self, cell):
+        """
+        Returns the open neighbors of a cell.
+        """
+        cells = self._cells
+        return [
+            cell + offset
+            for offset in self.grid.offsets
+            if cells[cell + offset] != WALL
+        ]
+
+    def _path(self):
+        """
+        Follows the smallest g-values from the start to the goal.
+        """
+        g, grid = self._g, self.grid
+        cell = grid.start
+        path = [grid.to_state(cell)]
+        while cell != grid.goal:
+            cell = min(self._neighbors(cell), key=g.__getitem__)
+            path.append(grid.to_state(cell))
+        return path
+
+
+def d_star_lite_search(maze, stats=None):
+    """
+    Performs a D* Lite search, i.e. the first planning of an `IncrementalPlanner`, on a maze.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects counters of the search, see `utils.instrumentation`. Defaults to None.
+
+    Returns:
+    - path (list): A list of tuples representing the shortest sequence of positions from the start to the goal.
+    - num_explored (int): The number of cells expanded during the search.
+    - steps (SearchTrace): A trace of the search process that materializes a maze state for each step on demand.
+
+    Notes:
+    - The search runs backwards from the goal, so the trace grows from the goal towards the start. Keep an `IncrementalPlanner` instead to replan cheaply after the maze changes.
+    - This is a thin wrapper that records the events of `iter_d_star_lite_search` in a trace.
+    """
+    grid = MazeGrid.from_maze(maze)
+    return collect_search(iter_d_star_lite_search(grid, stats), grid)
+
+
+def iter_d_star_lite_search(maze, stats=None):
+    """
+    Performs a D* Lite search on a maze, yielding the events of the search as it runs.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects counters of the search, see `utils.instrumentation`. Defaults to None.
+
+    Yields:
+    - tuple: (kind, payload) events, see `utils.search_trace`.
+    """
+    return IncrementalPlanner(maze).iter_replan(stats)
@@ -1,85 +1,79 @@
-import numpy as np
+from utils.maze_grid import MazeGrid
+from utils.node_store import NodeStore
+from utils.search_trace import collect_search, EXPAND, PUSH, FOUND, EXHAUSTED
 
-from utils.node import Node
-from utils.search_utils import get_successors, find_positions
 
-
-def dfs_search(maze):
+def dfs_search(maze, stats=None):
     """
     Performs a depth-first search (DFS) on a maze to find a path from the start position to the goal position.
 
     Parameters:
-    - maze (list of lists): The maze represented as a 2D list, where each element represents a cell in the maze.
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects counters of the search, see `utils.instrumentation`. Defaults to None.
 
     Returns:
     - path (list): A list of tuples representing the sequence of positions from the start to the goal.
     - num_explored (int): The number of nodes explored during the search.
-    - steps (list): A list of numpy arrays representing the maze state at each step of the search.
+    - steps (SearchTrace): A trace of the search process that materializes a maze state for each step on demand.
 
     Notes:
     - The start position in the maze should be marked as "S" and the goal position should be marked as "G".
     - The maze can contain walls marked as "X" and empty spaces marked as " ".
     - The search algorithm uses a stack (LIFO) to keep track of the frontier of nodes to explore.
+    - A cell can be on the stack several times, so each stack entry packs the cell with the parent that pushed it into one int, and the parent is written to the NodeStore when the entry is popped.
     - The search algorithm explores nodes until the goal position is reached or there are no more nodes to explore.
-    - At each step of the search, the current maze state is visualized by marking the explored nodes as "E" and the current node as "C".
+    - Each expansion and each push onto the frontier is recorded as a single event in the trace, which marks explored nodes as "E" and the current node as "C" when a frame is requested.
     - The function returns the path from the start to the goal, the number of nodes explored, and the maze state at each step of the search.
+    - This is a thin wrapper that records the events of `iter_dfs_search` in a trace.
     """
-    start, goal = find_positions(maze, "S"), find_positions(maze, "G")
-    frontier = [Node(start)]
-    start_node = Node(start)
-    explored = set()
-    steps = [create_maze_state(maze, explored, start_node, goal)]
-
-    while frontier:
-        current_node = frontier.pop()  # LIFO
-        explored.add(current_node.state)
-
-        if current_node.state == goal:
-            path = [node.state for node in current_node.path()]
-            steps.append(
-                create_maze_state(maze, explored, goal, None)
-            )  # Visualization of the final path
-            return path, len(explored), steps
-
-        for action, state in get_successors(maze, current_node.state):
-            if state not in explored and maze[state] != "X":
-                child = Node(state, current_node, action)
-                frontier.append(child)
-                # Visualization at this step before exploring the child node
-                steps.append(
-                    create_maze_state(maze, explored.union({state}), child, None)
-                )
-
-    return None, len(explored), steps
+    grid = MazeGrid.from_maze(maze)
+    return collect_search(iter_dfs_search(grid, stats), grid)
 
 
-def create_maze_state(maze, explored, current_node, goal):
+def iter_dfs_search(maze, stats=None):
     """
-    Creates a new maze state by marking the explored nodes, the current node, and the goal position.
+    Performs a depth-first search (DFS) on a maze, yielding the events of the search as it runs.
 
     Parameters:
-    - maze (list of lists): The maze represented as a 2D list.
-    - explored (set): A set of tuples representing the positions of the explored nodes.
-    - current_node (Node or tuple): The current node or position.
-    - goal (tuple): The goal position.
-
-    Returns:
-    - maze_state (numpy array): The updated maze state with the explored nodes, current node, and goal marked.
-
-    Notes:
-    - The function modifies the original maze state by marking the explored nodes as "E", the current node as "C", and the goal position as "G".
-    - The function returns the updated maze state as a numpy array.
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects counters of the search, see `utils.instrumentation`. Defaults to None.
 
+    Yields:
+    - tuple: (kind, payload) events, see `utils.search_trace`. The search stops after a FOUND or EXHAUSTED event, and stopping the iteration earlier stops the search.
     """
-    maze_state = np.array(maze, dtype="object")
-    for state in explored:
-        maze_state[state] = "E"  # Mark explored nodes
-    if current_node:
-        # Check if current_node is a Node object or a tuple and act accordingly
-        current_pos = (
-            current_node.state if isinstance(current_node, Node) else current_node
-        )
-        maze_state[current_pos] = "C"  # Mark the current node
-    if goal:
-        maze_state[goal] = "G"  # Ensure the goal is always marked
-    return maze_state
+    grid = MazeGrid.from_maze(maze)
+    start, goal = grid.start, grid.goal
+    size = grid.cells.size
+    nodes = NodeStore(grid)
+    parent, action, action_codes = nodes.parent, nodes.action, nodes.action_codes
+    frontier = [
+        start * size + start
+    ]  # Entries are parent * size + cell, the start is its own parent
+    push, pop, successors = frontier.append, frontier.pop, grid.successors
+    if stats is not None:
+        push, pop, successors = stats.track(push, pop, successors, len(frontier))
+    explored = nodes.closed
+    num_explored = 0
+    yield PUSH, start
+
+    while frontier:
+        previous, current = divmod(pop(), size)  # LIFO
+        parent[current] = previous + 1
+        action[current] = action_codes[current - previous]
+        if not explored[current]:
+            explored[current] = 1
+            num_explored += 1
+        yield EXPAND, current
+
+        if current == goal:
+            path = [grid.to_state(cell) for cell in nodes.path(current)]
+            yield FOUND, (path, num_explored)
+            return
+
+        entry = current * size
+        for state in successors(current):
+            if not explored[state]:
+                push(entry + state)
+                yield PUSH, state
+
+    yield EXHAUSTED, num_explored
@@ -0,0 +1,206 @@
+from collections import OrderedDict
+import numpy as np
+from utils.maze_grid import MazeGrid
+from utils.search_trace import collect_search, EXPAND, PUSH, FOUND, EXHAUSTED
+from algorithms.bfs_wavefront import grid_distance_field
+
+
+class DistanceFieldCache:
+    """
+    An LRU cache of goal-rooted distance fields for answering many queries on the same maze.
+
+    Attributes:
+        max_bytes (int): The memory budget for the cached distance fields, in bytes.
+
+    A single reverse breadth-first search from the goal gives the distance from every cell to the goal.
+    Any start can then be answered by greedy descent: from the start, repeatedly step to a neighbor that
+    is one step closer to the goal. Fields are keyed by the layout hash of the maze and the goal, so
+    queries with different starts on the same maze share one field.
+    """
+
+    def __init__(self, max_bytes=256 * 2**20):
+        """
+        Initializes an empty cache.
+
+        Args:
+            max_bytes (int, optional): The memory budget for the cached distance fields, in bytes. Defaults to 256 MiB.
+        """
+        self.max_bytes = max_bytes
+        self._fields = OrderedDict()
+        self._bytes_used = 0
+
+    def __len__(self):
+        """
+        Returns the number of cached distance fields.
+
+        Returns:
+            int: The number of cached distance fields.
+        """
+        return len(self._fields)
+
+    @property
+    def bytes_used(self):
+        """
+        Returns the memory used by the cached distance fields.
+
+        Returns:
+            int: The number of bytes used.
+        """
+        return self._bytes_used
+
+    def clear(self):
+        """
+        Removes every cached distance field.
+        """
+        self._fields.clear()
+        self._bytes_used = 0
+
+    def distances(self, grid, goal=None, stats=None):
+        """
+        Returns the distance field of a goal, computing and caching it on a miss.
+
+        Args:
+            grid (MazeGrid): The grid of the maze.
+            goal (int, optional): The flat index of the goal cell. Defaults to the goal of the grid.
+            stats (SearchStats, optional): If given, collects counters of the breadth-first search run on a miss. Defaults to None.
+
+        Returns:
+            numpy array: A flat int32 array with the distance from every cell of the grid to the goal, or -1 if the goal cannot be reached.
+        """
+        goal = grid.goal if goal is None else goal
+        key = (grid.layout_hash(), goal)
+        field = self._fields.get(key)
+        if field is not None:
+            self._fields.move_to_end(key)
+            return field
+
+        field = grid_distance_field(grid, goal, stats)  # Distances are symmetric
+        if field.nbytes <= self.max_bytes:
+            self._fields[key] = field
+            self._bytes_used += field.nbytes
+            while self._bytes_used > self.max_bytes:
+                _, evicted = self._fields.popitem(last=False)
+                self._bytes_used -= evicted.nbytes
+        return field
+
+    def query(self, maze, start=None, goal=None):
+        """
+        Finds a shortest path by descending the cached distance field of the goal.
+
+        Args:
+            maze (MazeGrid or list of lists): The maze to query. Passing the same MazeGrid for repeated queries avoids re-encoding and re-hashing the maze.
+            start (tuple, optional): The (x, y) start position. Defaults to the start position "S".
+            goal (tuple, optional): The (x, y) goal position. Defaults to the goal position "G".
+
+        Returns:
+            list: The shortest path as a list of (x, y) positions, or None if the goal cannot be reached.
+        """
+        grid = MazeGrid.from_maze(maze)
+        start = grid.start if start is None else grid.to_cell(start)
+        goal = grid.goal if goal is None else grid.to_cell(goal)
+        cells = descend(grid, self.distances(grid, goal), start)
+        return None if cells is None else [grid.to_state(cell) for cell in cells]
+
+    def search(self, maze, stats=None):
+        """
+        Answers the start and goal of a maze from the cache, with the same results as the search algorithms.
+
+        Args:
+            maze (MazeGrid or list of lists): The maze to solve.
+            stats (SearchStats, optional): If given, collects the counters of the breadth-first search that computes a missing distance field. A cache hit leaves them at zero. Defaults to None.
+
+        Returns:
+            tuple: The path (or None), the number of cells expanded (by the breadth-first search on a miss, by the descent on a hit) and the SearchTrace of the descent.
+        """
+        grid = MazeGrid.from_maze(maze)
+        return collect_search(self.iter_search(grid, stats), grid)
+
+    def iter_search(self, maze, stats=None):
+        """
+        Answers the start and goal of a maze from the cache, yielding the events of the descent.
+
+        Args:
+            maze (MazeGrid or list of lists): The maze to solve.
+            stats (SearchStats, optional): If given, collects the counters of the breadth-first search that computes a missing distance field. Defaults to None.
+
+        Yields:
+            tuple: (kind, payload) events, see `utils.search_trace`. Every cell of the path but the goal is expanded, and the last event is FOUND or EXHAUSTED. On a miss, their count of cells explored is the number of cells the breadth-first search expanded, so that a miss is not reported as costing one path length.
+        """
+        grid = MazeGrid.from_maze(maze)
+        hit = (grid.layout_hash(), grid.goal) in self._fields
+        yield PUSH, grid.start
+        distances = self.distances(grid, stats=stats)
+        cells = descend(grid, distances, grid.start)
+        if hit:
+            num_explored = 0 if cells is None else len(cells) - 1
+        else:
+            # A miss expands every cell the goal can reach, which the field marks with a distance
+            num_explored = int(np.count_nonzero(distances >= 0))
+        if cells is None:
+            yield EXHAUSTED, num_explored
+            return
+
+        for cell in cells[:-1]:
+            yield EXPAND, cell
+        yield FOUND, ([grid.to_state(cell) for cell in cells], num_explored)
+
+
+def descend(grid, distances, start):
+    """
+    Follows a distance field downhill from a start cell to the cell at distance 0.
+
+    Parameters:
+    - grid (MazeGrid): The grid the distance field was computed on.
+    - distances (numpy array): A flat distance field from `grid_distance_field`.
+    - start (int): The flat index of the start cell.
+
+    Returns:
+    - cells (list): The flat indices of the cells from the start to the root of the field, or None if the start cannot reach it.
+    """
+    distance = int(distances[start])
+    if distance < 0:
+        return None
+    cells, cell = [start], start
+    offsets = grid.offsets
+    while distance:
+        distance -= 1
+        # Walls and border cells hold -1, so no bounds or wall checks are needed
+        cell = next(cell + o for o in offsets if distances[cell + o] == distance)
+        cells.append(cell)
+    return cells
+
+
+DEFAULT_CACHE = DistanceFieldCache()
+
+
+def distance_cache_search(maze, stats=None):
+    """
+    Solves a maze through the shared default DistanceFieldCache.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects the counters of the breadth-first search run on a cache miss, see `utils.instrumentation`. Defaults to None.
+
+    Returns:
+    - path (list): A list of tuples representing the shortest sequence of positions from the start to the goal.
+    - num_explored (int): The number of cells expanded: by the breadth-first search that computes the distance field on a cache miss, or by the descent (the path length minus one) on a hit.
+    - steps (SearchTrace): A trace of the descent that materializes a maze state for each step on demand.
+
+    Notes:
+    - The first query for a maze layout and goal runs one reverse breadth-first search from the goal. Every later query on the same layout and goal, with any start, only walks down the cached field in O(path length).
+    """
+    return DEFAULT_CACHE.search(maze, stats)
+
+
+def iter_distance_cache_search(maze, stats=None):
+    """
+    Solves a maze through the shared default DistanceFieldCache, yielding the events of the descent.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects the counters of the breadth-first search run on a cache miss, see `utils.instrumentation`. Defaults to None.
+
+    Yields:
+    - tuple: (kind, payload) events, see `utils.search_trace`.
+    """
+    return DEFAULT_CACHE.iter_search(maze, stats)
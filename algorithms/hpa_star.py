@@ -0,0 +1,587 @@
+import heapq
+import os
+from collections import OrderedDict
+from functools import partial
+from itertools import count
+import numpy as np
+from utils.maze_grid import MazeGrid, WALL
+from utils.search_trace import collect_search, EXPAND, PUSH, FOUND, EXHAUSTED
+from algorithms.a_star import manhattan_distance
+
+# Side length of the square clusters, in cells
+CLUSTER_SIZE = 16
+
+# Entrances at least this long get a transition at both ends instead of one in the middle
+LONG_ENTRANCE = 6
+
+# Version of the abstraction files written by `ClusterAbstraction.save`
+FORMAT_VERSION = 1
+
+# Number of abstractions kept by `hpa_star_search` for the most recently searched maze layouts
+MAX_CACHED_ABSTRACTIONS = 4
+
+
+class ClusterAbstraction:
+    """
+    The abstract graph of Hierarchical Pathfinding A* (HPA*) for one maze layout.
+
+    Attributes:
+        layout_hash (str): The layout hash of the maze the abstraction was built for, see `MazeGrid.layout_hash`.
+        shape (tuple): The (rows, columns) shape of the maze.
+        cluster_size (int): The side length of the square clusters, in cells.
+        node_cells (numpy array): The flat `MazeGrid` index of the cell of every abstract node, with the nodes sorted by cluster.
+        cluster_ptr (numpy array): The nodes of cluster c are the nodes cluster_ptr[c] to cluster_ptr[c + 1] - 1. Clusters are numbered row by row.
+        edge_ptr (numpy array): CSR offsets, the edges of node n are the entries edge_ptr[n] to edge_ptr[n + 1] - 1.
+        edge_targets (numpy array): The target node of every edge.
+        edge_weights (numpy array): The number of steps of every edge.
+
+    The maze is split into square clusters. Where two neighboring clusters share a run of open cell pairs
+    across their border, the run is an entrance, and its middle pair, or both end pairs for long runs,
+    become transitions. The cells of the transitions are the abstract nodes. The two cells of a transition
+    are joined by an edge of weight 1, and the nodes of a cluster are joined by the length of the shortest
+    path between them inside the cluster. These lengths are computed for all clusters at once, with one
+    NumPy wavefront per rank of node within its cluster.
+
+    A query connects the start and the goal to the nodes of their clusters with breadth-first searches
+    inside the clusters, runs A* on the abstract graph, and refines every abstract edge into cells with a
+    breadth-first search inside its cluster. The work of a query grows with the number of clusters the
+    path crosses rather than with the number of cells explored. Paths are usually a few percent longer
+    than the shortest ones, since they can only cross cluster borders at transitions.
+    """
+
+    def __init__(
+        self,
+        layout_hash,
+        shape,
+        cluster_size,
+        node_cells,
+        cluster_ptr,
+        edge_ptr,
+        edge_targets,
+        edge_weights,
+    ):
+        """
+        Initializes an abstraction from its arrays, see `build` and `load`.
+        """
+        self.layout_hash = layout_hash
+        self.shape = tuple(shape)
+        self.cluster_size = cluster_size
+        self.node_cells = node_cells
+        self.cluster_ptr = cluster_ptr
+        self.edge_ptr = edge_ptr
+        self.edge_targets = edge_targets
+        self.edge_weights = edge_weights
+        self._stride = self.shape[1] + 2
+        self._cluster_columns = -(-self.shape[1] // cluster_size)
+        # Views whose items are plain ints, used by the search loops
+        self._cells = memoryview(node_cells)
+        self._clusters = memoryview(cluster_ptr)
+        self._edges = memoryview(edge_ptr)
+        self._targets = memoryview(edge_targets)
+        self._weights = memoryview(edge_weights)
+
+    def __len__(self):
+        """
+        Returns the number of abstract nodes.
+
+        Returns:
+            int: The number of abstract nodes.
+        """
+        return self.node_cells.size
+
+    @classmethod
+    def build(cls, maze, cluster_size=CLUSTER_SIZE):
+        """
+        Builds the abstraction of a maze.
+
+        Args:
+            maze (MazeGrid or list of lists): The maze to abstract. Only its layout matters, not its start and goal.
+            cluster_size (int, optional): The side length of the square clusters, in cells. Defaults to CLUSTER_SIZE.
+
+        Returns:
+            ClusterAbstraction: The abstraction of the maze.
+        """
+        grid = MazeGrid.from_maze(maze)
+        rows, columns = grid.shape
+        stride = grid.stride
+        cluster_of = _cluster_function(grid, cluster_size)
+        num_clusters = -(-rows // cluster_size) * -(-columns // cluster_size)
+
+        # Transitions between clusters side by side, then between clusters above one another
+        open_cells = grid.codes() != WALL
+        x, y = _transitions(open_cells, cluster_size)
+        across_columns = (x + 1) * stride + y + 1
+        y, x = _transitions(open_cells.T, cluster_size)
+        across_rows = (x + 1) * stride + y + 1
+        first = np.concatenate([across_columns, across_rows])
+        second = np.concatenate([across_columns + 1, across_rows + stride])
+
+        # Nodes sorted by cluster, and by cell within a cluster
+        cells = np.unique(np.concatenate([first, second]))
+        clusters = cluster_of(cells)
+        order = np.argsort(clusters, kind="stable")
+        cells, clusters = cells[order], clusters[order]
+        cluster_ptr = np.searchsorted(clusters, np.arange(num_clusters + 1))
+        by_cell = np.argsort(cells)
+        first = by_cell[np.searchsorted(cells[by_cell], first)]
+        second = by_cell[np.searchsorted(cells[by_cell], second)]
+
+        sources, targets = [first, second], [second, first]
+        weights = [np.ones(2 * first.size, dtype=np.int32)]
+        for source, target, weight in _intra_cluster_edges(
+            grid, cells, clusters, cluster_ptr, cluster_of
+        ):
+            sources.append(source)
+            targets.append(target)
+            weights.append(weight)
+        sources, targets = np.concatenate(sources), np.concatenate(targets)
+        weights = np.concatenate(weights)
+        order = np.argsort(sources, kind="stable")
+        edge_ptr = np.zeros(cells.size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=cells.size), out=edge_ptr[1:])
+        return cls(
+            grid.layout_hash(),
+            grid.shape,
+            cluster_size,
+            cells.astype(np.int64),
+            cluster_ptr.astype(np.int64),
+            edge_ptr,
+            targets[order].astype(np.int64),
+            weights[order].astype(np.int32),
+        )
+
+    def matches(self, maze, cluster_size=None):
+        """
+        Tells whether the abstraction was built for the layout of a maze.
+
+        Args:
+            maze (MazeGrid or list of lists): The maze to check.
+            cluster_size (int, optional): If given, the cluster size the abstraction must also have. Defaults to None.
+
+        Returns:
+            bool: True if the abstraction can answer queries on the maze, False otherwise.
+        """
+        if cluster_size is not None and cluster_size != self.cluster_size:
+            return False
+        return self.layout_hash == MazeGrid.from_maze(maze).layout_hash()
+
+    def save(self, file):
+        """
+        Writes the abstraction to a binary .npz file, see `load`.
+
+        Args:
+            file (str or file): The file to write, ".npz" is appended to names without it.
+        """
+        np.savez(
+            file,
+            version=FORMAT_VERSION,
+            layout_hash=self.layout_hash,
+            shape=np.array(self.shape, dtype=np.int64),
+            cluster_size=self.cluster_size,
+            node_cells=self.node_cells,
+            cluster_ptr=self.cluster_ptr,
+            edge_ptr=self.edge_ptr,
+            edge_targets=self.edge_targets,
+            edge_weights=self.edge_weights,
+        )
+
+    @classmethod
+    def load(cls, file):
+        """
+        Reads an abstraction written by `save`.
+
+        Args:
+            file (str or file): The .npz file to read.
+
+        Returns:
+            ClusterAbstraction: The saved abstraction. Check it with `matches` before using it on a maze.
+        """
+        with np.load(file) as data:
+            version = int(data["version"])
+            if version != FORMAT_VERSION:
+                raise ValueError(
+                    f"{file} has unsupported abstraction version {version}"
+                )
+            return cls(
+                str(data["layout_hash"]),
+                data["shape"].tolist(),
+                int(data["cluster_size"]),
+                data["node_cells"],
+                data["cluster_ptr"],
+                data["edge_ptr"],
+                data["edge_targets"],
+                data["edge_weights"],
+            )
+
+    def query(self, maze, start=None, goal=None):
+        """
+        Finds a path between two positions of a maze through the abstraction.
+
+        Args:
+            maze (MazeGrid or list of lists): The maze to query, with the layout the abstraction was built for.
+            start (tuple, optional): The (x, y) start position. Defaults to the start position "S".
+            goal (tuple, optional): The (x, y) goal position. Defaults to the goal position "G".
+
+        Returns:
+            list: The path as a list of (x, y) positions, or None if the goal cannot be reached.
+        """
+        grid = MazeGrid.from_maze(maze)
+        start = grid.start if start is None else grid.to_cell(start)
+        goal = grid.goal if goal is None else grid.to_cell(goal)
+        path, _, _ = collect_search(self._iter_query(grid, start, goal, None))
+        return path
+
+    def search(self, maze, stats=None):
+        """
+        Solves the start and goal of a maze through the abstraction, with the same results as the search algorithms.
+
+        Args:
+            maze (MazeGrid or list of lists): The maze to solve, with the layout the abstraction was built for.
+            stats (SearchStats, optional): If given, collects the counters of the search on the abstract graph. Defaults to None.
+
+        Returns:
+            tuple: The path (or None), the number of abstract nodes and cells expanded and the SearchTrace of the search.
+        """
+        grid = MazeGrid.from_maze(maze)
+        return collect_search(self.iter_search(grid, stats), grid)
+
+    def iter_search(self, maze, stats=None):
+        """
+        Solves the start and goal of a maze through the abstraction, yielding the events of the search.
+
+        Args:
+            maze (MazeGrid or list of lists): The maze to solve, with the layout the abstraction was built for.
+            stats (SearchStats, optional): If given, collects the counters of the search on the abstract graph. Defaults to None.
+
+        Yields:
+            tuple: (kind, payload) events, see `utils.search_trace`. The cells of the abstract nodes are pushed and expanded, and so are the cells expanded by the searches inside clusters. The last event is FOUND or EXHAUSTED.
+        """
+        grid = MazeGrid.from_maze(maze)
+        return self._iter_query(grid, grid.start, grid.goal, stats)
+
+    def _iter_query(self, grid, start, goal, stats):
+        """
+        Connects the start and goal to the abstract graph, searches it and refines its path, yielding the events.
+        """
+        # The neighbor table of a large maze would use far more memory than the abstraction
+        neighbors = grid.neighbor_lookup()
+        node_cells = self._cells
+        yield PUSH, start
+        start_reached, start_order = self._cluster_bfs(neighbors, start)
+        goal_reached, goal_order = self._cluster_bfs(neighbors, goal)
+        for cell in start_order + goal_order:
+            yield EXPAND, cell
+        num_explored = len(start_order) + len(goal_order)
+
+        # The start and goal are the extra nodes n and n + 1, joined to the reachable nodes of their clusters
+        source, target = len(self), len(self) + 1
+        start_edges = self._cluster_edges(start, start_reached)
+        goal_edges = dict(self._cluster_edges(goal, goal_reached))
+        if goal in start_reached:
+            start_edges.append((target, start_reached[goal][1]))
+
+        events = self._abstract_search(
+            source, target, start_edges, goal_edges, start, goal, stats
+        )
+        for kind, payload in events:
+            if kind == FOUND or kind == EXHAUSTED:
+                break
+            yield kind, payload
+        if kind == EXHAUSTED:
+            yield EXHAUSTED, num_explored + payload
+            return
+
+        nodes, expanded = payload
+        num_explored += expanded
+        cells = [start]
+        for a, b in zip(nodes, nodes[1:]):
+            if a == source:
+                piece = _walk(start_reached, goal if b == target else node_cells[b])
+                piece.reverse()
+            elif b == target:
+                piece = _walk(goal_reached, node_cells[a])
+            elif node_cells[b] - node_cells[a] in grid.offsets:
+                piece = [node_cells[a], node_cells[b]]
+            else:
+                reached, order = self._cluster_bfs(
+                    neighbors, node_cells[a], node_cells[b]
+                )
+                for cell in order:
+                    yield EXPAND, cell
+                num_explored += len(order)
+                piece = _walk(reached, node_cells[b])
+                piece.reverse()
+            cells.extend(piece[1:])
+        yield FOUND, ([grid.to_state(cell) for cell in cells], num_explored)
+
+    def _abstract_search(
+        self, source, target, start_edges, goal_edges, start, goal, stats
+    ):
+        """
+        Runs A* on the abstract graph from the start node to the goal node, yielding the events of the search.
+        """
+        stride, node_cells = self._stride, self._cells
+        edges, targets, weights = self._edges, self._targets, self._weights
+        goal_position = divmod(goal, stride)
+
+        def successors(node):
+            if node == source:
+                return start_edges
+            begin, end = edges[node], edges[node + 1]
+            result = list(zip(targets[begin:end], weights[begin:end]))
+            if node in goal_edges:
+                result.append((target, goal_edges[node]))
+            return result
+
+        frontier = [(0, 0, source)]  # Entries are (f-score, push counter, node)
+        push, pop = partial(heapq.heappush, frontier), partial(heapq.heappop, frontier)
+        expand = successors
+        if stats is not None:
+            push, pop, expand = stats.track(push, pop, successors, len(frontier))
+        ties = count(1)
+        costs, parents, closed = {source: 0}, {source: source}, set()
+        num_explored = 0
+
+        while frontier:
+            node = pop()[2]
+            if node in closed:
+                if stats is not None:
+                    stats.stale_pops += 1
+                continue  # Stale entry superseded by a cheaper push
+
+            if node == target:
+                path = [node]
+                while node != source:
+                    node = parents[node]
+                    path.append(node)
+                yield FOUND, (path[::-1], num_explored)
+                return
+
+            closed.add(node)
+            num_explored += 1
+            if node != source:
+                yield EXPAND, node_cells[node]
+            g = costs[node]
+            for child, weight in expand(node):
+                cost = g + weight
+                if child not in closed and (child not in costs or cost < costs[child]):
+                    costs[child], parents[child] = cost, node
+                    cell = goal if child == target else node_cells[child]
+                    h = manhattan_distance(divmod(cell, stride), goal_position)
+                    push((cost + h, next(ties), child))
+                    if child != target:
+                        yield PUSH, cell
+
+        yield EXHAUSTED, num_explored
+
+    def _cluster_edges(self, cell, reached):
+        """
+        Returns the (node, steps) pairs of the nodes of the cluster of a cell that a search from the cell reached.
+        """
+        x, y = divmod(cell, self._stride)
+        size = self.cluster_size
+        cluster = (x - 1) // size * self._cluster_columns + (y - 1) // size
+        return [
+            (node, reached[self._cells[node]][1])
+            for node in range(self._clusters[cluster], self._clusters[cluster + 1])
+            if self._cells[node] in reached
+        ]
+
+    def _cluster_bfs(self, neighbors, source, target=None):
+        """
+        Runs a breadth-first search that stays inside the cluster of the source, stopping at the target if given.
+
+        Returns a dict mapping every reached cell to its (parent, steps), and the list of expanded cells.
+        """
+        stride, size = self._stride, self.cluster_size
+        x, y = divmod(source, stride)
+        top, left = (x - 1) // size * size + 1, (y - 1) // size * size + 1
+        bottom, right = top + size, left + size
+        reached = {source: (source, 0)}
+        queue, expanded = [source], []
+        for cell in queue:  # The loop also visits the cells appended to the queue
+            if cell == target:
+                break
+            expanded.append(cell)
+            steps = reached[cell][1] + 1
+            for child in neighbors(cell):
+                if child not in reached:
+                    row, column = divmod(child, stride)
+                    if top <= row < bottom and left <= column < right:
+                        reached[child] = (cell, steps)
+                        queue.append(child)
+        return reached, expanded
+
+
+_ABSTRACTIONS = OrderedDict()
+
+
+def abstraction_for(maze, cluster_size=CLUSTER_SIZE):
+    """
+    Returns the abstraction of a maze, building it if it is not among the most recently used ones.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze to abstract.
+    - cluster_size (int, optional): The side length of the square clusters, in cells. Defaults to CLUSTER_SIZE.
+
+    Returns:
+    - abstraction (ClusterAbstraction): The abstraction of the maze. The last MAX_CACHED_ABSTRACTIONS abstractions are kept, keyed by layout hash and cluster size.
+    """
+    grid = MazeGrid.from_maze(maze)
+    key = (grid.layout_hash(), cluster_size)
+    abstraction = _ABSTRACTIONS.get(key)
+    if abstraction is not None:
+        _ABSTRACTIONS.move_to_end(key)
+        return abstraction
+
+    abstraction = ClusterAbstraction.build(grid, cluster_size)
+    _ABSTRACTIONS[key] = abstraction
+    while len(_ABSTRACTIONS) > MAX_CACHED_ABSTRACTIONS:
+        _ABSTRACTIONS.popitem(last=False)
+    return abstraction
+
+
+def load_abstraction(file, maze, cluster_size=CLUSTER_SIZE):
+    """
+    Loads the saved abstraction of a maze, rebuilding and saving it if the file is missing or stale.
+
+    Parameters:
+    - file (str): The path of the abstraction file, ending with ".npz".
+    - maze (MazeGrid or list of lists): The maze to abstract.
+    - cluster_size (int, optional): The side length of the square clusters, in cells. Defaults to CLUSTER_SIZE.
+
+    Returns:
+    - abstraction (ClusterAbstraction): The abstraction of the maze.
+
+    Notes:
+    - A saved abstraction is stale when the layout hash of the maze or the cluster size differ from those it was built with, e.g. after walls were added or removed.
+    """
+    grid = MazeGrid.from_maze(maze)
+    if os.path.exists(file):
+        abstraction = ClusterAbstraction.load(file)
+        if abstraction.matches(grid, cluster_size):
+            return abstraction
+    abstraction = ClusterAbstraction.build(grid, cluster_size)
+    abstraction.save(file)
+    return abstraction
+
+
+def hpa_star_search(maze, stats=None):
+    """
+    Performs Hierarchical Pathfinding A* (HPA*), an A* search on an abstract graph of clusters of the maze.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects the counters of the search on the abstract graph, see `utils.instrumentation`. Defaults to None.
+
+    Returns:
+    - path (list): A list of tuples representing a sequence of positions from the start to the goal. It is not always a shortest one.
+    - num_explored (int): The number of abstract nodes expanded plus the number of cells expanded by the searches inside clusters.
+    - steps (SearchTrace): A trace of the search process that materializes a maze state for each step on demand.
+
+    Notes:
+    - The abstraction of the maze is built on the first search of its layout, which takes longer than a flat search, and is reused by later searches on the same layout with any start and goal. See `ClusterAbstraction` and `load_abstraction` to keep it on disk.
+    - This is a thin wrapper that records the events of `iter_hpa_star_search` in a trace.
+    """
+    grid = MazeGrid.from_maze(maze)
+    return collect_search(iter_hpa_star_search(grid, stats), grid)
+
+
+def iter_hpa_star_search(maze, stats=None):
+    """
+    Performs Hierarchical Pathfinding A* (HPA*) on a maze, yielding the events of the search as it runs.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects the counters of the search on the abstract graph, see `utils.instrumentation`. Defaults to None.
+
+    Yields:
+    - tuple: (kind, payload) events, see `utils.search_trace`.
+    """
+    grid = MazeGrid.from_maze(maze)
+    return abstraction_for(grid).iter_search(grid, stats)
+
+
+def _cluster_function(grid, cluster_size):
+    """
+    Returns a function mapping an array of flat cell indices of a grid to the indices of their clusters.
+    """
+    stride, columns = grid.stride, -(-grid.shape[1] // cluster_size)
+
+    def cluster_of(cells):
+        x, y = np.divmod(cells, stride)
+        return (x - 1) // cluster_size * columns + (y - 1) // cluster_size
+
+    return cluster_of
+
+
+def _transitions(open_cells, cluster_size):
+    """
+    Finds the transitions between clusters side by side, as the (x, y) positions of their left cells.
+
+    An entrance is a maximal run of rows, within one row of clusters, where the cells on both sides of a
+    border between two columns of clusters are open. It gets one transition in its middle, or one at each
+    end if it is at least LONG_ENTRANCE rows long.
+    """
+    borders = np.arange(cluster_size, open_cells.shape[1], cluster_size)
+    # Runs along the rows, one border after the other
+    both = (open_cells[:, borders - 1] & open_cells[:, borders]).T
+    before = np.zeros_like(both)
+    before[:, 1:] = both[:, :-1]
+    # Runs do not continue into the next row of clusters
+    before[:, ::cluster_size] = False
+    after = np.zeros_like(both)
+    after[:, :-1] = both[:, 1:]
+    after[:, cluster_size - 1 :: cluster_size] = False
+    border, first = np.nonzero(both & ~before)
+    _, last = np.nonzero(both & ~after)
+    long = last - first + 1 >= LONG_ENTRANCE
+    x = np.concatenate([np.where(long, first, (first + last) // 2), last[long]])
+    y = borders[np.concatenate([border, border[long]])] - 1
+    return x, y
+
+
+def _intra_cluster_edges(grid, cells, clusters, cluster_ptr, cluster_of):
+    """
+    Yields the (sources, targets, steps) arrays of the edges between the nodes of every cluster.
+
+    The k-th node of every cluster runs a breadth-first search restricted to its cluster, and all of
+    them advance together as one NumPy wavefront since the clusters do not overlap.
+    """
+    passable = grid.cells != WALL
+    offsets = np.array(grid.offsets, dtype=np.int64)
+    ranks = np.arange(cells.size) - cluster_ptr[clusters]
+    distances = np.full(grid.cells.size, -1, dtype=np.int32)
+    source_of = np.zeros(cluster_ptr.size - 1, dtype=np.int64)
+    for rank in range(int(ranks.max()) + 1 if cells.size else 0):
+        sources = np.flatnonzero(ranks == rank)
+        source_of[clusters[sources]] = sources
+        frontier, owners = cells[sources], clusters[sources]
+        distances[frontier] = 0
+        reached, level = [frontier], 0
+        while frontier.size:
+            level += 1
+            candidates = (frontier[:, None] + offsets).ravel()
+            owners = np.repeat(owners, offsets.size)
+            keep = passable[candidates] & (distances[candidates] < 0)
+            candidates, owners = candidates[keep], owners[keep]
+            keep = cluster_of(candidates) == owners
+            frontier, first = np.unique(candidates[keep], return_index=True)
+            owners = owners[keep][first]
+            distances[frontier] = level
+            reached.append(frontier)
+        steps = distances[cells]
+        targets = np.flatnonzero(steps > 0)
+        yield source_of[clusters[targets]], targets, steps[targets]
+        distances[np.concatenate(reached)] = -1
+
+
+def _walk(reached, cell):
+    """
+    Follows the parents of a search inside a cluster from a cell back to its source.
+    """
+    cells = [cell]
+    while reached[cell][0] != cell:
+        cell = reached[cell][0]
+        cells.append(cell)
+    return cells
@@ -0,0 +1,163 @@
+from collections import OrderedDict
+import numpy as np
+from utils.maze_grid import MazeGrid
+from utils.search_trace import collect_search, EXPAND, PUSH, FOUND, EXHAUSTED
+from algorithms.a_star import manhattan_distance
+
+# Default number of entries of the transposition table
+TABLE_SIZE = 2**16
+
+
+def ida_star_search(maze, stats=None, table_size=TABLE_SIZE):
+    """
+    Performs Iterative Deepening A* (IDA*) on a maze to find the shortest path from the start position to the goal position.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects counters of the search, see `utils.instrumentation`. The frontier is the stack of the depth-first search. Defaults to None.
+    - table_size (int, optional): The maximum number of entries of the transposition table, 0 to search without one. Defaults to TABLE_SIZE.
+
+    Returns:
+    - path (list): A list of tuples representing the shortest sequence of positions from the start to the goal.
+    - num_explored (int): The number of nodes explored during the search, summed over all iterations.
+    - steps (SearchTrace): A trace of the search process that materializes a maze state for each step on demand.
+
+    Notes:
+    - IDA* runs a series of depth-first searches that prune every node whose f-score, the number of steps from the start plus the Manhattan distance to the goal, exceeds a bound. The first bound is the f-score of the start, and every further iteration raises it to the smallest f-score pruned by the previous one, so the first path found is a shortest one.
+    - Only the current path is kept, together with the successors of its cells that are left to try, and a node is skipped if it is already on the current path, which a one-byte-per-cell array tells in O(1). Besides that array, the memory of the search grows with the length of the path and the size of the transposition table, not with the number of cells explored.
+    - Without further checks a depth-first search explores every path to a cell, which is exponential on open grids. The transposition table remembers the fewest steps each cell was reached with during the current iteration, and skips a cell reached again with as many steps or more. When the table is full the least recently updated cell is forgotten, so memory stays bounded at the price of some repeated work.
+    - Successors are read from the cells of the grid instead of its neighbor table, which would use far more memory than the search itself, and only the visited cells of a memory-mapped grid are loaded.
+    - This is a thin wrapper that records the events of `iter_ida_star_search` in a trace, which holds every event of every iteration and so grows with the total number of cells explored. For bounded memory, run `iter_ida_star_search` with `collect_search(events)`, which keeps no trace.
+    """
+    grid = MazeGrid.from_maze(maze)
+    return collect_search(iter_ida_star_search(grid, stats, table_size), grid)
+
+
+def iter_ida_star_search(maze, stats=None, table_size=TABLE_SIZE):
+    """
+    Performs Iterative Deepening A* (IDA*) on a maze, yielding the events of the search as it runs.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects counters of the search, see `utils.instrumentation`. Defaults to None.
+    - table_size (int, optional): The maximum number of entries of the transposition table, 0 to search without one. Defaults to TABLE_SIZE.
+
+    Yields:
+    - tuple: (kind, payload) events, see `utils.search_trace`. Every iteration expands and pushes its cells again. The search stops after a FOUND or EXHAUSTED event, and stopping the iteration earlier stops the search.
+    """
+    grid = MazeGrid.from_maze(maze)
+    stride = grid.stride
+    goal_position = divmod(grid.goal, stride)
+
+    def heuristic(cell):
+        return manhattan_distance(divmod(cell, stride), goal_position)
+
+    return _iterative_deepening(grid, heuristic, stats, table_size)
+
+
+def iddfs_search(maze, stats=None, table_size=TABLE_SIZE):
+    """
+    Performs an iterative-deepening depth-first search (IDDFS) on a maze to find the shortest path from the start position to the goal position.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects counters of the search, see `utils.instrumentation`. The frontier is the stack of the depth-first search. Defaults to None.
+    - table_size (int, optional): The maximum number of entries of the transposition table, 0 to search without one. Defaults to TABLE_SIZE.
+
+    Returns:
+    - path (list): A list of tuples representing the shortest sequence of positions from the start to the goal.
+    - num_explored (int): The number of nodes explored during the search, summed over all iterations.
+    - steps (SearchTrace): A trace of the search process that materializes a maze state for each step on demand.
+
+    Notes:
+    - IDDFS runs depth-first searches limited to 0, 1, 2, ... steps until one of them reaches the goal, so the path found is a shortest one. It is IDA* without a heuristic, see `ida_star_search` for the cycle checking and the transposition table.
+    - Every iteration repeats the work of the previous ones, and without a heuristic the depth-first order reaches many cells first by long detours and searches them again once shorter paths to them are found. IDDFS trades time for memory even more than IDA*: it takes seconds on mazes that A* solves in milliseconds, so it is not part of the default sweeps of `run_search_algorithms`.
+    - This is a thin wrapper that records the events of `iter_iddfs_search` in a trace, which grows with the total number of cells explored. For bounded memory, run `iter_iddfs_search` with `collect_search(events)`, which keeps no trace.
+    """
+    grid = MazeGrid.from_maze(maze)
+    return collect_search(iter_iddfs_search(grid, stats, table_size), grid)
+
+
+def iter_iddfs_search(maze, stats=None, table_size=TABLE_SIZE):
+    """
+    Performs an iterative-deepening depth-first search (IDDFS) on a maze, yielding the events of the search as it runs.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects counters of the search, see `utils.instrumentation`. Defaults to None.
+    - table_size (int, optional): The maximum number of entries of the transposition table, 0 to search without one. Defaults to TABLE_SIZE.
+
+    Yields:
+    - tuple: (kind, payload) events, see `utils.search_trace`. Every iteration expands and pushes its cells again. The search stops after a FOUND or EXHAUSTED event, and stopping the iteration earlier stops the search.
+    """
+    grid = MazeGrid.from_maze(maze)
+    return _iterative_deepening(grid, lambda cell: 0, stats, table_size)
+
+
+def _iterative_deepening(grid, heuristic, stats, table_size):
+    """
+    Runs bounded depth-first searches with growing f-score bounds, yielding their events.
+    """
+    start, goal = grid.start, grid.goal
+    successors = grid.neighbor_lookup()
+    stack = []  # An iterator over the successors left to try for every cell of the path
+    push, pop, expand = stack.append, stack.pop, successors
+    if stats is not None:
+        push, pop, expand = stats.track(push, pop, successors)
+    on_path = memoryview(np.zeros(grid.cells.size, dtype=np.uint8))
+    table = OrderedDict()  # Fewest steps each cell was reached with in this iteration
+    num_explored = 0
+    bound = heuristic(start)
+    yield PUSH, start
+    if start == goal:
+        yield FOUND, ([grid.to_state(start)], num_explored)
+        return
+
+    while True:
+        exceeded = None  # The smallest f-score above the bound
+        table.clear()
+        path = [start]
+        on_path[start] = 1
+        num_explored += 1
+        yield EXPAND, start
+        push(iter(expand(start)))
+
+        while stack:
+            cell = next(stack[-1], None)
+            if cell is None:  # Every successor was tried, backtrack
+                pop()
+                on_path[path.pop()] = 0
+                continue
+            if on_path[cell]:
+                continue  # Cycle along the current path
+
+            g = len(path)
+            f = g + heuristic(cell)
+            if f > bound:
+                if exceeded is None or f < exceeded:
+                    exceeded = f
+                continue
+            if table_size:
+                if table.get(cell, g + 1) <= g:
+                    continue  # Already searched from this cell with as few steps
+                table[cell] = g
+                table.move_to_end(cell)
+                if len(table) > table_size:
+                    table.popitem(last=False)
+
+            yield PUSH, cell
+            if cell == goal:
+                path.append(cell)
+                yield FOUND, ([grid.to_state(step) for step in path], num_explored)
+                return
+
+            num_explored += 1
+            yield EXPAND, cell
+            path.append(cell)
+            on_path[cell] = 1
+            push(iter(expand(cell)))
+
+        if exceeded is None:
+            yield EXHAUSTED, num_explored
+            return
+        bound = exceeded
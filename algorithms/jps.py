@@ -0,0 +1,160 @@
+import heapq
+from functools import partial
+from itertools import count
+from utils.maze_grid import MazeGrid, WALL
+from utils.node_store import NodeStore
+from utils.search_trace import collect_search, EXPAND, PUSH, FOUND, EXHAUSTED
+from algorithms.a_star import manhattan_distance
+
+
+def jps_search(maze, stats=None):
+    """
+    Performs Jump Point Search (JPS), an A* search that only expands the jump points of a uniform-cost grid.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects counters of the search, see `utils.instrumentation`. The successors of a node are its jump points. Defaults to None.
+
+    Returns:
+    - path (list): A list of tuples representing the shortest sequence of positions from the start to the goal, with every cell between consecutive jump points filled in.
+    - num_explored (int): The number of jump points explored during the search.
+    - steps (SearchTrace): A trace of the search process that materializes a maze state for each step on demand.
+
+    Notes:
+    - On a 4-connected grid many shortest paths are symmetric: they only differ in the order of their moves. JPS keeps a single canonical path per symmetry class, in which vertical runs only turn horizontally where they are forced to, and horizontal runs may turn vertically at any cell.
+    - A horizontal jump moves along a row and stops at the goal or at a cell from which a vertical jump finds a jump point. A vertical jump moves along a column and stops at the goal or at a cell with a forced neighbor, i.e. an open side cell whose counterpart next to the previous cell is a wall.
+    - A node reached horizontally continues horizontally and jumps both ways vertically. A node reached vertically continues vertically and only jumps horizontally towards its forced neighbors. The start jumps in all four directions.
+    - The jump points are searched with A* using the Manhattan distance, and the cost between two jump points is the length of the straight segment between them, so the path is optimal. Among jump points with equal f-scores the deepest one is expanded first, which avoids expanding the many equally good jump points of open areas.
+    - This is a thin wrapper that records the events of `iter_jps_search` in a trace.
+    """
+    grid = MazeGrid.from_maze(maze)
+    return collect_search(iter_jps_search(grid, stats), grid)
+
+
+def iter_jps_search(maze, stats=None):
+    """
+    Performs Jump Point Search (JPS) on a maze, yielding the events of the search as it runs.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze as a MazeGrid, or as a 2D list or array where each element represents a cell in the maze.
+    - stats (SearchStats, optional): If given, collects counters of the search, see `utils.instrumentation`. The successors of a node are its jump points. Defaults to None.
+
+    Yields:
+    - tuple: (kind, payload) events, see `utils.search_trace`. Only jump points are expanded and pushed, and the path of the FOUND event has every cell between consecutive jump points filled in. The search stops after a FOUND or EXHAUSTED event, and stopping the iteration earlier stops the search.
+    """
+    grid = MazeGrid.from_maze(maze)
+    passable = bytes(grid.cells != WALL)
+    stride = grid.stride
+    start, goal = grid.start, grid.goal
+    goal_position = divmod(goal, stride)
+    nodes = NodeStore(grid)
+    nodes.add_root(start)
+    parent, cost = nodes.parent, nodes.cost
+    action, action_codes, offsets = nodes.action, nodes.action_codes, nodes.offsets
+
+    def vertical(cell, step):
+        # Jump along a column, stopping at the goal or at a forced neighbor
+        previous, cell = cell, cell + step
+        while passable[cell]:
+            if cell == goal:
+                return cell
+            if (passable[cell - 1] and not passable[previous - 1]) or (
+                passable[cell + 1] and not passable[previous + 1]
+            ):
+                return cell
+            previous, cell = cell, cell + step
+        return None
+
+    def horizontal(cell, step):
+        # Jump along a row, stopping where a vertical jump finds a jump point
+        cell += step
+        while passable[cell]:
+            if cell == goal:
+                return cell
+            if (
+                vertical(cell, stride) is not None
+                or vertical(cell, -stride) is not None
+            ):
+                return cell
+            cell += step
+        return None
+
+    def successors(cell):
+        if parent[cell] - 1 == cell:
+            moves = (1, -1, stride, -stride)
+        else:
+            step = offsets[action[cell]]  # The direction the cell was reached in
+            if abs(step) == 1:
+                moves = (step, stride, -stride)
+            else:
+                moves = [step]
+                for side in (1, -1):
+                    if passable[cell + side] and not passable[cell - step + side]:
+                        moves.append(side)
+        jumps = []
+        for step in moves:
+            jump = horizontal(cell, step) if abs(step) == 1 else vertical(cell, step)
+            if jump is not None:
+                jumps.append((step, jump))
+        return jumps
+
+    # Entries are ((f << cell_bits | size - g) << tie_bits | tie) << cell_bits | cell,
+    # so deeper jump points come first among equal f-scores
+    size = grid.cells.size
+    cell_bits = size.bit_length()
+    tie_bits, cell_mask = cell_bits + 2, (1 << cell_bits) - 1
+    ties = count(1)
+    frontier = [(size << tie_bits << cell_bits) | start]
+    push, pop = partial(heapq.heappush, frontier), partial(heapq.heappop, frontier)
+    jump_points = successors
+    if stats is not None:
+        push, pop, jump_points = stats.track(push, pop, successors, len(frontier))
+    explored = nodes.closed  # Closed set of expanded jump points
+    num_explored = 0
+    yield PUSH, start
+
+    while frontier:
+        current = pop() & cell_mask
+        if explored[current]:
+            if stats is not None:
+                stats.stale_pops += 1
+            continue  # Stale entry superseded by a cheaper push
+
+        if current == goal:
+            path = _fill_path(grid, nodes.path(current))
+            yield FOUND, (path, num_explored)
+            return
+
+        explored[current] = 1
+        num_explored += 1
+        yield EXPAND, current
+
+        for step, jump in jump_points(current):
+            if explored[jump]:
+                continue
+            distance = (jump - current) // step  # Cells between the jump points
+            g = cost[current] + distance
+            if not parent[jump] or g < cost[jump]:
+                parent[jump] = current + 1
+                cost[jump] = g
+                action[jump] = action_codes[step]
+                h = manhattan_distance(divmod(jump, stride), goal_position)
+                key = (g + h) << cell_bits | size - g
+                push((key << tie_bits | next(ties)) << cell_bits | jump)
+                yield PUSH, jump
+
+    yield EXHAUSTED, num_explored
+
+
+def _fill_path(grid, jump_points):
+    """
+    Expands a path of jump points into a path of adjacent cells.
+    """
+    cells = [jump_points[0]]
+    for target in jump_points[1:]:
+        delta = target - cells[-1]
+        step = (1 if delta > 0 else -1) * (
+            1 if abs(delta) < grid.stride else grid.stride
+        )
+        cells.extend(range(cells[-1] + step, target + step, step))
+    return [grid.to_state(cell) for cell in cells]
@@ -0,0 +1,112 @@
+"""
+Measures the cold start of headless search jobs and checks it against a time budget.
+
+Each measurement runs a fresh interpreter with `-X importtime`, imports a module and parses the
+cumulative import time that Python reports for it. It also checks that no heavy module such as
+pandas or matplotlib is imported along the way.
+
+The budget applies to the import time of the module without that of NumPy, which every headless job
+needs and which alone takes 70 to 120 ms depending on the machine. Measured this way, the repo's own
+modules and the standard library modules they pull in cost under 20 ms, so the budget leaves room for
+noise and still catches a regression such as the eager import of every algorithm module, which adds
+about 10 ms.
+
+Example usage:
+python -m benchmarks.import_time
+python -m benchmarks.import_time --budget-ms 10 --repeats 9 algorithms.bfs
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+# Modules that headless search jobs import
+HEADLESS_MODULES = ["data_collection.collect_metrics"]
+
+# Modules that must only be imported when they are used
+HEAVY_MODULES = ["pandas", "matplotlib"]
+
+# Modules every headless job needs, whose import time is not counted against the budget
+BASELINE_MODULES = ["numpy"]
+
+# Cold start budget of a headless module without its baseline modules, in milliseconds
+BUDGET_MS = 25
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import(module, repeats=5):
+    """
+    Measures the cumulative import time of a module in fresh interpreters.
+
+    Parameters:
+    - module (str): The dotted name of the module to import.
+    - repeats (int, optional): The number of fresh interpreters to measure. Defaults to 5.
+
+    Returns:
+    - times (list): The cumulative import time of the module in each interpreter, in milliseconds.
+    - baseline_times (list): The cumulative import time of the BASELINE_MODULES in each interpreter, in milliseconds.
+    - imported (set): The names of every module imported along the way.
+    """
+    times, baseline_times, imported = [], [], set()
+    for _ in range(repeats):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        # Lines look like "import time:   self [us] | cumulative | imported package"
+        baseline = 0
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "[us]" in line:
+                continue
+            _, cumulative, name = line[len("import time:") :].split("|")
+            imported.add(name.strip())
+            if name.strip() == module:
+                times.append(int(cumulative) / 1000)
+            elif name.strip() in BASELINE_MODULES:
+                baseline += int(cumulative)
+        baseline_times.append(baseline / 1000)
+    return times, baseline_times, imported
+
+
+def main():
+    """
+    Measures the headless modules and exits with status 1 if any of them is over budget or imports a heavy module.
+
+    The fastest of the repeated imports, without the import time of its baseline modules, is compared against the budget.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("modules", nargs="*", default=HEADLESS_MODULES)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        times, baseline_times, imported = measure_import(module, args.repeats)
+        own = [time - baseline for time, baseline in zip(times, baseline_times)]
+        best, median = min(own), statistics.median(own)
+        heavy = sorted(
+            name
+            for name in imported
+            if name.split(".")[0] in HEAVY_MODULES and "." not in name
+        )
+        over = best > args.budget_ms  # The minimum is the least noisy estimate
+        failed |= over or bool(heavy)
+        print(
+            f"{module}: min {best:.1f} ms, median {median:.1f} ms "
+            f"(budget {args.budget_ms:.0f} ms){' OVER BUDGET' if over else ''}, "
+            f"{statistics.median(times):.1f} ms with {', '.join(BASELINE_MODULES)}"
+        )
+        if heavy:
+            print(f"  imports heavy modules: {', '.join(heavy)}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Measures how the search algorithms scale with the maze size and obstacle density.
+
+For every density, size and algorithm of `DEFAULT_ALGORITHMS`, the benchmark runs a few warmup searches and then
+times each algorithm on `trials` fresh mazes with `time.perf_counter_ns`. It reports the median and
+percentile times, the number of nodes expanded per second, the peak memory allocated by one more search
+(run through its event generator, so that the peak does not include a trace of the search),
+and for every algorithm and density the scaling exponent k of a least-squares fit of time ~ cells^k over
+the sizes, where k = 1 is linear in the number of cells. An exponent well above 1 flags quadratic behavior
+before it ships. Together, the times and peak memories show the time/memory tradeoff of the algorithms,
+such as that of IDA* against A*.
+
+Sizes are measured in increasing order, and the larger sizes of an algorithm and density are skipped once
+a median time exceeds the time budget, so slow algorithms do not hold up the sweep.
+
+The results are written as JSON, by default to "scaling_results.json" next to "search_results.csv".
+
+Example usage:
+python -m benchmarks.scaling
+python -m benchmarks.scaling --sizes 10 100 1000 --densities 0.2 --algorithms BFS A* --trials 5
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from data_collection.collect_metrics import ALGORITHMS, DEFAULT_ALGORITHMS
+from utils.maze_generation import generate_mazes
+from utils.search_trace import collect_search
+
+SIZES = [10, 40, 160, 640, 1000, 2000, 4000]
+DENSITIES = [0.0, 0.15, 0.3, 0.45]
+PERCENTILES = [10, 50, 90, 99]
+
+# Exponents above this are reported as superlinear
+SUPERLINEAR_EXPONENT = 1.3
+
+OUTPUT_FILE = os.path.join(
+    os.path.dirname(os.path.abspath("search_results.csv")), "scaling_results.json"
+)
+
+
+def time_search(algorithm, maze):
+    """
+    Times a single search.
+
+    Parameters:
+    - algorithm (function): The search algorithm.
+    - maze (np.array): The maze to solve.
+
+    Returns:
+    - elapsed (int): The time taken by the search, in nanoseconds.
+    - num_explored (int): The number of nodes expanded by the search.
+    - solved (bool): Whether the search found a path.
+    """
+    enabled = gc.isenabled()
+    gc.disable()  # Keeps collections of earlier garbage out of the timing
+    try:
+        start = time.perf_counter_ns()
+        path, num_explored, _ = algorithm(maze)
+        elapsed = time.perf_counter_ns() - start
+    finally:
+        if enabled:
+            gc.enable()
+    return elapsed, num_explored, path is not None
+
+
+def peak_memory(algorithm, maze):
+    """
+    Measures the peak memory allocated by a single search.
+
+    Parameters:
+    - algorithm (function): The search algorithm.
+    - maze (np.array): The maze to solve.
+
+    Returns:
+    - int: The peak number of bytes allocated by Python and NumPy during the search, including the grid of the maze but not a trace of the search.
+
+    The search runs under `tracemalloc`, which slows it down, so it is kept apart from the timed searches. It runs
+    the event generator of the algorithm, e.g. `iter_bfs_search` for `bfs_search`, without recording a trace,
+    which would grow with the number of events and hide the memory of the search itself.
+    """
+    module = sys.modules[algorithm.__module__]
+    events = getattr(module, f"iter_{algorithm.__name__}")
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    try:
+        collect_search(events(maze))
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+
+def measure(name, size, density, trials=5, warmup=2, seed=0, memory=True):
+    """
+    Measures one algorithm on mazes of one size and density.
+
+    Parameters:
+    - name (str): The name of the algorithm in `ALGORITHMS`.
+    - size (int): The size of the mazes (size x size).
+    - density (float): The density of obstacles in the mazes.
+    - trials (int, optional): The number of timed searches, each on a different maze. Defaults to 5.
+    - warmup (int, optional): The number of untimed searches run first. Defaults to 2.
+    - seed (int, optional): The seed of the mazes. Every algorithm gets the same mazes for the same seed, size and density. Defaults to 0.
+    - memory (bool, optional): Whether to measure the peak memory of one more search, on a separate maze. Defaults to True.
+
+    Returns:
+    - dict: The measurement, with the times in seconds and the peak memory in bytes (None if not measured).
+    """
+    algorithm = ALGORITHMS[name]
+    mazes = generate_mazes(
+        trials + min(warmup, 1) + memory,
+        size,
+        density,
+        seed=[seed, size, round(density * 1000)],
+    )
+    for _ in range(warmup):
+        # A separate maze, so that caches warmed up here do not serve the timed searches
+        time_search(algorithm, mazes[trials])
+
+    times, explored, solved = [], [], 0
+    for maze in mazes[:trials]:
+        elapsed, num_explored, found = time_search(algorithm, maze)
+        times.append(elapsed)
+        explored.append(num_explored)
+        solved += found
+    # The last maze, so that the distance cache misses as it does in the timed searches
+    peak = peak_memory(algorithm, mazes[-1]) if memory else None
+
+    times = np.array(times) / 1e9
+    median = float(np.median(times))
+    return {
+        "algorithm": name,
+        "size": size,
+        "density": density,
+        "cells": size * size,
+        "trials": trials,
+        "median_seconds": median,
+        "percentile_seconds": {
+            str(q): float(value)
+            for q, value in zip(PERCENTILES, np.percentile(times, PERCENTILES))
+        },
+        "mean_nodes_expanded": float(np.mean(explored)),
+        "nodes_per_second": float(np.sum(explored) / max(np.sum(times), 1e-12)),
+        "solved": solved,
+        "peak_memory_bytes": peak,
+    }
+
+
+def fit_exponent(measurements):
+    """
+    Fits the scaling exponent of a series of measurements.
+
+    Parameters:
+    - measurements (list): Measurements of one algorithm and density at increasing sizes.
+
+    Returns:
+    - float: The slope k of the least-squares line through log(median time) against log(cells), or None with fewer than two sizes.
+    """
+    if len(measurements) < 2:
+        return None
+    cells = np.log([m["cells"] for m in measurements])
+    seconds = np.log([max(m["median_seconds"], 1e-9) for m in measurements])
+    return float(np.polyfit(cells, seconds, 1)[0])
+
+
+def run_scaling_benchmark(
+    sizes=SIZES,
+    densities=DENSITIES,
+    algorithms=None,
+    trials=5,
+    warmup=2,
+    budget=2.0,
+    seed=0,
+    verbose=True,
+    memory=True,
+):
+    """
+    Sweeps the algorithms over the sizes and densities.
+
+    Parameters:
+    - sizes (list, optional): The maze sizes, measured in increasing order. Defaults to SIZES.
+    - densities (list, optional): The obstacle densities. Defaults to DENSITIES.
+    - algorithms (list, optional): The names of the algorithms. Defaults to DEFAULT_ALGORITHMS, which leaves out IDDFS.
+    - trials (int, optional): The number of timed searches per measurement. Defaults to 5.
+    - warmup (int, optional): The number of untimed searches per measurement. Defaults to 2.
+    - budget (float, optional): Once the median time of an algorithm and density exceeds this many seconds, its larger sizes are skipped. Defaults to 2.
+    - seed (int, optional): The seed of the mazes. Defaults to 0.
+    - verbose (bool, optional): Whether to print every measurement as it completes. Defaults to True.
+    - memory (bool, optional): Whether to measure the peak memory of a search for every measurement. Defaults to True.
+
+    Returns:
+    - dict: The report, with the measurements, the fitted exponents and the skipped configurations.
+    """
+    algorithms = DEFAULT_ALGORITHMS if algorithms is None else list(algorithms)
+    measurements, exponents, skipped = [], [], []
+    for density in densities:
+        for name in algorithms:
+            series = []
+            for size in sorted(sizes):
+                if series and series[-1]["median_seconds"] > budget:
+                    skipped.append(
+                        {"algorithm": name, "size": size, "density": density}
+                    )
+                    continue
+                measurement = measure(name, size, density, trials, warmup, seed, memory)
+                series.append(measurement)
+                if verbose:
+                    peak = measurement["peak_memory_bytes"]
+                    print(
+                        f"{name:>18} size {size:>5} density {density:.2f}: "
+                        f"median {measurement['median_seconds'] * 1e3:10.3f} ms, "
+                        f"{measurement['nodes_per_second']:12.0f} nodes/s"
+                        + ("" if peak is None else f", peak {peak / 2**20:9.2f} MiB")
+                    )
+            exponent = fit_exponent(series)
+            exponents.append(
+                {
+                    "algorithm": name,
+                    "density": density,
+                    "exponent": exponent,
+                    "superlinear": exponent is not None
+                    and exponent > SUPERLINEAR_EXPONENT,
+                }
+            )
+            measurements.extend(series)
+
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "trials": trials,
+        "warmup": warmup,
+        "budget_seconds": budget,
+        "seed": seed,
+        "measurements": measurements,
+        "exponents": exponents,
+        "skipped": skipped,
+    }
+
+
+def main():
+    """
+    Runs the scaling benchmark with the command line options and saves the report as JSON.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--densities", type=float, nargs="+", default=DENSITIES)
+    parser.add_argument("--algorithms", nargs="+", choices=list(ALGORITHMS))
+    parser.add_argument("--trials", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--budget", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--no-memory",
+        dest="memory",
+        action="store_false",
+        help="skip the peak memory measurements",
+    )
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    report = run_scaling_benchmark(
+        args.sizes,
+        args.densities,
+        args.algorithms,
+        args.trials,
+        args.warmup,
+        args.budget,
+        args.seed,
+        memory=args.memory,
+    )
+    print()
+    for entry in report["exponents"]:
+        if entry["exponent"] is not None:
+            flag = "  SUPERLINEAR" if entry["superlinear"] else ""
+            print(
+                f"{entry['algorithm']:>18} density {entry['density']:.2f}: "
+                f"time ~ cells^{entry['exponent']:.2f}{flag}"
+            )
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,29 +2,99 @@
 Ipoort the necessary libraries and modules
 time - This module provides various time-related functions.
 os - This module provides a way of using operating system dependent functionality.
-pandas - This module provides data structures and data analysis tools.
-dfs_search - This module contains the implementation of the depth-first search algorithm.
-bfs_search - This module contains the implementation of the breadth-first search algorithm.
-a_star_search - This module contains the implementation of the A* search algorithm.
-generate_maze - This module contains the function to generate a random maze.
-animate_search_process - This module contains the function to visualize the search process.
+lru_cache - This decorator caches the results of a function.
+islice - This function takes a bounded slice of an iterator.
+deque - This class holds the chunks of jobs in flight.
+Mapping - This abstract class is the base of the lazy table of algorithms.
+import_module - This function imports the module of an algorithm on first use.
+numpy - This module provides seed sequences for deterministic per-run seeds.
+generate_mazes - This module contains the function to generate a batch of random mazes.
+SearchStats, STATS_COLUMNS - This module contains the observer that collects counters from a search.
+is_solvable - This module tells whether the start and goal of a maze are connected, without searching.
+
+ProcessPoolExecutor (which imports multiprocessing), pandas and the 'animate_search_process' function of 'visualization.animate_search' are only imported when they are used, so that headless search jobs start quickly. Matplotlib is only imported to display animations. Likewise, the module of every search algorithm is only imported when the algorithm is first looked up in 'ALGORITHMS', 'SearchTrace' when a search is skipped by the precheck, and the result cache of 'data_collection.result_cache' when a cache is given.
 """
 
 import time
 import os
-import pandas as pd
-from algorithms.dfs import dfs_search
-from algorithms.bfs import bfs_search
-from algorithms.a_star import a_star_search
-from utils.maze_generation import generate_maze
-from visualization.animate_search import (
-    animate_search_process,
-)
+from functools import lru_cache
+from itertools import islice
+from collections import deque
+from collections.abc import Mapping
+from importlib import import_module
+import numpy as np
+from utils.maze_generation import generate_mazes
+from utils.instrumentation import SearchStats, STATS_COLUMNS
+from utils.connectivity import is_solvable
 
 OUTPUT_FOLDER = "search_videos"
 
 
-def run_search_algorithms(runs, size, density, visualize, save_animation):
+class _LazyAlgorithms(Mapping):
+    """
+    A read-only mapping from the names of the algorithms to their search functions, which imports the module of a function the first time it is looked up.
+    """
+
+    def __init__(self, paths):
+        self._paths = paths
+        self._functions = {}
+
+    def __getitem__(self, name):
+        function = self._functions.get(name)
+        if function is None:
+            module, attribute = self._paths[name]
+            function = self._functions[name] = getattr(import_module(module), attribute)
+        return function
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
+
+
+# Algorithms compared by 'run_search_algorithms', by display name
+ALGORITHMS = _LazyAlgorithms(
+    {
+        "DFS": ("algorithms.dfs", "dfs_search"),
+        "BFS": ("algorithms.bfs", "bfs_search"),
+        "A*": ("algorithms.a_star", "a_star_search"),
+        "Wavefront BFS": ("algorithms.bfs_wavefront", "wavefront_bfs_search"),
+        "Bidirectional BFS": ("algorithms.bidirectional", "bidirectional_bfs_search"),
+        "Bidirectional A*": (
+            "algorithms.bidirectional",
+            "bidirectional_a_star_search",
+        ),
+        "JPS": ("algorithms.jps", "jps_search"),
+        "Distance Cache": ("algorithms.distance_cache", "distance_cache_search"),
+        "IDA*": ("algorithms.iterative_deepening", "ida_star_search"),
+        "IDDFS": ("algorithms.iterative_deepening", "iddfs_search"),
+        "HPA*": ("algorithms.hpa_star", "hpa_star_search"),
+        "D* Lite": ("algorithms.d_star_lite", "d_star_lite_search"),
+    }
+)
+
+# Algorithms run by default, IDDFS takes seconds on mazes the others solve in milliseconds
+DEFAULT_ALGORITHMS = [name for name in ALGORITHMS if name != "IDDFS"]
+
+
+def run_search_algorithms(
+    runs,
+    size,
+    density,
+    visualize,
+    save_animation,
+    workers=1,
+    chunksize=None,
+    seed=None,
+    as_dataframe=True,
+    trace_folder=None,
+    sink=None,
+    instrument=False,
+    precheck=False,
+    cache=None,
+    algorithms=None,
+):
     """
     Runs multiple search algorithms on randomly generated mazes and returns the results as a pandas DataFrame.
 
@@ -34,70 +104,228 @@ def run_search_algorithms(runs, size, density, visualize, save_animation):
     - density (float): The density of obstacles in the maze, between 0 and 1. Defaults to 0.2.
     - visualize (bool): Whether to visualize the search process. Defaults to True.
     - save_animation (bool): Whether to save the animation as a video file. Defaults to True.
+    - workers (int, optional): The number of worker processes. With 1 (the default) everything runs in the current process, with None one worker per CPU is used.
+    - chunksize (int, optional): The number of (run, algorithm) jobs sent to a worker at a time. Defaults to a multiple of the number of algorithms, so that the jobs of a run stay together.
+    - seed (int, optional): The seed from which the per-run maze seeds are derived. Runs with the same seed use the same mazes, whatever the number of workers. Defaults to None (fresh mazes every time).
+    - trace_folder (str, optional): If given, the trace of every (run, algorithm) search is saved to this folder as "<algorithm>_search_run_<run>.npz", to be rendered later with `visualization.render_traces`. Defaults to None (no trace files).
+    - instrument (bool, optional): Whether to collect the counters of every search with a `SearchStats` observer and add them to the rows as the columns of `STATS_COLUMNS`. The counters cost a little time, which is included in the execution time. Defaults to False.
+    - precheck (bool, optional): Whether to check that the start and goal of every maze are connected before running the algorithms, see `utils.connectivity`. The algorithms are not run on unsolvable mazes, whose rows get the "Fail" status with no nodes expanded and the time of the check as execution time. Defaults to False.
+    - cache (ResultCache, optional): If given, the result of every (maze, algorithm) pair is looked up in this on-disk cache before searching, and stored in it after a fresh search, see `data_collection.result_cache`. The rows get a "Cached" column, and cached rows have no execution time (nor successor time), so that averages only cover fresh measurements. Traces and animations need a fresh search, so the cache is not used when they are asked for. Pass FIELDNAMES + ["Cached"] as the fieldnames of a sink to keep the column. Defaults to None.
+    - algorithms (list, optional): The names of the algorithms to run, from `ALGORITHMS`. Defaults to DEFAULT_ALGORITHMS, which leaves out IDDFS.
+    - sink (ResultsSink, optional): If given, every result row is appended to this sink as soon as it completes instead of being kept in memory, and the (run, algorithm) pairs already recorded in it are skipped, see `data_collection.results_sink`. Defaults to None.
+    - as_dataframe (bool, optional): Whether to return the results as a pandas DataFrame. With False, the rows are returned as a list of dictionaries and pandas is never imported. Defaults to True.
 
     Returns:
-    - pd.DataFrame: A DataFrame containing the results of each run and algorithm, including the run number, algorithm name, solution path length, number of nodes expanded, execution time, and status.
+    - pd.DataFrame: A DataFrame containing the results of each run and algorithm, including the run number, algorithm name, solution path length, number of nodes expanded, execution time, and status. A list of row dictionaries with the same keys if 'as_dataframe' is False, and None if a sink is given.
 
     The 'run_search_algorithms' function runs multiple search algorithms on randomly generated mazes. It takes the number of runs, maze size, obstacle density, visualization flag, and save animation flag as input parameters. The function returns the results of each run and algorithm as a pandas DataFrame.
 
-    For each run, the function generates a random maze using the 'generate_maze' function. It then iterates over a dictionary of algorithms, which includes the names and corresponding functions. For each algorithm, it measures the execution time and number of nodes expanded during the search. If the visualization flag is set to True, it calls the 'animate_search_process' function to visualize the search process and save the animation if the save animation flag is also True. The results of each run and algorithm are appended to a list, which is then converted to a pandas DataFrame and returned.
+    For each run, the function derives a maze seed from 'seed' and generates a random maze with the 'generate_mazes' function. It then runs every algorithm of 'algorithms', looked up in the 'ALGORITHMS' dictionary that maps the names of the algorithms to their functions, exactly once on that maze, measuring the execution time and number of nodes expanded during the search. If the visualization flag is set to True, it calls the 'animate_search_process' function to visualize the search process and save the animation if the save animation flag is also True, converting the frames of the search only once for both.
+
+    Rendering videos inline makes every job wait on the encoder. Passing a trace folder instead of setting the visualization flags keeps the searches and their timings independent of rendering: the traces are written after the timed search, and can be rendered into videos in parallel later, as many times as needed.
+
+    With a sink, memory use does not grow with the number of runs: jobs are generated lazily, at most a bounded window of them is in flight, and rows are handed to the sink as they complete. Rerunning an interrupted sweep with the same seed and the same sink file resumes it.
+
+    With more than one worker, the (run, algorithm) jobs are fanned out over a process pool. Each worker regenerates the maze of a run from its seed, so the results match a serial sweep with the same seed. Animations can only be displayed from the main process, so workers only save them. The rows are returned in (run, algorithm) order either way.
 
     Example usage:
     results = run_search_algorithms(runs=5, size=20, density=0.3, visualize=True, save_animation=True)
     print(results)
     """
-    # Create an empty list to store the results
-    results = []
+    algorithms = DEFAULT_ALGORITHMS if algorithms is None else list(algorithms)
+    unknown = [name for name in algorithms if name not in ALGORITHMS]
+    if unknown:
+        raise ValueError(f"unknown algorithms: {unknown}")
+    root_seed = np.random.SeedSequence(seed)
+    if trace_folder is not None:
+        os.makedirs(trace_folder, exist_ok=True)
+    cache_spec = None if cache is None else (cache.folder, cache.max_bytes)
+    jobs = (
+        (
+            run_number,
+            name,
+            run_seed,
+            size,
+            density,
+            trace_folder,
+            instrument,
+            precheck,
+            cache_spec,
+        )
+        for run_number, run_seed in _run_seeds(root_seed, runs)
+        for name in algorithms
+        if sink is None or (run_number, name) not in sink.completed
+    )
+
+    if workers == 1:
+        options = (visualize, visualize and save_animation)
+        rows = (_run_job(job + options) for job in jobs)
+    else:
+        workers = workers or os.cpu_count()
+        if chunksize is None:
+            chunksize = len(algorithms) * max(1, min(runs // (workers * 4), 64))
+        options = (False, visualize and save_animation)
+        rows = _run_jobs_in_pool((job + options for job in jobs), workers, chunksize)
+
+    if sink is not None:
+        for row in rows:
+            sink.write(row)
+        sink.flush()
+        return None
+
+    results = list(rows)
+    if not as_dataframe:
+        return results
+    import pandas as pd
+
+    return pd.DataFrame(results)
 
+
+def _run_seeds(root_seed, runs):
+    """
+    Yields the run numbers and maze seeds of the runs, as spawned children of the root seed sequence.
+    """
     for run_number in range(1, runs + 1):
-        maze = generate_maze(size, density)
-
-        algorithms = {
-            "DFS": dfs_search,
-            "BFS": bfs_search,
-            "A*": a_star_search,
-        }
-        # Run each algorithm and measure the execution time
-        for name, algorithm in algorithms.items():
-            start_time = time.time()
-            solution, nodes_expanded, steps = algorithm(maze)
-            execution_time = time.time() - start_time
-            status = "Pass" if solution else "Fail"
-            solution_path_length = len(solution) if solution else 0
+        # The same child as root_seed.spawn(runs)[run_number - 1], built on demand
+        child = np.random.SeedSequence(
+            root_seed.entropy,
+            spawn_key=root_seed.spawn_key + (run_number - 1,),
+            pool_size=root_seed.pool_size,
+        )
+        yield run_number, int(child.generate_state(1)[0])
+
+
+def _run_jobs_in_pool(jobs, workers, chunksize):
+    """
+    Runs jobs on a process pool in chunks and yields their result rows in order, with at most two chunks per worker in flight.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        while True:
+            while len(pending) < 2 * workers:
+                chunk = list(islice(jobs, chunksize))
+                if not chunk:
+                    break
+                pending.append(executor.submit(_run_chunk, chunk))
+            if not pending:
+                break
+            yield from pending.popleft().result()
+
+
+def _run_chunk(jobs):
+    """
+    Runs a chunk of jobs in a worker process and returns their result rows.
+    """
+    return [_run_job(job) for job in jobs]
+
+
+def _run_job(job):
+    """
+    Runs one algorithm once on the maze of one run and returns its result row.
+    """
+    (
+        run_number,
+        name,
+        maze_seed,
+        size,
+        density,
+        trace_folder,
+        instrument,
+        precheck,
+        cache_spec,
+        display,
+        save,
+    ) = job
+    maze = _run_maze(maze_seed, size, density)
+    algorithm = ALGORITHMS[name]
+    stats = SearchStats() if instrument else None
+
+    # Look the result up in the cache, which cannot replay traces and animations
+    cache, cached = None, None
+    if cache_spec is not None and trace_folder is None and not (display or save):
+        from data_collection.result_cache import (
+            ResultCache,
+            algorithm_version,
+            open_cache,
+        )
+
+        cache = open_cache(*cache_spec)
+        key = ResultCache.key(maze, name, algorithm_version(algorithm))
+        cached = cache.get(key)
+        if cached is not None and instrument and cached["counters"] is None:
+            cached = None  # Stored without the counters asked for now
+
+    if cached is not None:
+        solution, nodes_expanded = cached["path"], cached["num_explored"]
+        execution_time = None  # Not measured, so not averaged with fresh measurements
+    else:
+        # Run the algorithm and measure the execution time, skipping it if the goal cannot be reached
+        start_time = time.perf_counter()
+        skipped = precheck and not _run_solvable(maze_seed, size, density)
+        if skipped:
+            from utils.search_trace import SearchTrace
+
+            solution, nodes_expanded, steps = None, 0, SearchTrace(maze)
+        elif instrument:
+            solution, nodes_expanded, steps = algorithm(maze, stats=stats)
+        else:
             solution, nodes_expanded, steps = algorithm(maze)
+        execution_time = time.perf_counter() - start_time
+        if cache is not None and not skipped:
+            counters = stats.as_row() if instrument else None
+            cache.put(key, solution, nodes_expanded, counters)
+    status = "Pass" if solution else "Fail"
+    solution_path_length = len(solution) if solution else 0
 
-            # Visualize the search process
-            if visualize:
-                animation_filename = f"{name}_search_animation_run_{run_number}.mp4"
-                animate_search_process(
-                    steps,
-                    name,
-                    save_animation=False,
-                    filename=animation_filename,
-                )
-            # Save the animation if the save_animation flag is set to True
-            if visualize and save_animation:
-                filename = os.path.join(
-                    OUTPUT_FOLDER, f"{name}_search_run_{run_number}.mp4"
-                )
-
-                # Create the output folder if it does not exist
-                animate_search_process(
-                    steps, algorithm, save_animation=True, filename=filename
-                )
-
-            results.append(
-                {
-                    "Run": run_number,
-                    "Algorithm": name,
-                    "Solution Path Length": solution_path_length,
-                    "Nodes Expanded": nodes_expanded,
-                    "Execution Time": execution_time,
-                    "Status": status,
-                }
-            )
+    if trace_folder is not None:
+        steps.save(os.path.join(trace_folder, f"{name}_search_run_{run_number}.npz"))
 
-    return pd.DataFrame(results)
+    # Visualize the search process and save the animation if requested, rendering the frames once
+    if display or save:
+        from visualization.animate_search import animate_search_process
+
+        filename = os.path.join(OUTPUT_FOLDER, f"{name}_search_run_{run_number}.mp4")
+        if save:
+            # Create the output folder if it does not exist
+            os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+        animate_search_process(
+            steps, name, save_animation=save, filename=filename, display=display
+        )
+
+    row = {
+        "Run": run_number,
+        "Algorithm": name,
+        "Solution Path Length": solution_path_length,
+        "Nodes Expanded": nodes_expanded,
+        "Execution Time": execution_time,
+        "Status": status,
+    }
+    if cache_spec is not None:
+        row["Cached"] = cached is not None
+    if instrument:
+        if cached is not None:
+            row.update(cached["counters"], **{"Successor Time": None})
+        else:
+            row.update(stats.as_row())
+    return row
+
+
+@lru_cache(maxsize=1)
+def _run_maze(maze_seed, size, density):
+    """
+    Generates the maze of a run, reusing it for consecutive jobs of the same run.
+    """
+    return generate_mazes(1, size, density, seed=maze_seed)[0]
+
+
+@lru_cache(maxsize=1)
+def _run_solvable(maze_seed, size, density):
+    """
+    Checks whether the maze of a run is solvable, once for all the jobs of the run.
+    """
+    return is_solvable(_run_maze(maze_seed, size, density))
 
 
 def summarize_results(results_df):
@@ -108,7 +336,7 @@ def summarize_results(results_df):
     - results_df (pd.DataFrame): A DataFrame containing the results of each run and algorithm, including the run number, algorithm name, solution path length, number of nodes expanded, execution time, and status.
 
     Returns:
-    - pd.DataFrame: A DataFrame containing the summarized results, including the average metrics for each algorithm and the total number of fails.
+    - pd.DataFrame: A DataFrame containing the summarized results, including the average metrics for each algorithm (and the average search counters, if the results have them) and the total number of fails.
 
     The 'summarize_results' function takes a DataFrame of search algorithm results as input and calculates the average metrics for each algorithm, including the solution path length, number of nodes expanded, and execution time. It also calculates the total number of fails for each algorithm. The function returns a DataFrame containing the summarized results.
 
@@ -118,16 +346,14 @@ def summarize_results(results_df):
     summarized_results = summarize_results(results_df)
     print(summarized_results)
     """
-    # Calculate average metrics for each algorithm
+    import pandas as pd
+
+    # Calculate average metrics for each algorithm, including the search counters if they were collected
+    metrics = ["Solution Path Length", "Nodes Expanded", "Execution Time"]
+    metrics += [column for column in STATS_COLUMNS if column in results_df]
     summary_avg = (
         results_df.groupby("Algorithm")
-        .agg(
-            {
-                "Solution Path Length": "mean",
-                "Nodes Expanded": "mean",
-                "Execution Time": "mean",
-            }
-        )
+        .agg({metric: "mean" for metric in metrics})
         .reset_index()
     )
 
@@ -0,0 +1,220 @@
+"""
+This module contains the `ResultCache` class, a content-addressed on-disk cache of search results.
+
+A result is keyed by a hash of the cell markings of the maze (start and goal included), the name of the
+algorithm and its version, so re-running a sweep on the same mazes does not search them again. Every
+entry is a small uncompressed .npz file holding the path as an int32 array, the number of nodes explored
+and, if they were collected, the search counters.
+
+The cache can be shared by several processes:
+- Entries are written to a temporary file and renamed into place, so readers never see a partial entry,
+  and two processes writing the same entry both write the same result.
+- Reading an entry touches its modification time, which makes the modification times an LRU order.
+- When a process estimates that the cache exceeds its size budget, it lists the entries and deletes the
+  least recently used ones. Entries deleted by another process in the meantime are skipped.
+
+Example usage:
+cache = ResultCache("result_cache")
+results = run_search_algorithms(runs=10, size=20, density=0.2, visualize=False, save_animation=False, cache=cache)
+"""
+
+import hashlib
+import inspect
+import os
+import sys
+from functools import lru_cache
+
+import numpy as np
+
+from utils.maze_grid import MazeGrid
+from utils.instrumentation import STATS_COLUMNS
+
+# Default folder and size budget of the cache
+CACHE_FOLDER = "result_cache"
+MAX_BYTES = 512 * 2**20
+
+# Eviction deletes entries until the cache is back under this fraction of its budget
+EVICT_TO = 0.9
+
+# Version of the entry files, part of every key
+FORMAT_VERSION = 1
+
+
+class ResultCache:
+    """
+    A size-bounded LRU cache of search results, stored as one file per result in a folder.
+
+    Attributes:
+        folder (str): The folder of the cache, with one subfolder per first two hex digits of the keys.
+        max_bytes (int): The size budget of the cache files, in bytes.
+    """
+
+    def __init__(self, folder=CACHE_FOLDER, max_bytes=MAX_BYTES):
+        """
+        Opens a cache, creating its folder if needed.
+
+        Args:
+            folder (str, optional): The folder of the cache. Defaults to CACHE_FOLDER.
+            max_bytes (int, optional): The size budget of the cache files, in bytes. Defaults to 512 MiB.
+        """
+        self.folder = folder
+        self.max_bytes = max_bytes
+        os.makedirs(folder, exist_ok=True)
+        self._bytes_estimate = sum(size for _, _, size in self._entries())
+
+    @staticmethod
+    def key(maze, name, version):
+        """
+        Returns the key of the result of an algorithm on a maze.
+
+        Args:
+            maze (MazeGrid or list of lists): The maze.
+            name (str): The name of the algorithm.
+            version (str): The version of the algorithm, see `algorithm_version`.
+
+        Returns:
+            str: A hexadecimal digest of the maze cells, start and goal included, the name and the version.
+        """
+        grid = MazeGrid.from_maze(maze)
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(
+            np.array(grid.shape + (FORMAT_VERSION,), dtype=np.int64).tobytes()
+        )
+        digest.update(np.ascontiguousarray(grid.cells).tobytes())
+        digest.update(f"\0{name}\0{version}".encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """
+        Reads a cached result and marks it as recently used.
+
+        Args:
+            key (str): The key of the result.
+
+        Returns:
+            dict: The "path" as a list of (x, y) positions or None, the "num_explored" count and the "counters" as a dict keyed by `STATS_COLUMNS` or None, or None if the result is not cached.
+        """
+        filename = self._filename(key)
+        try:
+            with np.load(filename) as data:
+                path = data["path"].tolist() if data["has_path"] else None
+                counters = data["counters"].tolist() if data["counters"].size else None
+                num_explored = int(data["num_explored"])
+            os.utime(filename)
+        except (FileNotFoundError, ValueError, KeyError, OSError):
+            return None  # Missing, evicted meanwhile or unreadable
+        return {
+            "path": None if path is None else [tuple(state) for state in path],
+            "num_explored": num_explored,
+            "counters": (
+                None if counters is None else dict(zip(STATS_COLUMNS, counters))
+            ),
+        }
+
+    def put(self, key, path, num_explored, counters=None):
+        """
+        Stores a result, evicting the least recently used results if the cache exceeds its budget.
+
+        Args:
+            key (str): The key of the result.
+            path (list): The path as a list of (x, y) positions, or None.
+            num_explored (int): The number of nodes explored.
+            counters (dict, optional): The search counters, keyed by `STATS_COLUMNS`. Defaults to None.
+        """
+        filename = self._filename(key)
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        temporary = f"{filename}.{os.getpid()}.tmp.npz"
+        np.savez(
+            temporary,
+            path=np.array(path or [], dtype=np.int32).reshape(-1, 2),
+            has_path=path is not None,
+            num_explored=num_explored,
+            counters=np.array(
+                [] if counters is None else [counters[c] for c in STATS_COLUMNS],
+                dtype=np.float64,
+            ),
+        )
+        self._bytes_estimate += os.path.getsize(temporary)
+        os.replace(temporary, filename)
+        if self._bytes_estimate > self.max_bytes:
+            self.evict()
+
+    def evict(self, max_bytes=None):
+        """
+        Deletes the least recently used results until the cache is under a fraction of its budget.
+
+        Args:
+            max_bytes (int, optional): The budget to evict to instead of EVICT_TO times `max_bytes`. Defaults to None.
+        """
+        target = EVICT_TO * self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        for filename, _, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(filename)
+            except FileNotFoundError:
+                pass  # Evicted by another process
+            total -= size
+        self._bytes_estimate = total
+
+    def clear(self):
+        """
+        Deletes every cached result.
+        """
+        self.evict(max_bytes=0)
+
+    def _filename(self, key):
+        """
+        Returns the path of the file of a key.
+        """
+        return os.path.join(self.folder, key[:2], f"{key}.npz")
+
+    def _entries(self):
+        """
+        Yields the (filename, last use time, size) of every cached result.
+        """
+        for subfolder in os.scandir(self.folder):
+            if not subfolder.is_dir():
+                continue
+            for entry in os.scandir(subfolder.path):
+                if entry.name.endswith(".npz") and ".tmp" not in entry.name:
+                    try:
+                        status = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    yield entry.path, status.st_mtime, status.st_size
+
+
+@lru_cache(maxsize=None)
+def algorithm_version(function):
+    """
+    Returns the version of an algorithm, a hash of the source code of the module that defines it.
+
+    Parameters:
+    - function (function): The search function of the algorithm.
+
+    Returns:
+    - version (str): A short hexadecimal digest that changes whenever the module of the algorithm is edited, so stale results are never read back. Changes to shared modules such as `utils.maze_grid` are not detected; clear the cache after them.
+    """
+    try:
+        source = inspect.getsource(sys.modules[function.__module__])
+    except (OSError, TypeError, KeyError):
+        source = function.__qualname__
+    return hashlib.blake2b(source.encode(), digest_size=8).hexdigest()
+
+
+@lru_cache(maxsize=4)
+def open_cache(folder, max_bytes):
+    """
+    Opens a cache once per process, e.g. in the worker processes of a sweep.
+
+    Parameters:
+    - folder (str): The folder of the cache.
+    - max_bytes (int): The size budget of the cache files, in bytes.
+
+    Returns:
+    - cache (ResultCache): The cache.
+    """
+    return ResultCache(folder, max_bytes)
@@ -0,0 +1,281 @@
+"""
+This module contains result sinks, which append the result rows of a benchmark sweep to a file as they complete.
+
+A sink keeps only a small buffer of rows in memory and flushes it to disk every `flush_every` rows or
+`flush_interval` seconds, so a crash loses at most the last few rows. When a sink is opened on an
+existing file, the (run, algorithm) pairs already recorded are loaded into `completed`, which lets
+`run_search_algorithms` resume an interrupted sweep by skipping them.
+
+Two formats are supported:
+- `CSVResultsSink` appends rows to a CSV file with the csv module.
+- `ParquetResultsSink` writes each flushed chunk of rows as a Parquet file in a folder. It needs pyarrow, which is imported only when such a sink is opened.
+
+Example usage:
+with open_results_sink("sweep_rows.csv") as sink:
+    run_search_algorithms(runs=10000, size=20, density=0.2, visualize=False, save_animation=False, sink=sink)
+results_df = load_results("sweep_rows.csv")
+"""
+
+import csv
+import glob
+import os
+import time
+from abc import ABC, abstractmethod
+
+# Columns of the result rows produced by `run_search_algorithms`
+FIELDNAMES = [
+    "Run",
+    "Algorithm",
+    "Solution Path Length",
+    "Nodes Expanded",
+    "Execution Time",
+    "Status",
+]
+
+# Number of bytes read at a time when looking for the last complete row of a CSV file
+TAIL_BYTES = 4096
+
+
+class ResultsSink(ABC):
+    """
+    The base class of the result sinks, which buffers rows and flushes them periodically.
+
+    Attributes:
+        filename (str): The file or folder the rows are written to.
+        fieldnames (list): The columns of the rows, in order.
+        completed (set): The (run, algorithm) pairs recorded so far, including those found in the file when it was opened.
+        flush_every (int): The number of buffered rows that triggers a flush.
+        flush_interval (float): The number of seconds after which buffered rows are flushed.
+
+    Subclasses implement `_load_completed` and `_write_rows`.
+    """
+
+    def __init__(self, filename, fieldnames=None, flush_every=100, flush_interval=5.0):
+        """
+        Opens a sink, loading the pairs already recorded in the file if it exists.
+
+        Args:
+            filename (str): The file or folder to write the rows to.
+            fieldnames (list, optional): The columns of the rows, other columns are dropped. Defaults to FIELDNAMES, pass FIELDNAMES + STATS_COLUMNS to keep the search counters.
+            flush_every (int, optional): The number of buffered rows that triggers a flush. Defaults to 100.
+            flush_interval (float, optional): The number of seconds after which buffered rows are flushed. Defaults to 5.
+        """
+        self.filename = filename
+        self.fieldnames = list(fieldnames or FIELDNAMES)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.completed = self._load_completed()
+        self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, row):
+        """
+        Appends a result row, flushing the buffered rows if it is time to.
+
+        Args:
+            row (dict): The result row, with at least the "Run" and "Algorithm" columns.
+        """
+        self._buffer.append(row)
+        self.completed.add((int(row["Run"]), row["Algorithm"]))
+        if (
+            len(self._buffer) >= self.flush_every
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self):
+        """
+        Writes the buffered rows to disk.
+        """
+        if self._buffer:
+            self._write_rows(self._buffer)
+            self._buffer = []
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """
+        Flushes the buffered rows and closes the sink.
+        """
+        self.flush()
+
+    @abstractmethod
+    def _load_completed(self):
+        """
+        Reads the (run, algorithm) pairs already recorded in the file, called once when the sink is opened.
+
+        Returns:
+            set: The recorded (run, algorithm) pairs, with runs as ints, or an empty set if the file does not exist.
+
+        Raises:
+            ValueError: If the file exists but does not hold rows written by a sink with these fieldnames.
+        """
+
+    @abstractmethod
+    def _write_rows(self, rows):
+        """
+        Appends rows to the file, called by `flush` with the buffered rows.
+
+        Args:
+            rows (list): The rows to write, as dicts. Columns that are not in `fieldnames` are dropped.
+        """
+
+
+class CSVResultsSink(ResultsSink):
+    """
+    A results sink that appends rows to a CSV file.
+
+    Every flush is synced to disk. If the file ends with a partial row, e.g. after a crash in the
+    middle of a write, that row is dropped when the sink is opened.
+    """
+
+    def __init__(self, filename, fieldnames=None, flush_every=100, flush_interval=5.0):
+        super().__init__(filename, fieldnames, flush_every, flush_interval)
+        new = not os.path.exists(filename) or os.path.getsize(filename) == 0
+        self._file = open(filename, "a", newline="")
+        self._writer = csv.DictWriter(
+            self._file, self.fieldnames, extrasaction="ignore"
+        )
+        if new:
+            self._writer.writeheader()
+
+    def close(self):
+        super().close()
+        self._file.close()
+
+    def _load_completed(self):
+        """
+        Reads the recorded (run, algorithm) pairs, dropping a trailing partial row.
+        """
+        if not os.path.exists(self.filename):
+            return set()
+        _drop_partial_line(self.filename)
+        with open(self.filename, newline="") as file:
+            reader = csv.DictReader(file)
+            if reader.fieldnames is not None and reader.fieldnames != self.fieldnames:
+                raise ValueError(
+                    f"{self.filename} has the columns {reader.fieldnames}, not the sink's "
+                    f"{self.fieldnames}; open the sink on a new file"
+                )
+            completed = set()
+            for row in reader:
+                try:
+                    completed.add((int(row["Run"]), row["Algorithm"]))
+                except (TypeError, ValueError):
+                    raise ValueError(
+                        f"{self.filename} line {reader.line_num} has the run "
+                        f"{row['Run']!r}, not a run number; open the sink on a new file"
+                    ) from None
+            return completed
+
+    def _write_rows(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+
+class ParquetResultsSink(ResultsSink):
+    """
+    A results sink that writes every flushed chunk of rows as a Parquet file in a folder.
+
+    The chunks are named "part-00000.parquet", "part-00001.parquet" and so on, and a chunk is first
+    written under a temporary name and then renamed, so the folder only ever holds complete chunks.
+    The folder can be read back as a single table with `load_results`.
+    """
+
+    def __init__(
+        self, filename, fieldnames=None, flush_every=10000, flush_interval=30.0
+    ):
+        import pyarrow
+        import pyarrow.parquet
+
+        self._pyarrow = pyarrow
+        self._parquet = pyarrow.parquet
+        os.makedirs(filename, exist_ok=True)
+        super().__init__(filename, fieldnames, flush_every, flush_interval)
+
+    def _parts(self):
+        return sorted(glob.glob(os.path.join(self.filename, "part-*.parquet")))
+
+    def _load_completed(self):
+        completed = set()
+        for part in self._parts():
+            table = self._parquet.read_table(part, columns=["Run", "Algorithm"])
+            completed.update(
+                zip(
+                    table.column("Run").to_pylist(),
+                    table.column("Algorithm").to_pylist(),
+                )
+            )
+        return completed
+
+    def _write_rows(self, rows):
+        table = self._pyarrow.Table.from_pylist(
+            [{name: row.get(name) for name in self.fieldnames} for row in rows]
+        )
+        name = f"part-{len(self._parts()):05d}.parquet"
+        temporary = os.path.join(self.filename, f".{name}.tmp")  # Hidden from readers
+        self._parquet.write_table(table, temporary)
+        os.replace(temporary, os.path.join(self.filename, name))
+
+
+def _drop_partial_line(filename):
+    """
+    Truncates a file after its last newline, reading only the end of the file.
+    """
+    with open(filename, "rb+") as file:
+        end = file.seek(0, os.SEEK_END)
+        if not end:
+            return
+        file.seek(end - 1)
+        if file.read(1) == b"\n":
+            return
+        while end:
+            start = max(0, end - TAIL_BYTES)
+            file.seek(start)
+            newline = file.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                file.truncate(start + newline + 1)
+                return
+            end = start
+        file.truncate(0)  # Not even the header is complete
+
+
+def open_results_sink(filename, **kwargs):
+    """
+    Opens the results sink matching a file name.
+
+    Parameters:
+    - filename (str): The file to write to. Names ending in ".csv" open a CSVResultsSink, and names ending in ".parquet" open a ParquetResultsSink on a folder of that name.
+    - **kwargs: Other arguments of the sink, such as flush_every and flush_interval.
+
+    Returns:
+    - ResultsSink: The opened sink.
+    """
+    if filename.endswith(".parquet"):
+        return ParquetResultsSink(filename, **kwargs)
+    if filename.endswith(".csv"):
+        return CSVResultsSink(filename, **kwargs)
+    raise ValueError(f"unsupported results file: {filename}")
+
+
+def load_results(filename):
+    """
+    Reads the rows written by a results sink into a pandas DataFrame.
+
+    Parameters:
+    - filename (str): The ".csv" file or ".parquet" folder written by the sink.
+
+    Returns:
+    - pd.DataFrame: A DataFrame with one row per recorded (run, algorithm) pair, in the order they were written.
+    """
+    import pandas as pd
+
+    if filename.endswith(".parquet"):
+        return pd.read_parquet(filename)
+    return pd.read_csv(filename)
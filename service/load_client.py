@@ -0,0 +1,258 @@
+"""
+Generates load on a running pathfinding server and reports its latency and throughput.
+
+The client stores one random maze on the server, then sends `requests` random queries on it from
+`concurrency` connections at once. Each connection sends its next query as soon as the previous one is
+answered, so the server sees `concurrency` queries in flight and can batch them. The latency of every
+query is measured from sending the request to reading its response with `time.perf_counter`, and the
+report gives its median, 99th percentile and maximum, and the number of queries answered per second.
+
+Example usage:
+python -m service.load_client --socket /tmp/maze_service.sock
+python -m service.load_client --port 8765 --size 500 --density 0.3 --requests 5000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+import numpy as np
+
+from service.server import MAX_LINE_BYTES
+from utils.maze_generation import generate_maze
+from utils.maze_grid import WALL, encode_maze
+
+
+class ServiceClient:
+    """
+    A connection to a pathfinding server, see `service.server` for the protocol.
+
+    Requests can be sent concurrently from several tasks on the same connection: their responses are
+    matched to them by request id.
+    """
+
+    def __init__(self, reader, writer):
+        """
+        Initializes a client on an open connection, see `connect`.
+        """
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+        # Futures of the requests sent and not answered yet, by request id
+        self._waiting = {}
+        self._receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def connect(cls, socket_path=None, host="127.0.0.1", port=8765):
+        """
+        Connects to a server on a Unix socket, or on a TCP port if no socket path is given.
+
+        Parameters:
+        - socket_path (str, optional): The path of the Unix socket. Defaults to None.
+        - host (str, optional): The host of the TCP server. Defaults to "127.0.0.1".
+        - port (int, optional): The port of the TCP server. Defaults to 8765.
+
+        Returns:
+        - ServiceClient: The connected client.
+        """
+        if socket_path is not None:
+            reader, writer = await asyncio.open_unix_connection(
+                socket_path, limit=MAX_LINE_BYTES
+            )
+        else:
+            reader, writer = await asyncio.open_connection(
+                host, port, limit=MAX_LINE_BYTES
+            )
+        return cls(reader, writer)
+
+    async def request(self, **fields):
+        """
+        Sends a request and waits for its response.
+
+        Parameters:
+        - **fields: The fields of the request, such as op="ping".
+
+        Returns:
+        - dict: The response.
+
+        Raises:
+        - RuntimeError: If the server answers with an error.
+        """
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        self._writer.write(json.dumps(dict(fields, id=request_id)).encode() + b"\n")
+        await self._writer.drain()
+        response = await future
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+    async def put_maze(self, maze):
+        """
+        Stores a maze on the server.
+
+        Parameters:
+        - maze (list of lists or numpy array): The maze, as symbols.
+
+        Returns:
+        - str: The id of the maze on the server.
+        """
+        rows = ["".join(row) for row in np.asarray(maze).tolist()]
+        return (await self.request(op="put_maze", maze=rows))["maze_id"]
+
+    async def query(self, maze_id, start, goal, path=False):
+        """
+        Finds a path on a stored maze.
+
+        Parameters:
+        - maze_id (str): The id of the maze on the server.
+        - start (tuple): The (x, y) start position.
+        - goal (tuple): The (x, y) goal position.
+        - path (bool, optional): Whether to also return the path. Defaults to False.
+
+        Returns:
+        - dict: The response, with the "length" of the path and the "path" if it was asked for.
+        """
+        return await self.request(
+            op="query", maze_id=maze_id, start=list(start), goal=list(goal), path=path
+        )
+
+    async def close(self):
+        """
+        Closes the connection.
+        """
+        self._writer.close()
+        self._receiver.cancel()
+
+    async def _receive(self):
+        """
+        Reads the responses of the connection and resolves the futures of their requests.
+        """
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            future = self._waiting.pop(response.pop("id", None), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self._waiting.values():
+            if not future.done():
+                future.set_exception(
+                    ConnectionError("the server closed the connection")
+                )
+
+
+async def run_load(
+    socket_path=None,
+    host="127.0.0.1",
+    port=8765,
+    size=200,
+    density=0.2,
+    requests=2000,
+    concurrency=32,
+    paths=False,
+    seed=0,
+):
+    """
+    Sends random queries to a server and measures their latencies.
+
+    Parameters:
+    - socket_path (str, optional): The path of the Unix socket of the server. Defaults to None (TCP).
+    - host (str, optional): The host of the TCP server. Defaults to "127.0.0.1".
+    - port (int, optional): The port of the TCP server. Defaults to 8765.
+    - size (int, optional): The size of the random maze (size x size). Defaults to 200.
+    - density (float, optional): The density of obstacles in the random maze. Defaults to 0.2.
+    - requests (int, optional): The number of queries to send. Defaults to 2000.
+    - concurrency (int, optional): The number of connections sending queries at once. Defaults to 32.
+    - paths (bool, optional): Whether to ask for the paths. Defaults to False.
+    - seed (int, optional): The seed of the maze and of the queries. Defaults to 0.
+
+    Returns:
+    - report (dict): The number of requests, the number of "unreachable" goals, the "p50", "p99" and "max" latencies in milliseconds, and the "throughput" in queries per second.
+    """
+    rng = np.random.default_rng(seed)
+    maze = generate_maze(size, density, rng)
+    open_cells = np.argwhere(encode_maze(maze) != WALL)
+    pairs = open_cells[rng.integers(0, len(open_cells), size=(requests, 2))].tolist()
+
+    clients = [
+        await ServiceClient.connect(socket_path, host, port) for _ in range(concurrency)
+    ]
+    try:
+        maze_id = await clients[0].put_maze(maze)
+        # Loads the maze in a worker before the timed queries
+        await clients[0].query(maze_id, pairs[0][0], pairs[0][1])
+        latencies, unreachable = [], 0
+        queue = iter(pairs)
+
+        async def send(client):
+            nonlocal unreachable
+            for start, goal in queue:
+                sent = time.perf_counter()
+                response = await client.query(maze_id, start, goal, paths)
+                latencies.append(time.perf_counter() - sent)
+                unreachable += response["length"] < 0
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(client) for client in clients))
+        elapsed = time.perf_counter() - started
+    finally:
+        for client in clients:
+            await client.close()
+
+    milliseconds = np.array(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "unreachable": unreachable,
+        "p50": float(np.percentile(milliseconds, 50)),
+        "p99": float(np.percentile(milliseconds, 99)),
+        "max": float(milliseconds.max()),
+        "throughput": len(latencies) / elapsed,
+    }
+
+
+def main():
+    """
+    Runs the load generator with the command line options and prints its report.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--socket", help="connect to this Unix socket instead of TCP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--size", type=int, default=200)
+    parser.add_argument("--density", type=float, default=0.2)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--paths", action="store_true", help="ask for the paths")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = asyncio.run(
+        run_load(
+            args.socket,
+            args.host,
+            args.port,
+            args.size,
+            args.density,
+            args.requests,
+            args.concurrency,
+            args.paths,
+            args.seed,
+        )
+    )
+    print(
+        f"{report['requests']} queries ({report['unreachable']} unreachable) "
+        f"at {report['throughput']:.0f} queries/s"
+    )
+    print(
+        f"latency p50 {report['p50']:.2f} ms, p99 {report['p99']:.2f} ms, "
+        f"max {report['max']:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
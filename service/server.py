@@ -0,0 +1,366 @@
+"""
+Serves pathfinding queries to other processes over a Unix socket or a localhost TCP port.
+
+The protocol is one JSON object per line in each direction. Every request may carry an "id", which is
+echoed in its response, so a client can send many requests on one connection without waiting:
+- {"op": "put_maze", "maze": [...]} stores a maze, given as a list of strings or a list of lists of
+  symbols, and answers {"maze_id": ..., "shape": [rows, columns]}. The id is the layout hash of the
+  maze, so storing the same layout twice is cheap and gives the same id.
+- {"op": "query", "maze_id": ..., "start": [x, y], "goal": [x, y], "path": false} answers
+  {"length": ...}, the number of steps of a shortest path or -1 if the goal cannot be reached, and the
+  "path" as a list of [x, y] positions if it was asked for.
+- {"op": "ping"} answers {"ok": true}.
+Failed requests are answered with {"error": ...}.
+
+The event loop only parses and routes requests. Mazes are encoded, saved and searched in a process
+pool: stored mazes are written to the maze folder with `utils.maze_io`, and every worker keeps the
+grids, neighbor tables and connectivity indexes of the mazes it recently searched in memory. Queries
+on the same maze that arrive within BATCH_WINDOW of each other are sent to the pool as one batch and
+answered with `solve_queries`, after the connectivity index has rejected the unreachable goals.
+
+Example usage:
+python -m service.server --socket /tmp/maze_service.sock
+python -m service.server --port 8765 --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from algorithms.batch_queries import solve_queries
+from utils.connectivity import ConnectivityIndex
+from utils.maze_grid import MazeGrid
+from utils.maze_io import save_maze, load_maze
+
+# Folder of the stored maze files, named "<maze_id>.maze"
+MAZE_FOLDER = "maze_store"
+
+# Time to wait for more queries on the same maze before sending a batch to the pool, in seconds
+BATCH_WINDOW = 0.002
+
+# Largest number of queries sent to the pool as one batch
+MAX_BATCH = 256
+
+# Number of mazes each worker process keeps in memory
+MAX_CACHED_MAZES = 8
+
+# Longest request line accepted, in bytes
+MAX_LINE_BYTES = 2**28
+
+# Mazes loaded by a worker process, by maze id
+_WORKER_MAZES = OrderedDict()
+
+
+class PathfindingServer:
+    """
+    An asyncio pathfinding server that batches queries and runs them in a process pool.
+
+    Attributes:
+        maze_folder (str): The folder of the stored maze files.
+        workers (int): The number of worker processes.
+        batch_window (float): The time to wait for more queries on the same maze before sending a batch, in seconds.
+        max_batch (int): The largest number of queries sent to the pool as one batch.
+    """
+
+    def __init__(
+        self,
+        maze_folder=MAZE_FOLDER,
+        workers=None,
+        batch_window=BATCH_WINDOW,
+        max_batch=MAX_BATCH,
+    ):
+        """
+        Initializes a server. No process is started before `start`.
+
+        Args:
+            maze_folder (str, optional): The folder of the stored maze files. Defaults to MAZE_FOLDER.
+            workers (int, optional): The number of worker processes. Defaults to None (one per CPU).
+            batch_window (float, optional): The time to wait for more queries on the same maze before sending a batch, in seconds. Defaults to BATCH_WINDOW.
+            max_batch (int, optional): The largest number of queries sent to the pool as one batch. Defaults to MAX_BATCH.
+        """
+        self.maze_folder = maze_folder
+        self.workers = workers or os.cpu_count()
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._executor = None
+        self._server = None
+        self._mazes = set()  # Ids of the stored mazes
+        self._pending = {}  # Queued (start, goal, path, future) queries by maze id
+        self._batches = set()  # Running batch tasks, referenced until they are done
+
+    async def start(self, socket_path=None, host="127.0.0.1", port=8765):
+        """
+        Starts the worker processes and listens on a Unix socket, or on a TCP port if no socket path is given.
+
+        Args:
+            socket_path (str, optional): The path of the Unix socket. Defaults to None.
+            host (str, optional): The host of the TCP server. Defaults to "127.0.0.1".
+            port (int, optional): The port of the TCP server. Defaults to 8765.
+        """
+        os.makedirs(self.maze_folder, exist_ok=True)
+        self._mazes = {
+            name[: -len(".maze")]
+            for name in os.listdir(self.maze_folder)
+            if name.endswith(".maze")
+        }
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        if socket_path is not None:
+            self._server = await asyncio.start_unix_server(
+                self._serve, path=socket_path, limit=MAX_LINE_BYTES
+            )
+        else:
+            self._server = await asyncio.start_server(
+                self._serve, host, port, limit=MAX_LINE_BYTES
+            )
+
+    async def serve_forever(self):
+        """
+        Serves requests until the server is closed.
+        """
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """
+        Stops listening and shuts the worker processes down.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+
+    async def handle(self, request):
+        """
+        Answers one request.
+
+        Args:
+            request (dict): The decoded request, see the module documentation.
+
+        Returns:
+            dict: The response, without the request id.
+        """
+        op = request.get("op")
+        if op == "query":
+            maze_id = request["maze_id"]
+            if maze_id not in self._mazes:
+                raise KeyError(f"unknown maze {maze_id}")
+            length, path = await self._query(
+                maze_id,
+                tuple(request["start"]),
+                tuple(request["goal"]),
+                bool(request.get("path", False)),
+            )
+            response = {"length": length}
+            if path is not None:
+                response["path"] = path
+            return response
+        if op == "put_maze":
+            loop = asyncio.get_running_loop()
+            maze_id, shape = await loop.run_in_executor(
+                self._executor, _store_maze, self.maze_folder, request["maze"]
+            )
+            self._mazes.add(maze_id)
+            return {"maze_id": maze_id, "shape": shape}
+        if op == "ping":
+            return {"ok": True}
+        raise ValueError(f"unknown op {op!r}")
+
+    async def _serve(self, reader, writer):
+        """
+        Reads the requests of a connection and answers each of them as soon as it is done.
+        """
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._answer(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def _answer(self, line, writer):
+        """
+        Decodes a request line, answers it and writes the response line.
+        """
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            response = await self.handle(request)
+        except (ValueError, KeyError, TypeError) as error:
+            response = {"error": str(error)}
+        if request_id is not None:
+            response["id"] = request_id
+        if not writer.is_closing():
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+
+    def _query(self, maze_id, start, goal, path):
+        """
+        Queues a query for the next batch of its maze and returns the future of its (length, path) result.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.get(maze_id)
+        if pending is None:
+            pending = self._pending[maze_id] = []
+            loop.call_later(self.batch_window, self._flush, maze_id)
+        pending.append((start, goal, path, future))
+        if len(pending) >= self.max_batch:
+            self._flush(maze_id)
+        return future
+
+    def _flush(self, maze_id):
+        """
+        Sends the queued queries of a maze to the pool as one batch.
+        """
+        batch = self._pending.pop(maze_id, None)
+        if batch:
+            task = asyncio.ensure_future(self._run_batch(maze_id, batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, maze_id, batch):
+        """
+        Runs a batch of queries in the pool and resolves their futures.
+        """
+        loop = asyncio.get_running_loop()
+        starts = [start for start, _, _, _ in batch]
+        goals = [goal for _, goal, _, _ in batch]
+        return_paths = any(path for _, _, path, _ in batch)
+        try:
+            lengths, paths = await loop.run_in_executor(
+                self._executor,
+                _solve_batch,
+                self.maze_folder,
+                maze_id,
+                starts,
+                goals,
+                return_paths,
+            )
+        except Exception as error:
+            for _, _, _, future in batch:
+                if not future.done():
+                    future.set_exception(ValueError(f"batch failed: {error}"))
+            return
+        for index, (_, _, path, future) in enumerate(batch):
+            if not future.done():
+                future.set_result((lengths[index], paths[index] if path else None))
+
+
+def _store_maze(maze_folder, maze):
+    """
+    Encodes a maze in a worker process and saves it under its layout hash, unless it is already stored.
+    """
+    grid = MazeGrid.from_maze(maze)
+    maze_id = grid.layout_hash()
+    filename = os.path.join(maze_folder, f"{maze_id}.maze")
+    if not os.path.exists(filename):
+        partial_name = f"{filename}.{os.getpid()}.tmp"
+        save_maze(partial_name, grid)
+        os.replace(partial_name, filename)  # Other workers never see a partial file
+    return maze_id, list(grid.shape)
+
+
+def _worker_maze(maze_folder, maze_id):
+    """
+    Returns the grid and connectivity index of a stored maze, loading them on first use in this worker.
+    """
+    entry = _WORKER_MAZES.get(maze_id)
+    if entry is not None:
+        _WORKER_MAZES.move_to_end(maze_id)
+        return entry
+
+    grid = load_maze(os.path.join(maze_folder, f"{maze_id}.maze"), mmap=False)
+    grid.successors  # Build the neighbor table once for all the queries
+    entry = (grid, ConnectivityIndex(grid))
+    _WORKER_MAZES[maze_id] = entry
+    while len(_WORKER_MAZES) > MAX_CACHED_MAZES:
+        _WORKER_MAZES.popitem(last=False)
+    return entry
+
+
+def _solve_batch(maze_folder, maze_id, starts, goals, return_paths):
+    """
+    Answers a batch of queries on a stored maze in a worker process, as lists of lengths and paths.
+    """
+    grid, index = _worker_maze(maze_folder, maze_id)
+    starts = np.array(starts, dtype=np.int64).reshape(-1, 2)
+    goals = np.array(goals, dtype=np.int64).reshape(-1, 2)
+    rows, columns = grid.shape
+    inside = (
+        (starts >= 0).all(axis=1)
+        & (goals >= 0).all(axis=1)
+        & (starts[:, 0] < rows)
+        & (goals[:, 0] < rows)
+        & (starts[:, 1] < columns)
+        & (goals[:, 1] < columns)
+    )
+    start_cells = (starts[:, 0] + 1) * grid.stride + starts[:, 1] + 1
+    goal_cells = (goals[:, 0] + 1) * grid.stride + goals[:, 1] + 1
+    connected = [
+        bool(ok) and index.connected(int(start), int(goal))
+        for ok, start, goal in zip(inside, start_cells, goal_cells)
+    ]
+    queries = np.flatnonzero(connected)
+
+    lengths = np.full(len(starts), -1, dtype=np.int64)
+    paths = [None] * len(starts)
+    if queries.size:
+        solved = solve_queries(grid, starts[queries], goals[queries], return_paths)
+        solved_lengths, solved_paths = solved if return_paths else (solved, None)
+        lengths[queries] = solved_lengths
+        if return_paths:
+            for query, path in zip(queries.tolist(), solved_paths):
+                paths[query] = None if path is None else [list(state) for state in path]
+    return lengths.tolist(), paths
+
+
+async def _run(args):
+    """
+    Starts a server with the command line options and serves until interrupted.
+    """
+    server = PathfindingServer(
+        args.maze_folder, args.workers, args.batch_window, args.max_batch
+    )
+    await server.start(args.socket, args.host, args.port)
+    where = args.socket or f"{args.host}:{args.port}"
+    print(f"Serving {args.workers or os.cpu_count()} workers on {where}")
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+def main():
+    """
+    Runs the pathfinding server with the command line options.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--socket", help="serve on this Unix socket instead of TCP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--maze-folder", default=MAZE_FOLDER)
+    parser.add_argument("--batch-window", type=float, default=BATCH_WINDOW)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    args = parser.parse_args()
+    try:
+        asyncio.run(_run(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import pytest
+
+from algorithms.batch_queries import solve_queries
+from algorithms.bfs import bfs_search
+from utils.maze_generation import generate_maze
+from utils.maze_grid import MazeGrid, WALL
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_lengths_match_bfs(seed):
+    grid = MazeGrid.from_maze(generate_maze(15, 0.25, seed))
+    starts = [(0, 0), (3, 4), (14, 14), (7, 2), (3, 4), (10, 1)]
+    goals = [(9, 9), (9, 9), (9, 9), (0, 14), (0, 14), (12, 13)]
+    lengths, paths = solve_queries(grid, starts, goals, return_paths=True)
+    for start, goal, length, path in zip(starts, goals, lengths, paths):
+        start, goal = grid.to_cell(start), grid.to_cell(goal)
+        expected = None
+        if WALL not in (grid.cells[start], grid.cells[goal]):
+            expected, _, _ = bfs_search(grid.with_endpoints(start, goal))
+        assert length == (-1 if expected is None else len(expected) - 1)
+        assert (path is None) == (expected is None)
+
+
+@pytest.mark.parametrize("position", [(0, 22), (-1, 0), (0, 20), (25, 0)])
+def test_positions_outside_the_maze_are_rejected(position):
+    maze = generate_maze(20, 0.2, 0)
+    with pytest.raises(ValueError, match="outside"):
+        solve_queries(maze, [position], [(5, 5)])
+    with pytest.raises(ValueError, match="outside"):
+        solve_queries(maze, [(5, 5)], [position])
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from algorithms.bfs import bfs_search
+from algorithms.d_star_lite import IncrementalPlanner, d_star_lite_search
+from utils.maze_generation import generate_maze
+
+
+def _length(path):
+    return None if path is None else len(path)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_first_plan_matches_bfs(seed):
+    maze = generate_maze(10, 0.3, seed)
+    path, _, _ = d_star_lite_search(maze)
+    expected, _, _ = bfs_search(maze)
+    assert _length(path) == _length(expected)
+
+
+def test_open_grid_is_solved():
+    maze = [["S", ".", ".", "."], ["."] * 4, ["."] * 4, [".", ".", ".", "G"]]
+    path, _, _ = d_star_lite_search(maze)
+    assert path[0] == (0, 0) and path[-1] == (3, 3) and len(path) == 7
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_replans_match_bfs(seed):
+    rng = np.random.default_rng(seed)
+    planner = IncrementalPlanner(generate_maze(12, 0.2, rng, solvable=True))
+    path, _ = planner.replan()
+    for _ in range(5):
+        endpoints = {planner.start, planner.goal}
+        changes = {}
+        for x, y in rng.integers(0, 12, size=(6, 2)).tolist():
+            if (x, y) not in endpoints:
+                changes[(x, y)] = bool(rng.random() < 0.6)
+        planner.update_cells(changes)
+        path, _ = planner.replan()
+        expected, _, _ = bfs_search(planner.grid)
+        assert _length(path) == _length(expected)
+
+        if path is not None and len(path) > 2:
+            planner.move_start(path[len(path) // 2])
+            path, _ = planner.replan()
+            expected, _, _ = bfs_search(planner.grid)
+            assert _length(path) == _length(expected)
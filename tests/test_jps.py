@@ -0,0 +1,29 @@
+import pytest
+
+from algorithms.a_star import a_star_search
+from algorithms.jps import jps_search
+from utils.maze_generation import generate_maze
+
+
+def _length(path):
+    return None if path is None else len(path)
+
+
+@pytest.mark.parametrize("density", [0.0, 0.1, 0.2, 0.3, 0.4])
+@pytest.mark.parametrize("seed", range(20))
+def test_path_lengths_match_a_star(seed, density):
+    maze = generate_maze(16, density, seed)
+    path, _, _ = jps_search(maze)
+    expected, _, _ = a_star_search(maze)
+    assert _length(path) == _length(expected)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_path_is_a_walk_from_start_to_goal(seed):
+    maze = generate_maze(40, 0.25, seed, solvable=True)
+    path, _, _ = jps_search(maze)
+    assert maze[path[0][0]][path[0][1]] == "S"
+    assert maze[path[-1][0]][path[-1][1]] == "G"
+    for (x, y), (next_x, next_y) in zip(path, path[1:]):
+        assert abs(x - next_x) + abs(y - next_y) == 1
+        assert maze[next_x][next_y] != "X"
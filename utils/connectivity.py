@@ -0,0 +1,157 @@
+"""
+This module contains the `ConnectivityIndex` class, which tells in O(1) whether two cells of a maze are
+connected, so that searches for an unreachable goal can be rejected without exploring the maze.
+
+The `label_components` function labels the connected open cells of one maze, or of a whole batch of
+mazes, with a vectorized union-find: every round hooks the root of each edge whose ends have different
+roots onto the smaller root, then compresses the paths by pointer jumping. Every component merges with
+at least one neighboring component per round, so a maze takes O(log cells) rounds of NumPy operations.
+
+The `connectivity_index` function keeps the indexes of the most recently used maze layouts, keyed by
+their layout hash, and `is_solvable` answers whether the start and goal of a maze are connected.
+
+Example usage:
+if is_solvable(maze):
+    path, num_explored, steps = a_star_search(maze)
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.maze_grid import MazeGrid, WALL
+
+# Number of indexes kept by `connectivity_index` for the most recently used maze layouts
+MAX_CACHED_INDEXES = 8
+
+
+class ConnectivityIndex:
+    """
+    The connected components of the open cells of a maze.
+
+    Attributes:
+        layout_hash (str): The layout hash of the maze, see `MazeGrid.layout_hash`.
+        labels (numpy array): The component label of every cell of the padded grid of the maze, indexed by flat cell index. The label is the flat index of the first cell of the component, and walls are labeled -1.
+    """
+
+    def __init__(self, maze):
+        """
+        Labels the components of a maze.
+
+        Args:
+            maze (MazeGrid or list of lists): The maze to index. Only its layout matters, not its start and goal.
+        """
+        grid = MazeGrid.from_maze(maze)
+        self.layout_hash = grid.layout_hash()
+        passable = grid.cells.reshape(-1, grid.stride) != WALL
+        self.labels = label_components(passable).reshape(-1)
+        self._labels = memoryview(self.labels)
+
+    def connected(self, a, b):
+        """
+        Tells whether two cells are connected by open cells.
+
+        Args:
+            a (int): The flat index of the first cell.
+            b (int): The flat index of the second cell.
+
+        Returns:
+            bool: True if both cells are open and in the same component, False otherwise.
+        """
+        label = self._labels[a]
+        return label >= 0 and label == self._labels[b]
+
+    def solvable(self, maze):
+        """
+        Tells whether the goal of a maze with this layout can be reached from its start.
+
+        Args:
+            maze (MazeGrid or list of lists): The maze, with the layout the index was built for.
+
+        Returns:
+            bool: True if the maze has a start and a goal and they are connected, False otherwise.
+        """
+        grid = MazeGrid.from_maze(maze)
+        if grid.start is None or grid.goal is None:
+            return False
+        return self.connected(grid.start, grid.goal)
+
+
+_INDEXES = OrderedDict()
+
+
+def connectivity_index(maze):
+    """
+    Returns the connectivity index of a maze, building it if it is not among the most recently used ones.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze to index. Passing the same MazeGrid for repeated lookups avoids re-encoding and re-hashing the maze.
+
+    Returns:
+    - index (ConnectivityIndex): The index of the maze. The last MAX_CACHED_INDEXES indexes are kept, keyed by layout hash.
+    """
+    grid = MazeGrid.from_maze(maze)
+    key = grid.layout_hash()
+    index = _INDEXES.get(key)
+    if index is not None:
+        _INDEXES.move_to_end(key)
+        return index
+
+    index = ConnectivityIndex(grid)
+    _INDEXES[key] = index
+    while len(_INDEXES) > MAX_CACHED_INDEXES:
+        _INDEXES.popitem(last=False)
+    return index
+
+
+def is_solvable(maze):
+    """
+    Tells whether the goal of a maze can be reached from its start, without searching.
+
+    Parameters:
+    - maze (MazeGrid or list of lists): The maze to check.
+
+    Returns:
+    - solvable (bool): True if the start and goal of the maze are connected, False otherwise.
+    """
+    grid = MazeGrid.from_maze(maze)
+    return connectivity_index(grid).solvable(grid)
+
+
+def label_components(passable):
+    """
+    Labels the 4-connected components of the passable cells of one or more 2D grids.
+
+    Parameters:
+    - passable (numpy array): A boolean array of shape (..., rows, columns), True for the cells that can be walked on. Each 2D slice is a separate grid.
+
+    Returns:
+    - labels (numpy array): An integer array of the same shape, holding for every passable cell the flat index in `passable` of the first cell of its component, and -1 for the other cells.
+    """
+    index_type = np.int32 if passable.size < 2**31 else np.int64
+    index = np.arange(passable.size, dtype=index_type).reshape(passable.shape)
+    right = passable[..., :, :-1] & passable[..., :, 1:]
+    down = passable[..., :-1, :] & passable[..., 1:, :]
+    first = np.concatenate([index[..., :, :-1][right], index[..., :-1, :][down]])
+    second = np.concatenate([index[..., :, 1:][right], index[..., 1:, :][down]])
+    del index, right, down
+
+    # Every parent is smaller than its cell
+    parent = np.arange(passable.size, dtype=index_type)
+    while first.size:
+        roots, other_roots = parent[first], parent[second]
+        np.minimum.at(
+            parent,
+            np.maximum(roots, other_roots),
+            np.minimum(roots, other_roots),
+        )
+        while True:
+            grandparents = parent[parent]
+            if np.array_equal(grandparents, parent):
+                break
+            parent = grandparents
+        # Edges between components that are still apart
+        keep = parent[first] != parent[second]
+        first, second = first[keep], second[keep]
+
+    return np.where(passable.reshape(-1), parent, -1).reshape(passable.shape)
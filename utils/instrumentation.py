@@ -0,0 +1,150 @@
+"""
+This module contains the `SearchStats` class, an optional observer that collects counters from a search.
+
+Every search algorithm accepts a `stats` argument. Without it, the algorithm runs exactly as before. With
+a `SearchStats`, the algorithm passes its frontier operations and its successor function through
+`SearchStats.track`, which wraps them to count what they do. The wrapping happens once before the search
+loop, so a search that is not observed pays nothing for it.
+"""
+
+import time
+
+# Result columns of the counters, in the order of `SearchStats.as_row`
+STATS_COLUMNS = [
+    "Nodes Generated",
+    "Frontier Pushes",
+    "Frontier Pops",
+    "Duplicates Skipped",
+    "Max Frontier",
+    "Successor Time",
+]
+
+
+class SearchStats:
+    """
+    Counters collected while a search runs.
+
+    Attributes:
+        nodes_generated (int): The number of successors produced by the successor function.
+        frontier_pushes (int): The number of entries added to the frontier (a queue, stack or heap), not counting the initial entries.
+        frontier_pops (int): The number of entries removed from the frontier, including stale entries.
+        stale_pops (int): The number of popped entries that were discarded because their cell was already closed.
+        frontier_size (int): The current number of entries in the frontier, summed over all frontiers of the search.
+        max_frontier (int): The largest frontier size reached.
+        successor_time (float): The time spent in the successor function, in seconds.
+    """
+
+    def __init__(self):
+        """
+        Initializes all counters to zero.
+        """
+        self.nodes_generated = 0
+        self.frontier_pushes = 0
+        self.frontier_pops = 0
+        self.stale_pops = 0
+        self.frontier_size = 0
+        self.max_frontier = 0
+        self.successor_time = 0.0
+
+    @property
+    def duplicates_skipped(self):
+        """
+        Returns the number of duplicates the search skipped.
+
+        Returns:
+            int: The number of successors that were not pushed because their cell was already reached (or not improved), plus the stale entries discarded when popped.
+        """
+        return self.nodes_generated - self.frontier_pushes + self.stale_pops
+
+    def track(self, push, pop, successors, initial_size=0):
+        """
+        Wraps the frontier operations and the successor function of a search so that they update the counters.
+
+        Args:
+            push (function): The function that adds one entry to the frontier, or None.
+            pop (function): The function that removes and returns one entry of the frontier, or None.
+            successors (function): The function that returns the list of successors of a node.
+            initial_size (int, optional): The number of entries already in the frontier. Defaults to 0.
+
+        Returns:
+            tuple: The wrapped (push, pop, successors) functions, with the same signatures, and None for the functions given as None.
+
+        A search with several frontiers calls `track` once per frontier, and the frontier size covers all of them.
+        """
+        self.frontier_size += initial_size
+        self.max_frontier = max(self.max_frontier, self.frontier_size)
+        perf_counter = time.perf_counter
+
+        def counted_push(*args):
+            push(*args)
+            self.frontier_pushes += 1
+            self.frontier_size += 1
+            if self.frontier_size > self.max_frontier:
+                self.max_frontier = self.frontier_size
+
+        def counted_pop(*args):
+            entry = pop(*args)
+            self.frontier_pops += 1
+            self.frontier_size -= 1
+            return entry
+
+        def timed_successors(*args):
+            start = perf_counter()
+            result = successors(*args)
+            self.successor_time += perf_counter() - start
+            self.nodes_generated += len(result)
+            return result
+
+        return (
+            None if push is None else counted_push,
+            None if pop is None else counted_pop,
+            timed_successors,
+        )
+
+    def count(self, pushes=0, pops=0, generated=0, seconds=0.0):
+        """
+        Adds to the counters in bulk, for searches that process a whole level of the frontier at a time.
+
+        Args:
+            pushes (int, optional): The number of entries added to the frontier. Defaults to 0.
+            pops (int, optional): The number of entries removed from the frontier. Defaults to 0.
+            generated (int, optional): The number of successors produced. Defaults to 0.
+            seconds (float, optional): The time spent producing the successors. Defaults to 0.
+        """
+        self.frontier_pushes += pushes
+        self.frontier_pops += pops
+        self.frontier_size += pushes - pops
+        self.max_frontier = max(self.max_frontier, self.frontier_size)
+        self.nodes_generated += generated
+        self.successor_time += seconds
+
+    def as_row(self):
+        """
+        Returns the counters as result columns.
+
+        Returns:
+            dict: The counters keyed by the names of `STATS_COLUMNS`.
+        """
+        return dict(
+            zip(
+                STATS_COLUMNS,
+                (
+                    self.nodes_generated,
+                    self.frontier_pushes,
+                    self.frontier_pops,
+                    self.duplicates_skipped,
+                    self.max_frontier,
+                    self.successor_time,
+                ),
+            )
+        )
+
+    def __repr__(self):
+        """
+        Returns a string representation of the counters for debugging.
+
+        Returns:
+            str: The string representation of the counters.
+        """
+        counters = ", ".join(f"{name}={value}" for name, value in self.as_row().items())
+        return f"SearchStats({counters})"
@@ -1,45 +1,135 @@
 """
+This module contains functions to generate random mazes.
+The `generate_mazes` function generates a batch of mazes as one uint8 array of cell markings.
+The `generate_maze` function generates a single maze of symbols.
+
 Necessary imports:
-- random
 - numpy as np
 """
 
-import random
 import numpy as np
 
+from utils.maze_grid import OPEN, START, GOAL
+from utils.connectivity import label_components
+
+# Symbols of the cell markings, indexed by marking
+SYMBOLS = np.array([".", "X", "S", "G"])
+
+# Number of cells generated at a time, bounding the temporary memory of a batch
+CHUNK_CELLS = 2**24
 
-def generate_maze(size=10, density=0.2):
+# Number of candidate cells drawn per maze when placing the start and goal
+CANDIDATES = 16
+
+
+def generate_maze(size=10, density=0.2, seed=None, solvable=False):
     """
     Generates a random maze of a given size and obstacle density, with random start and goal positions.
 
     Parameters:
     - size (int): The size of the maze (size x size), defaults to 10.
     - density (float): The density of obstacles in the maze, between 0 and 1, defaults to 0.2.
+    - seed (int, numpy SeedSequence or numpy Generator, optional): The seed of the random number generator, defaults to None (fresh entropy).
+    - solvable (bool, optional): Whether to place the start and goal in the same connected component, so that the goal can always be reached. Defaults to False.
 
     Returns:
     - np.array: A 2D numpy array representing the maze, where '.' denotes open cells,
       'X' denotes obstacles, 'S' denotes the start, and 'G' denotes the goal.
     """
-    # Create an empty maze
-    maze = np.full((size, size), ".")
+    return SYMBOLS[generate_mazes(1, size, density, seed, solvable)[0]]
+
+
+def generate_mazes(count, size=10, density=0.2, seed=None, solvable=False):
+    """
+    Generates a batch of random mazes of a given size and obstacle density, with random start and goal positions.
+
+    Parameters:
+    - count (int): The number of mazes to generate.
+    - size (int): The size of each maze (size x size), defaults to 10.
+    - density (float): The density of obstacles in the mazes, between 0 and 1, defaults to 0.2.
+    - seed (int, numpy SeedSequence or numpy Generator, optional): The seed of the random number generator, defaults to None (fresh entropy). The same seed always gives the same batch.
+    - solvable (bool, optional): Whether to place the start and goal of every maze in the same connected component, so that every goal can be reached. Defaults to False.
 
-    # Randomly place obstacles in the maze
-    for row in range(size):
-        for col in range(size):
-            if random.random() < density:
-                maze[row, col] = "X"
+    Returns:
+    - np.array: A (count, size, size) uint8 array of OPEN, WALL, START and GOAL cell markings, see `utils.maze_grid`.
 
-    # Randomly place the start and goal positions
-    start, goal = (0, 0), (size - 1, size - 1)
-    while start == goal or maze[start] == "X" or maze[goal] == "X":
-        start = (random.randint(0, size - 1), random.randint(0, size - 1))
-        goal = (random.randint(0, size - 1), random.randint(0, size - 1))
+    Notes:
+    - Obstacles are drawn as 16-bit random integers compared against the density, a chunk of mazes at a time, so the density is honored to within 1/65536 and no per-cell Python code runs.
+    - The start and goal are placed by drawing a few random candidate cells per maze and taking the first two distinct open ones. The few mazes for which all candidates are walls fall back to sampling among all of their open cells.
+    - With `solvable`, the walls are drawn the same way, and the connected components of each chunk are labeled with `label_components`. The start is drawn among the open cells of components with at least two cells, and the goal among the other cells of its component, so no maze has to be drawn again.
+    - A ValueError is raised if a maze has fewer than two open cells, or with `solvable`, no two connected open cells.
+    """
+    rng = np.random.default_rng(seed)
+    cells = size * size
+    threshold = int(round(density * 65536))
+    mazes = np.empty((count, size, size), dtype=np.uint8)
+    flat = mazes.reshape(count, cells)
+    per_chunk = max(1, CHUNK_CELLS // max(cells, 1))
 
-    maze[start] = "S"
-    maze[goal] = "G"
+    for begin in range(0, count, per_chunk):
+        chunk = flat[begin : begin + per_chunk]
+        noise = rng.integers(0, 65536, size=chunk.shape, dtype=np.uint16)
+        np.less(noise, threshold, out=chunk.view(np.bool_))  # WALL == True == 1
+        if solvable:
+            _place_connected_endpoints(chunk, rng, size)
+        else:
+            _place_endpoints(chunk, rng)
+
+    return mazes
+
+
+def _place_endpoints(chunk, rng):
+    """
+    Marks a random start and goal on open cells of every maze of a chunk.
+    """
+    rows = np.arange(len(chunk))
+    candidates = rng.integers(0, chunk.shape[1], size=(len(chunk), CANDIDATES))
+    open_candidates = chunk[rows[:, None], candidates] == OPEN
+    start_index = open_candidates.argmax(axis=1)
+    start = candidates[rows, start_index]
+    open_candidates &= candidates != start[:, None]
+    goal_index = open_candidates.argmax(axis=1)
+    goal = candidates[rows, goal_index]
+
+    placed = open_candidates[rows, goal_index]  # A start was found whenever a goal was
+    for row in np.flatnonzero(~placed):
+        free = np.flatnonzero(chunk[row] == OPEN)
+        if free.size < 2:
+            raise ValueError("a maze needs at least two open cells")
+        start[row], goal[row] = rng.choice(free, size=2, replace=False)
+
+    chunk[rows, start] = START
+    chunk[rows, goal] = GOAL
+
+
+def _place_connected_endpoints(chunk, rng, size):
+    """
+    Marks a random start and goal on connected open cells of every maze of a chunk.
+    """
+    rows = np.arange(len(chunk))
+    labels = label_components((chunk == OPEN).reshape(len(chunk), size, size))
+    labels = labels.reshape(len(chunk), -1)
+    component_sizes = np.bincount(labels[labels >= 0], minlength=labels.size)
+    usable = (labels >= 0) & (component_sizes[labels] >= 2)
 
-    return maze
+    candidates = rng.integers(0, chunk.shape[1], size=(len(chunk), CANDIDATES))
+    usable_candidates = usable[rows[:, None], candidates]
+    start = candidates[rows, usable_candidates.argmax(axis=1)]
+    for row in np.flatnonzero(~usable_candidates.any(axis=1)):
+        free = np.flatnonzero(usable[row])
+        if not free.size:
+            raise ValueError("a solvable maze needs at least two connected open cells")
+        start[row] = rng.choice(free)
 
+    component = labels[rows, start]
+    candidates = rng.integers(0, chunk.shape[1], size=(len(chunk), CANDIDATES))
+    same_component = (labels[rows[:, None], candidates] == component[:, None]) & (
+        candidates != start[:, None]
+    )
+    goal = candidates[rows, same_component.argmax(axis=1)]
+    for row in np.flatnonzero(~same_component.any(axis=1)):
+        free = np.flatnonzero(labels[row] == component[row])
+        goal[row] = rng.choice(free[free != start[row]])
 
-maze = generate_maze()
-print(maze)
+    chunk[rows, start] = START
+    chunk[rows, goal] = GOAL
@@ -0,0 +1,302 @@
+"""
+This module contains the `MazeGrid` class, the compact maze representation used by the search algorithms.
+A `MazeGrid` stores the maze as a flat uint8 array surrounded by a one-cell wall border, so every open cell
+has four in-bounds neighbors, together with a precomputed CSR-style table of the open neighbors of each cell.
+The `encode_maze` function converts the symbol mazes produced by `generate_maze` (or lists of strings) into
+uint8 cell markings.
+"""
+
+import copy
+import hashlib
+
+import numpy as np
+
+# Cell markings of an encoded maze
+OPEN = 0
+WALL = 1
+START = 2
+GOAL = 3
+
+# Moves in the same order as `get_successors`, as (action, (dx, dy))
+DIRECTIONS = (
+    ("UP", (0, -1)),
+    ("DOWN", (0, 1)),
+    ("LEFT", (-1, 0)),
+    ("RIGHT", (1, 0)),
+)
+
+
+class MazeGrid:
+    """
+    A maze stored as a padded flat uint8 array with a precomputed neighbor table.
+
+    Attributes:
+        shape (tuple): The (rows, columns) shape of the maze, without the border.
+        stride (int): The row length of the padded array, i.e. columns + 2.
+        cells (numpy array): The flat padded uint8 array of cell markings. Cell (x, y) lives at
+            index (x + 1) * stride + (y + 1), and every border cell is a WALL. It may be a read-only
+            memory map of a maze file, see `utils.maze_io`.
+        start (int): The flat index of the start cell, or None if the maze has no "S".
+        goal (int): The flat index of the goal cell, or None if the maze has no "G".
+        indptr (numpy array): CSR offsets, the open neighbors of cell c are indices[indptr[c]:indptr[c + 1]].
+        indices (numpy array): CSR flat indices of the open neighbors of every cell, in `DIRECTIONS` order.
+            The CSR table is built on first access, so searches that compute neighbors from the cells
+            themselves never pay for it.
+        offsets (tuple): The flat index offset of each move in `DIRECTIONS`.
+        actions (dict): Maps a flat index offset (neighbor - cell) to the name of the move.
+    """
+
+    def __init__(self, codes, padded=False, start=None, goal=None):
+        """
+        Initializes a new grid from a 2D array of cell markings.
+
+        Args:
+            codes (numpy array): A 2D uint8 array of OPEN, WALL, START and GOAL markings.
+            padded (bool, optional): Whether the array already has the one-cell WALL border of the grid, in which
+                case it is used as is, without a copy. Defaults to False.
+            start (int, optional): The flat index of the start cell, if known. Defaults to None (the cells are scanned for it).
+            goal (int, optional): The flat index of the goal cell, if known. Defaults to None (the cells are scanned for it).
+        """
+        if padded:
+            rows, cols = codes.shape[0] - 2, codes.shape[1] - 2
+            cells = codes
+        else:
+            rows, cols = codes.shape
+            cells = np.full((rows + 2, cols + 2), WALL, dtype=np.uint8)
+            cells[1:-1, 1:-1] = codes
+        self.shape = (rows, cols)
+        self.stride = cols + 2
+        self.cells = cells.reshape(-1)
+        self.start = _first(self.cells, START) if start is None else start
+        self.goal = _first(self.cells, GOAL) if goal is None else goal
+        self.offsets = tuple(dx * self.stride + dy for _, (dx, dy) in DIRECTIONS)
+        self.actions = {
+            offset: action for offset, (action, _) in zip(self.offsets, DIRECTIONS)
+        }
+        self._neighbor_table = None
+        self._adjacency = None
+        self._layout_hash = None
+
+    @classmethod
+    def from_maze(cls, maze):
+        """
+        Builds a grid from any supported maze representation.
+
+        Args:
+            maze (MazeGrid, list of lists, list of strings or numpy array): The maze to convert.
+                A MazeGrid is returned unchanged.
+
+        Returns:
+            MazeGrid: The grid for the maze.
+        """
+        if isinstance(maze, cls):
+            return maze
+        return cls(encode_maze(maze))
+
+    @property
+    def indptr(self):
+        """
+        Returns the CSR offsets of the neighbor table, building the table on first access.
+
+        Returns:
+            numpy array: The offsets, the open neighbors of cell c are indices[indptr[c]:indptr[c + 1]].
+        """
+        if self._neighbor_table is None:
+            self._neighbor_table = self._build_neighbor_table()
+        return self._neighbor_table[0]
+
+    @property
+    def indices(self):
+        """
+        Returns the CSR neighbor indices of the neighbor table, building the table on first access.
+
+        Returns:
+            numpy array: The flat indices of the open neighbors of every cell, in `DIRECTIONS` order.
+        """
+        if self._neighbor_table is None:
+            self._neighbor_table = self._build_neighbor_table()
+        return self._neighbor_table[1]
+
+    @property
+    def adjacency(self):
+        """
+        Returns the neighbor table as a list of tuples, the view used by the Python search loops.
+
+        The list is built from the CSR arrays on first access, so iterating the neighbors of a cell
+        neither allocates nor slices during a search.
+
+        Returns:
+            list: A list where element c is the tuple of open neighbors of cell c.
+        """
+        if self._adjacency is None:
+            flat, ptr = self.indices.tolist(), self.indptr.tolist()
+            self._adjacency = [tuple(flat[a:b]) for a, b in zip(ptr, ptr[1:])]
+        return self._adjacency
+
+    @property
+    def mapped(self):
+        """
+        Tells whether the cells are a memory map of a maze file rather than an array in memory.
+
+        Returns:
+            bool: True if the cells are memory-mapped, False otherwise.
+        """
+        return isinstance(self.cells, np.memmap)
+
+    @property
+    def successors(self):
+        """
+        Returns the function that lists the open neighbors of a cell, used by the Python search loops.
+
+        For grids in memory this is a lookup in `adjacency`. For memory-mapped grids the neighbor table is not
+        built, since that would read the whole maze file, and the neighbors are read from the cells instead,
+        so only the pages of the cells a search visits are loaded.
+
+        Returns:
+            function: A function mapping the flat index of a cell to a sequence of the flat indices of its open neighbors, in `DIRECTIONS` order.
+        """
+        if self.mapped and self._adjacency is None:
+            return self.neighbor_lookup()
+        return self.adjacency.__getitem__
+
+    def neighbor_lookup(self):
+        """
+        Returns a function that lists the open neighbors of a cell by reading the cells directly.
+
+        It is slower than a lookup in `adjacency` but needs no memory beyond the cells themselves.
+
+        Returns:
+            function: A function mapping the flat index of a cell to the list of the flat indices of its open neighbors, in `DIRECTIONS` order.
+        """
+        cells, offsets = memoryview(self.cells), self.offsets
+
+        def neighbors(cell):
+            return [cell + offset for offset in offsets if cells[cell + offset] != WALL]
+
+        return neighbors
+
+    def with_endpoints(self, start, goal):
+        """
+        Returns a grid with another start and goal that shares the cells and neighbor tables of this one.
+
+        Args:
+            start (int): The flat index of the start cell.
+            goal (int): The flat index of the goal cell.
+
+        Returns:
+            MazeGrid: A shallow copy of the grid. The cells keep their old START and GOAL markings, which the
+                searches treat like open cells. Tables that are built on first access are only shared if they
+                were built before the copy.
+        """
+        grid = copy.copy(self)
+        grid.start, grid.goal = start, goal
+        return grid
+
+    def update(self, cells, markings):
+        """
+        Changes the markings of some cells, e.g. to add or remove walls, and drops the tables built from the old ones.
+
+        Args:
+            cells (list or numpy array): The flat indices of the cells to change.
+            markings (int, list or numpy array): The new marking of the cells, or of every cell.
+        """
+        self.cells[cells] = markings
+        self._neighbor_table = None
+        self._adjacency = None
+        self._layout_hash = None
+
+    def layout_hash(self):
+        """
+        Returns a content hash of the maze layout, i.e. its shape and walls but not its start and goal.
+
+        Mazes that only differ in their start and goal positions share the same layout hash, so it can
+        key data that is valid for every query on a maze. The hash is computed once per grid.
+
+        Returns:
+            str: A hexadecimal digest of the layout.
+        """
+        if self._layout_hash is None:
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(np.array(self.shape, dtype=np.int64).tobytes())
+            digest.update(np.packbits(self.cells == WALL).tobytes())
+            self._layout_hash = digest.hexdigest()
+        return self._layout_hash
+
+    def to_state(self, cell):
+        """
+        Converts a flat index into an (x, y) maze position.
+
+        Args:
+            cell (int): The flat index of the cell.
+
+        Returns:
+            tuple: The (x, y) position of the cell in the unpadded maze.
+        """
+        x, y = divmod(cell, self.stride)
+        return (x - 1, y - 1)
+
+    def to_cell(self, state):
+        """
+        Converts an (x, y) maze position into a flat index.
+
+        Args:
+            state (tuple): The (x, y) position of the cell in the unpadded maze.
+
+        Returns:
+            int: The flat index of the cell.
+        """
+        return (state[0] + 1) * self.stride + state[1] + 1
+
+    def codes(self):
+        """
+        Returns the cell markings without the border.
+
+        Returns:
+            numpy array: A 2D uint8 view of the maze with the given shape.
+        """
+        return self.cells.reshape(-1, self.stride)[1:-1, 1:-1]
+
+    def _build_neighbor_table(self):
+        """
+        Builds the CSR neighbor table with a single vectorized pass over the grid.
+        """
+        passable = self.cells != WALL
+        index_type = np.int32 if self.cells.size < 2**31 else np.int64
+        cells = np.flatnonzero(passable).astype(index_type)
+        neighbors = cells[:, None] + np.array(self.offsets, dtype=index_type)
+        valid = passable[neighbors]  # The wall border keeps every neighbor in bounds
+        counts = np.zeros(self.cells.size, dtype=index_type)
+        counts[cells] = valid.sum(axis=1)
+        indptr = np.zeros(self.cells.size + 1, dtype=index_type)
+        np.cumsum(counts, out=indptr[1:])
+        return indptr, neighbors[valid]
+
+
+def encode_maze(maze):
+    """
+    Converts a maze into a 2D uint8 array of cell markings.
+
+    Parameters:
+    - maze (list of lists, list of strings or numpy array): The maze to encode. Integer arrays are assumed to already hold OPEN, WALL, START and GOAL markings.
+
+    Returns:
+    - codes (numpy array): A 2D uint8 array where walls, start and goal are marked with WALL, START and GOAL and every other cell is OPEN.
+    """
+    cells = np.asarray(maze)
+    if cells.dtype.kind in "iu":
+        return cells.astype(np.uint8, copy=False)
+    if cells.ndim == 1:
+        cells = np.array([list(row) for row in maze])
+    codes = np.full(cells.shape, OPEN, dtype=np.uint8)
+    codes[cells == "X"] = WALL
+    codes[cells == "S"] = START
+    codes[cells == "G"] = GOAL
+    return codes
+
+
+def _first(cells, marking):
+    """
+    Returns the flat index of the first cell with the given marking, or None.
+    """
+    found = np.flatnonzero(cells == marking)
+    return int(found[0]) if found.size else None
@@ -0,0 +1,201 @@
+"""
+This module contains functions to save mazes to files and load them back, so that very large mazes can
+be searched without generating or holding them in memory.
+
+A maze file starts with a HEADER_SIZE-byte header holding MAGIC, the format version, the payload kind,
+the number of rows and columns and the flat `MazeGrid` indices of the start and goal (-1 if absent),
+followed by one of two payloads:
+- GRID: the padded uint8 array of cell markings of a `MazeGrid`, border included, one byte per cell.
+  `load_maze` memory-maps it and wraps the map in a MazeGrid without copying it. The operating system
+  then only reads the pages of the cells that a search visits, and the searches that look up neighbors
+  cell by cell (DFS, BFS, A*, the bidirectional searches, IDA* and IDDFS) never touch the rest of the
+  maze. The vectorized searches and JPS read the whole maze.
+- PACKED: one bit per cell, set for walls, row by row with every row padded to a whole byte, which is
+  8 times smaller. It is meant for storage and transfer: loading it unpacks it into memory, and
+  `unpack_maze` converts it into a GRID file a few rows at a time.
+
+`load_maze` also reads plain ".npy" arrays of cell markings, such as those saved with
+`np.save(filename, generate_mazes(1, size)[0])`. They are memory-mapped but have to be copied into a
+padded grid.
+
+Example usage:
+save_maze("floor_plan.maze", generate_mazes(1, 20000, 0.3)[0])
+path, num_explored, _ = a_star_search(load_maze("floor_plan.maze"))
+"""
+
+import struct
+
+import numpy as np
+
+from utils.maze_grid import MazeGrid, WALL, START, GOAL
+
+MAGIC = b"MAZEGRID"
+VERSION = 1
+
+# Payload kinds
+GRID = 0
+PACKED = 1
+
+# Magic, version, payload kind, rows, columns, start and goal, padded to HEADER_SIZE bytes
+HEADER_FORMAT = "<8sIIqqqq"
+HEADER_SIZE = 64
+
+# Number of bytes of maze written or converted at a time
+CHUNK_BYTES = 2**24
+
+
+def save_maze(filename, maze, packed=False):
+    """
+    Saves a maze to a maze file.
+
+    Parameters:
+    - filename (str): The path of the file to write.
+    - maze (MazeGrid, list of lists or numpy array): The maze to save.
+    - packed (bool, optional): Whether to write the bit-packed payload instead of the grid payload. Defaults to False.
+
+    Returns:
+    - None
+
+    The maze is written a chunk of rows at a time, so saving a memory-mapped maze does not load it whole.
+    """
+    grid = MazeGrid.from_maze(maze)
+    rows, cols = grid.shape
+    codes = grid.codes()
+    per_chunk = max(1, CHUNK_BYTES // (cols + 2))
+    chunks = (codes[begin : begin + per_chunk] for begin in range(0, rows, per_chunk))
+    _write_maze(filename, rows, cols, grid.start, grid.goal, chunks, packed)
+
+
+def load_maze(filename, mmap=True):
+    """
+    Loads a maze file, or a ".npy" array of cell markings, as a MazeGrid.
+
+    Parameters:
+    - filename (str): The path of the file to read.
+    - mmap (bool, optional): Whether to memory-map the grid payload instead of reading it into memory. Defaults to True.
+
+    Returns:
+    - MazeGrid: The grid of the maze, ready to be searched. The cells of a memory-mapped grid are read-only.
+    """
+    if str(filename).endswith(".npy"):
+        return MazeGrid(np.load(filename, mmap_mode="r" if mmap else None))
+
+    header = read_maze_header(filename)
+    rows, cols = header["rows"], header["cols"]
+    if header["packed"]:
+        cells = np.full((rows + 2, cols + 2), WALL, dtype=np.uint8)
+        for begin, chunk in _unpacked_chunks(filename, header):
+            cells[begin + 1 : begin + 1 + len(chunk), 1:-1] = chunk
+    elif mmap:
+        cells = np.memmap(
+            filename, np.uint8, "r", offset=HEADER_SIZE, shape=(rows + 2, cols + 2)
+        )
+    else:
+        cells = np.fromfile(filename, np.uint8, offset=HEADER_SIZE)
+        cells = cells.reshape(rows + 2, cols + 2)
+    return MazeGrid(cells, padded=True, start=header["start"], goal=header["goal"])
+
+
+def unpack_maze(source, destination):
+    """
+    Converts a bit-packed maze file into a maze file with the grid payload, a chunk of rows at a time.
+
+    Parameters:
+    - source (str): The path of the bit-packed maze file.
+    - destination (str): The path of the maze file to write.
+
+    Returns:
+    - None
+    """
+    header = read_maze_header(source)
+    if not header["packed"]:
+        raise ValueError(f"{source} is not a bit-packed maze file")
+    chunks = (chunk for _, chunk in _unpacked_chunks(source, header))
+    _write_maze(
+        destination,
+        header["rows"],
+        header["cols"],
+        header["start"],
+        header["goal"],
+        chunks,
+        packed=False,
+    )
+
+
+def read_maze_header(filename):
+    """
+    Reads the header of a maze file.
+
+    Parameters:
+    - filename (str): The path of the maze file.
+
+    Returns:
+    - dict: The "packed" payload flag, the "rows" and "cols" of the maze, and the flat "start" and "goal" indices (None if absent).
+    """
+    with open(filename, "rb") as file:
+        data = file.read(HEADER_SIZE)
+    if len(data) < HEADER_SIZE or not data.startswith(MAGIC):
+        raise ValueError(f"{filename} is not a maze file")
+    _, version, kind, rows, cols, start, goal = struct.unpack_from(HEADER_FORMAT, data)
+    if version != VERSION:
+        raise ValueError(f"{filename} has unsupported maze file version {version}")
+    return {
+        "packed": kind == PACKED,
+        "rows": rows,
+        "cols": cols,
+        "start": None if start < 0 else start,
+        "goal": None if goal < 0 else goal,
+    }
+
+
+def _write_maze(filename, rows, cols, start, goal, chunks, packed):
+    """
+    Writes a header and the payload built from chunks of rows of cell markings, without the border.
+    """
+    header = struct.pack(
+        HEADER_FORMAT,
+        MAGIC,
+        VERSION,
+        PACKED if packed else GRID,
+        rows,
+        cols,
+        -1 if start is None else start,
+        -1 if goal is None else goal,
+    )
+    border = np.full(cols + 2, WALL, dtype=np.uint8)
+    with open(filename, "wb") as file:
+        file.write(header.ljust(HEADER_SIZE, b"\0"))
+        if not packed:
+            file.write(border.tobytes())
+        for chunk in chunks:
+            if packed:
+                file.write(np.packbits(chunk == WALL, axis=1).tobytes())
+            else:
+                padded = np.full((len(chunk), cols + 2), WALL, dtype=np.uint8)
+                padded[:, 1:-1] = chunk
+                file.write(padded.tobytes())
+        if not packed:
+            file.write(border.tobytes())
+
+
+def _unpacked_chunks(filename, header):
+    """
+    Yields the first row and the cell markings of every chunk of rows of a bit-packed maze file.
+    """
+    rows, cols = header["rows"], header["cols"]
+    packed = np.memmap(
+        filename, np.uint8, "r", offset=HEADER_SIZE, shape=(rows, (cols + 7) // 8)
+    )
+    stride = cols + 2
+    endpoints = [
+        (divmod(header[name], stride), marking)
+        for name, marking in (("start", START), ("goal", GOAL))
+        if header[name] is not None
+    ]
+    per_chunk = max(1, CHUNK_BYTES // max(cols, 1))
+    for begin in range(0, rows, per_chunk):
+        chunk = np.unpackbits(packed[begin : begin + per_chunk], axis=1, count=cols)
+        for (x, y), marking in endpoints:
+            if begin <= x - 1 < begin + len(chunk):
+                chunk[x - 1 - begin, y - 1] = marking
+        yield begin, chunk
@@ -10,8 +10,12 @@ class Node:
         parent (Node): The node that generated this node, used to reconstruct the path.
         action (any): The action taken to generate this node from its parent.
         cost (int): The cost of the path from the initial state to this node, often representing the number of steps.
+
+    The search algorithms store their nodes in a `utils.node_store.NodeStore`, and only build nodes as a view of it.
     """
 
+    __slots__ = ("state", "parent", "action", "cost")
+
     id_generator = count(0)  # Use the class-level id_generator for unique IDs
 
     def __init__(self, state, parent=None, action=None, cost=0):
@@ -0,0 +1,121 @@
+"""
+This module contains the `NodeStore` class, the array-backed node storage of the search algorithms.
+Instead of allocating a `Node` object per reached cell, a search keeps the parent pointer, the g-cost
+and the action of every cell in preallocated NumPy arrays indexed by the flat cell indices of a
+`MazeGrid`, and its frontier only holds cell indices. `Node` objects are built on demand, as a view of
+the stored nodes, for code that still works with them.
+"""
+
+import numpy as np
+
+from utils.maze_grid import DIRECTIONS
+from utils.node import Node
+
+# Action code 0 means "no action", i.e. a root node, code i + 1 is the i-th move of `DIRECTIONS`
+ACTION_NAMES = (None,) + tuple(action for action, _ in DIRECTIONS)
+
+
+class NodeStore:
+    """
+    The nodes of a search, stored as one array entry per grid cell.
+
+    Attributes:
+        grid (MazeGrid): The grid being searched.
+        parents (numpy array): The flat index of the parent of every cell plus one, or 0 if the cell has not been reached. A root cell is its own parent.
+        costs (numpy array): The g-cost of every reached cell.
+        actions (numpy array): The uint8 code of the move that reached every cell, 0 for a root, see `ACTION_NAMES`.
+        closed_cells (numpy array): A uint8 flag per cell, for the closed set of the searches that keep one.
+        parent (memoryview): A view of `parents` whose items are plain ints, used by the search loops.
+        cost (memoryview): A view of `costs` whose items are plain ints, used by the search loops.
+        action (memoryview): A view of `actions` whose items are plain ints, used by the search loops.
+        closed (memoryview): A view of `closed_cells` whose items are plain ints, used by the search loops.
+        action_codes (dict): Maps a flat index offset (child - parent) to its action code, and offset 0 to 0.
+        offsets (tuple): The flat index offset of every action code, 0 for code 0.
+
+    The arrays are allocated zeroed, so the operating system only commits the memory pages of the
+    cells a search actually reaches, unlike a bytearray, which is filled with zeros when it is created.
+    Indexing a memoryview is several times faster than indexing the NumPy array, which boxes every item
+    into a NumPy scalar.
+    """
+
+    def __init__(self, grid):
+        """
+        Initializes an empty store for the cells of a grid.
+
+        Args:
+            grid (MazeGrid): The grid being searched.
+        """
+        size = grid.cells.size
+        index_type = np.int32 if size < 2**31 else np.int64
+        self.grid = grid
+        self.parents = np.zeros(size, dtype=index_type)
+        self.costs = np.zeros(size, dtype=index_type)
+        self.actions = np.zeros(size, dtype=np.uint8)
+        self.closed_cells = np.zeros(size, dtype=np.uint8)
+        self.parent = memoryview(self.parents)
+        self.cost = memoryview(self.costs)
+        self.action = memoryview(self.actions)
+        self.closed = memoryview(self.closed_cells)
+        self.offsets = (0,) + grid.offsets
+        self.action_codes = {offset: code for code, offset in enumerate(self.offsets)}
+
+    def add_root(self, cell, cost=0):
+        """
+        Stores a root node, i.e. a node without parent, such as the start of a search.
+
+        Args:
+            cell (int): The flat index of the cell.
+            cost (int, optional): The g-cost of the node. Defaults to 0.
+        """
+        self.parent[cell] = cell + 1
+        self.cost[cell] = cost
+        self.action[cell] = 0
+
+    def reached(self, cell):
+        """
+        Tells whether a node is stored for a cell.
+
+        Args:
+            cell (int): The flat index of the cell.
+
+        Returns:
+            bool: True if the cell has been reached, False otherwise.
+        """
+        return self.parent[cell] != 0
+
+    def path(self, cell):
+        """
+        Walks the parent pointers from a cell back to its root.
+
+        Args:
+            cell (int): The flat index of a reached cell.
+
+        Returns:
+            list: The flat indices of the cells from the root to the given cell.
+        """
+        parent = self.parent
+        cells = [cell]
+        while parent[cell] - 1 != cell:
+            cell = parent[cell] - 1
+            cells.append(cell)
+        return cells[::-1]
+
+    def node(self, cell):
+        """
+        Builds the `Node` view of a stored node, with its chain of parent nodes.
+
+        Args:
+            cell (int): The flat index of a reached cell.
+
+        Returns:
+            Node: A node whose state is the (x, y) position of the cell, and whose action is the name of the move that reached it.
+        """
+        node = None
+        for step in self.path(cell):
+            node = Node(
+                self.grid.to_state(step),
+                node,
+                ACTION_NAMES[self.action[step]],
+                self.cost[step],
+            )
+        return node
@@ -0,0 +1,422 @@
+"""
+This module contains the `SearchTrace` class, a compact record of a search process.
+Instead of copying the whole maze at every step, a trace stores one small event per
+expanded or pushed cell plus the final path, and builds full maze frames only when
+they are requested (e.g. by `animate_search_process`).
+
+Every search algorithm is also available as a generator, such as `iter_bfs_search`, that yields
+(kind, payload) events as the search runs:
+- (EXPAND, cell) when a cell is expanded, with the flat index of the cell in the MazeGrid of the maze.
+- (PUSH, cell) when a cell is added to the frontier.
+- (BATCH, (kinds, cells)) for a batch of EXPAND and PUSH events given as arrays, from vectorized searches.
+- (FOUND, (path, num_explored)) when the goal is reached, with the path as a list of (x, y) states.
+- (EXHAUSTED, num_explored) when the frontier runs out without reaching the goal.
+FOUND and EXHAUSTED are always the last event. The `collect_search` function turns the events
+into the (path, num_explored, steps) result of the search functions, with or without a trace.
+"""
+
+from array import array
+
+import numpy as np
+
+from utils.maze_grid import MazeGrid
+
+# Event kinds stored in a trace
+EXPAND = 0
+PUSH = 1
+
+# Further kinds of the events yielded by the search generators
+FOUND = 2
+EXHAUSTED = 3
+BATCH = 4
+
+# Cell markings used in materialized frames, extending those of `MazeGrid`
+EXPLORED = 4
+PATH = 5
+CURRENT = 6
+FRONTIER = 7
+
+SYMBOLS = np.array([".", "X", "S", "G", "E", "P", "C", "F"], dtype="object")
+
+
+class SearchTrace:
+    """
+    A delta-encoded record of a search process that behaves like a list of maze states.
+
+    Attributes:
+        grid (MazeGrid): The grid being searched, events refer to its flat cell indices.
+        shape (tuple): The (rows, columns) shape of the traced maze.
+        path (list): The final path as a list of states, or None if no path was recorded.
+        keyframe_interval (int): Every how many frames a materialized frame is kept as a
+            keyframe, so that jumping backwards does not replay the trace from the start.
+
+    Frame 0 is the initial maze, frame k (1 <= k <= number of expansions) shows the maze
+    after the k-th expansion and the pushes made during it, and if a path was recorded
+    the last frame shows the final path. Frames use the symbols ".", "X", "S", "G",
+    "E" (explored), "F" (frontier), "C" (current) and "P" (path).
+    """
+
+    def __init__(self, maze, keyframe_interval=256):
+        """
+        Initializes an empty trace for the given maze.
+
+        Args:
+            maze (MazeGrid, list of lists or numpy array): The maze being searched.
+            keyframe_interval (int, optional): Spacing of cached keyframes. Defaults to 256.
+        """
+        self.grid = MazeGrid.from_maze(maze)
+        self.shape = self.grid.shape
+        self._kinds = array("b")
+        self._cells = array("q")
+        self._expansions = array("q")  # Event index of every expand event
+        self.path = None
+        self.keyframe_interval = keyframe_interval
+        self._keyframes = {}
+        self._frame = None
+        self._frame_index = -1
+
+    def expand(self, cell):
+        """
+        Records the expansion of a cell.
+
+        Args:
+            cell (int): The flat grid index of the expanded cell.
+        """
+        self._expansions.append(len(self._kinds))
+        self._kinds.append(EXPAND)
+        self._cells.append(cell)
+
+    def push(self, cell):
+        """
+        Records a cell being added to the frontier.
+
+        Args:
+            cell (int): The flat grid index of the pushed cell.
+        """
+        self._kinds.append(PUSH)
+        self._cells.append(cell)
+
+    def extend(self, kinds, cells):
+        """
+        Records a batch of events at once, for searches that produce events as arrays.
+
+        Args:
+            kinds (numpy array): The EXPAND or PUSH kind of every event, in order.
+            cells (numpy array): The flat grid index of every event, in order.
+        """
+        kinds = np.asarray(kinds, dtype=np.int8)
+        offset = len(self._kinds)
+        self._expansions.frombytes(
+            (np.flatnonzero(kinds == EXPAND) + offset).astype(np.int64).tobytes()
+        )
+        self._kinds.frombytes(kinds.tobytes())
+        self._cells.frombytes(np.asarray(cells, dtype=np.int64).tobytes())
+
+    def set_path(self, path):
+        """
+        Records the final path found by the search.
+
+        Args:
+            path (list): The path as a list of (x, y) states.
+        """
+        self.path = list(path)
+
+    @property
+    def num_expanded(self):
+        """
+        Returns the number of expand events recorded so far.
+
+        Returns:
+            int: The number of expansions.
+        """
+        return len(self._expansions)
+
+    def __len__(self):
+        """
+        Returns the number of frames in the trace.
+
+        Returns:
+            int: The number of frames.
+        """
+        return 1 + len(self._expansions) + (self.path is not None)
+
+    def __getitem__(self, index):
+        """
+        Materializes a single frame of the trace.
+
+        Args:
+            index (int): The frame index, negative indices count from the end.
+
+        Returns:
+            numpy array: A 2D object array of cell symbols for the requested frame.
+        """
+        return SYMBOLS[self.codes(index)]
+
+    def __iter__(self):
+        """
+        Iterates over all frames in order, reusing the previous frame each time.
+
+        Returns:
+            iterator: An iterator over the materialized frames.
+        """
+        for index in range(len(self)):
+            yield self[index]
+
+    def codes(self, index):
+        """
+        Materializes a single frame of the trace as numeric cell markings.
+
+        Args:
+            index (int): The frame index, negative indices count from the end.
+
+        Returns:
+            numpy array: A 2D uint8 array of cell markings for the requested frame.
+        """
+        num_frames = len(self)
+        if index < 0:
+            index += num_frames
+        if not 0 <= index < num_frames:
+            raise IndexError("trace frame index out of range")
+
+        frame = self._advance_to(min(index, len(self._expansions))).copy()
+        if index > len(self._expansions):
+            frame[[self.grid.to_cell(state) for state in self.path]] = PATH
+        elif index > 0:
+            frame[self._cells[self._expansions[index - 1]]] = CURRENT
+        self._restore_endpoints(frame)
+        return frame.reshape(-1, self.grid.stride)[1:-1, 1:-1]
+
+    def frames(self, indices=None):
+        """
+        Materializes many frames of the trace at once as numeric cell markings.
+
+        Args:
+            indices (list of int, optional): The frame indices to materialize, in any order. Defaults to every frame.
+
+        Returns:
+            numpy array: A 3D uint8 array of shape (len(indices), rows, columns) with the cell markings of each requested frame, equal to stacking `codes(index)` for every index.
+
+        Instead of replaying the events frame by frame, a single pass over the events finds the frame in
+        which every cell is first pushed and first expanded, and each frame is then built by comparing
+        those frame numbers with its index.
+        """
+        indices = self._frame_indices(indices)
+        return self._build_frames(indices, *self._first_frames())
+
+    def iter_frames(self, indices=None, chunk_size=256):
+        """
+        Materializes frames of the trace a chunk at a time, so that only one chunk is in memory at once.
+
+        Args:
+            indices (list of int, optional): The frame indices to materialize, in any order. Defaults to every frame.
+            chunk_size (int, optional): The number of frames per chunk. Defaults to 256.
+
+        Yields:
+            numpy array: A 3D uint8 array of shape (chunk, rows, columns) for each chunk of consecutive requested indices, see `frames`. The single pass over the events is shared by all the chunks.
+        """
+        indices = self._frame_indices(indices)
+        first_frames = self._first_frames()
+        for begin in range(0, indices.size, chunk_size):
+            yield self._build_frames(indices[begin : begin + chunk_size], *first_frames)
+
+    def _frame_indices(self, indices):
+        """
+        Normalizes frame indices into an int64 array of nonnegative indices, checking their range.
+        """
+        num_frames = len(self)
+        indices = np.arange(num_frames) if indices is None else np.asarray(indices)
+        indices = np.where(indices < 0, indices + num_frames, indices).astype(np.int64)
+        if indices.size and not (0 <= indices.min() and indices.max() < num_frames):
+            raise IndexError("trace frame index out of range")
+        return indices
+
+    def _first_frames(self):
+        """
+        Returns the frame in which every cell is first pushed and first expanded, or the largest int64 if never.
+        """
+        kinds = np.frombuffer(self._kinds, dtype=np.int8)
+        cells = np.frombuffer(self._cells, dtype=np.int64)
+        event_frames = np.cumsum(kinds == EXPAND)  # Frame in which each event happens
+        never = np.iinfo(np.int64).max
+        pushed = np.full(self.grid.cells.size, never, dtype=np.int64)
+        expanded = np.full(self.grid.cells.size, never, dtype=np.int64)
+        np.minimum.at(pushed, cells[kinds == PUSH], event_frames[kinds == PUSH])
+        np.minimum.at(expanded, cells[kinds == EXPAND], event_frames[kinds == EXPAND])
+        return pushed, expanded
+
+    def _build_frames(self, indices, pushed, expanded):
+        """
+        Builds the frames of normalized indices from the first push and expansion frames of the cells.
+        """
+        num_expansions = len(self._expansions)
+        cells = np.frombuffer(self._cells, dtype=np.int64)
+        states = np.minimum(indices, num_expansions)[:, None]
+        frames = np.where(
+            expanded <= states,
+            np.uint8(EXPLORED),
+            np.where(pushed <= states, np.uint8(FRONTIER), self.grid.cells),
+        ).astype(np.uint8)
+        rows = np.arange(indices.size)
+        current = (indices > 0) & (indices <= num_expansions)
+        expansions = np.frombuffer(self._expansions, dtype=np.int64)
+        frames[rows[current], cells[expansions[indices[current] - 1]]] = CURRENT
+        final = indices > num_expansions
+        if final.any():
+            path = [self.grid.to_cell(state) for state in self.path]
+            frames[np.ix_(rows[final], path)] = PATH
+        for cell in (self.grid.start, self.grid.goal):
+            if cell is not None:
+                frames[:, cell] = self.grid.cells[cell]
+        return frames.reshape(indices.size, -1, self.grid.stride)[:, 1:-1, 1:-1]
+
+    def save(self, file):
+        """
+        Writes the trace to a compact binary .npz file, see `load`.
+
+        Args:
+            file (str or file): The file to write, ".npz" is appended to names without it.
+
+        The file holds the maze, the cells in the order they were explored, the cells in the order they
+        were pushed together with the index in the explored order of the expansion that pushed them
+        (-1 for cells pushed before the first expansion), and the final path. Cells are stored as int32
+        row-major indices of the unpadded maze.
+        """
+        kinds = np.frombuffer(self._kinds, dtype=np.int8)
+        cells = np.frombuffer(self._cells, dtype=np.int64)
+        rows, columns = np.divmod(cells, self.grid.stride)
+        cells = ((rows - 1) * self.shape[1] + columns - 1).astype(np.int32)
+        pushes = kinds == PUSH
+        parents = (np.cumsum(kinds == EXPAND) - 1)[pushes].astype(np.int32)
+        path = np.array(self.path or [], dtype=np.int32).reshape(-1, 2)
+        np.savez_compressed(
+            file,
+            maze=self.grid.codes(),
+            explored=cells[~pushes],
+            pushed=cells[pushes],
+            parents=parents,
+            path=path,
+            has_path=self.path is not None,
+        )
+
+    @classmethod
+    def load(cls, file, keyframe_interval=256):
+        """
+        Reads a trace written by `save`.
+
+        Args:
+            file (str or file): The .npz file to read.
+            keyframe_interval (int, optional): Spacing of cached keyframes. Defaults to 256.
+
+        Returns:
+            SearchTrace: A trace with the same maze, events and path as the saved one.
+        """
+        with np.load(file) as data:
+            trace = cls(data["maze"], keyframe_interval)
+            explored, pushed, parents = (
+                data["explored"],
+                data["pushed"],
+                data["parents"],
+            )
+            # Every expansion is followed by the pushes it made
+            kinds = np.full(explored.size + pushed.size, PUSH, dtype=np.int8)
+            expand_positions = np.arange(explored.size) + np.searchsorted(
+                parents, np.arange(explored.size)
+            )
+            kinds[expand_positions] = EXPAND
+            cells = np.empty(kinds.size, dtype=np.int64)
+            cells[expand_positions] = explored
+            cells[kinds == PUSH] = pushed
+            rows, columns = np.divmod(cells, trace.shape[1])
+            trace.extend(kinds, (rows + 1) * trace.grid.stride + columns + 1)
+            if data["has_path"]:
+                trace.set_path([tuple(state) for state in data["path"].tolist()])
+        return trace
+
+    def _advance_to(self, index):
+        """
+        Brings the cached working frame to the state after `index` expansions.
+        """
+        if self._frame is None or index < self._frame_index:
+            start = max((k for k in self._keyframes if k <= index), default=None)
+            if start is None:
+                self._frame, self._frame_index = self.grid.cells.copy(), 0
+                self._apply(0, self._event_end(0))
+            else:
+                self._frame, self._frame_index = self._keyframes[start].copy(), start
+
+        interval = self.keyframe_interval
+        while self._frame_index < index:
+            # Apply at most one keyframe interval at a time so keyframes can be cached
+            target = min(index, (self._frame_index // interval + 1) * interval)
+            self._apply(self._event_end(self._frame_index), self._event_end(target))
+            self._frame_index = target
+            if target % interval == 0:
+                self._keyframes[target] = self._frame.copy()
+        return self._frame
+
+    def _event_end(self, frame_index):
+        """
+        Returns the index of the first event not included in the given frame.
+        """
+        if frame_index == 0:
+            return self._expansions[0] if self._expansions else len(self._kinds)
+        if frame_index < len(self._expansions):
+            return self._expansions[frame_index]
+        return len(self._kinds)
+
+    def _apply(self, begin, end):
+        """
+        Marks the events in [begin, end) on the working frame.
+        """
+        if begin >= end:
+            return
+        kinds = np.frombuffer(self._kinds, dtype=np.int8)[begin:end]
+        cells = np.frombuffer(self._cells, dtype=np.int64)[begin:end]
+        frontier = cells[kinds == PUSH]
+        self._frame[frontier[self._frame[frontier] != EXPLORED]] = FRONTIER
+        self._frame[cells[kinds == EXPAND]] = EXPLORED
+
+    def _restore_endpoints(self, frame):
+        """
+        Keeps the start and goal visible on a materialized frame.
+        """
+        for cell in (self.grid.start, self.grid.goal):
+            if cell is not None:
+                frame[cell] = self.grid.cells[cell]
+
+
+def collect_search(events, grid=None):
+    """
+    Runs a search generator to completion and returns its result.
+
+    Parameters:
+    - events (iterator): The events of a search generator, such as `iter_bfs_search(grid)`.
+    - grid (MazeGrid, optional): The grid being searched. If given, the events are recorded in a SearchTrace, otherwise no trace is kept.
+
+    Returns:
+    - path (list): The path found by the search as a list of (x, y) states, or None.
+    - num_explored (int): The number of nodes explored during the search.
+    - steps (SearchTrace): The trace of the search, or None if no grid is given.
+
+    The generator is left suspended after its last event rather than closed, so a caller can keep
+    iterating it, e.g. to let a search finish work that comes after finding the goal.
+    """
+    steps = None if grid is None else SearchTrace(grid)
+    for kind, payload in events:
+        if kind == PUSH or kind == EXPAND:  # The most frequent kinds first
+            if steps is not None:
+                if kind == PUSH:
+                    steps.push(payload)
+                else:
+                    steps.expand(payload)
+        elif kind == BATCH:
+            if steps is not None:
+                steps.extend(*payload)
+        elif kind == FOUND:
+            path, num_explored = payload
+            if steps is not None:
+                steps.set_path(path)
+            return path, num_explored, steps
+        elif kind == EXHAUSTED:
+            return None, payload, steps
+    raise RuntimeError("search events ended without FOUND or EXHAUSTED")
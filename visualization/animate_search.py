@@ -1,28 +1,69 @@
+import itertools
+import os
+import shutil
+import subprocess
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
-from matplotlib.animation import FFMpegWriter
 
-plt.rcParams["animation.ffmpeg_path"] = "/opt/homebrew/bin/ffmpeg"
+# RGB colors of the cell markings 0-7 (".", "X", "S", "G", "E", "P", "C", "F"), from the Dark2 colormap
+PALETTE = np.array(
+    [
+        [27, 158, 119],
+        [217, 95, 2],
+        [117, 112, 179],
+        [231, 41, 138],
+        [102, 166, 30],
+        [230, 171, 2],
+        [166, 118, 29],
+        [102, 102, 102],
+    ],
+    dtype=np.uint8,
+)
+
+# Mapping from custom markings to numeric values
+MARKING_TO_NUMERIC = {
+    ".": 0,  # Open path
+    "X": 1,  # Obstacle
+    "S": 2,  # Start
+    "G": 3,  # Goal
+    "E": 4,  # Explored
+    "P": 5,  # Path
+    "C": 6,  # Current
+    "F": 7,  # Frontier
+}
+
+# Approximate size of the longest side of rendered videos and images, in pixels
+FRAME_PIXELS = 500
+
+# Number of frames converted and written at a time when saving, which bounds their memory
+FRAME_CHUNK = 256
 
 
 def animate_search_process(
-    steps, algorithm, save_animation=True, filename="search_animation.mp4"
+    steps,
+    algorithm,
+    save_animation=True,
+    filename="search_animation.mp4",
+    max_frames=None,
+    display=None,
+    fps=5,
 ):
     """
     Animate the search process on a grid.
 
     Parameters:
-    - steps (list): A list of grid states representing each step of the search process.
+    - steps (list or SearchTrace): A sequence of grid states representing each step of the search process. A SearchTrace only materializes the frames that are drawn.
     - save_animation (bool, optional): Whether to save the animation as a video file. Default is True.
-    - filename (str, optional): The name of the video file to save. Default is "search_animation.mp4".
+    - filename (str, optional): The name of the file to save, see `save_frames` for the supported formats. Default is "search_animation.mp4".
+    - max_frames (int, optional): If given, only this many evenly spaced keyframes are drawn, always including the first and last step. Default is None (draw every step).
+    - display (bool, optional): Whether to display the animation with matplotlib. Default is None (display it only if it is not saved).
+    - fps (int, optional): The number of frames per second. Default is 5.
 
     Returns:
     None
 
-    The 'animate_search_process' function takes a list of grid states and animates the search process on a grid. Each grid state is represented by a 2D array where each element corresponds to a cell in the grid. The function maps custom markings to numeric values and visualizes the grid using matplotlib. The animation shows the progression of the search process, highlighting the explored cells and the final path.
+    The 'animate_search_process' function takes a list of grid states and animates the search process on a grid. Each grid state is represented by a 2D array where each element corresponds to a cell in the grid. All the drawn steps are converted to numeric values in one pass with 'search_frames', and each marking is always drawn with the same color of the fixed 'PALETTE'. The animation shows the progression of the search process, highlighting the explored cells and the final path.
 
-    If save_animation is True, the animation is saved as a video file with the specified filename using the FFMpegWriter. If save_animation is False, the animation is displayed using matplotlib.
+    If save_animation is True, the frames are written to the file with 'save_frames', without going through matplotlib. When the animation is only saved, the frames are converted and written a chunk at a time with 'iter_search_frames', so memory does not grow with the number of steps. If display is True, the animation is displayed with matplotlib, updating a single image rather than redrawing the axes at every step, which needs every frame at once. Saving and displaying then share the same converted frames.
 
     Example usage:
     Define the grid states
@@ -57,34 +98,197 @@ def animate_search_process(
 
     animate_search_process(steps, save_animation=True, filename="search_animation.mp4")
     """
-    # Define a mapping from custom markings to numeric values
-    marking_to_numeric = {
-        ".": 0,  # Open path
-        "X": 1,  # Obstacle
-        "S": 2,  # Start
-        "G": 3,  # Goal
-        "E": 4,  # Explored
-        "P": 5,  # Path
-    }
+    if not (display or (display is None and not save_animation)):
+        if save_animation:
+            save_frames(iter_search_frames(steps, max_frames), filename, fps=fps)
+        return
+
+    indices, frames = search_frames(steps, max_frames)
+    if save_animation:
+        save_frames(frames, filename, fps=fps)
+    _show_frames(indices, frames, algorithm, fps)
+
+
+def search_frames(steps, max_frames=None):
+    """
+    Converts the steps of a search to numeric cell markings in one pass.
+
+    Parameters:
+    - steps (list or SearchTrace): A sequence of grid states representing each step of the search process.
+    - max_frames (int, optional): If given, only this many evenly spaced steps are converted, always including the first and last step. Default is None (every step).
+
+    Returns:
+    - indices (list): The indices of the converted steps.
+    - frames (np.array): A 3D uint8 array of shape (len(indices), rows, columns) with the numeric marking of every cell of every converted step.
+    """
+    indices = _frame_indices(len(steps), max_frames)
+    if hasattr(steps, "frames"):
+        return indices, steps.frames(indices)
+    return indices, _convert_steps(steps, indices)
+
+
+def iter_search_frames(steps, max_frames=None, chunk_size=FRAME_CHUNK):
+    """
+    Converts the steps of a search to numeric cell markings a chunk of steps at a time.
+
+    Parameters:
+    - steps (list or SearchTrace): A sequence of grid states representing each step of the search process.
+    - max_frames (int, optional): If given, only this many evenly spaced steps are converted, always including the first and last step. Default is None (every step).
+    - chunk_size (int, optional): The number of steps converted at a time. Default is 'FRAME_CHUNK'.
+
+    Yields:
+    - frames (np.array): A 3D uint8 array of shape (chunk, rows, columns) for each chunk of converted steps, in order. Concatenated, the chunks equal the frames of 'search_frames'.
+    """
+    indices = _frame_indices(len(steps), max_frames)
+    if hasattr(steps, "iter_frames"):
+        yield from steps.iter_frames(indices, chunk_size)
+        return
+    for begin in range(0, len(indices), chunk_size):
+        yield _convert_steps(steps, indices[begin : begin + chunk_size])
+
+
+def _frame_indices(num_steps, max_frames):
+    """
+    Returns the indices of the steps to convert, evenly spaced if there are more than max_frames steps.
+    """
+    indices = list(range(num_steps))
+    if max_frames is not None and len(indices) > max_frames:
+        indices = sorted(
+            set(np.linspace(0, len(indices) - 1, max_frames).astype(int).tolist())
+        )
+    return indices
+
+
+def _convert_steps(steps, indices):
+    """
+    Converts grid states of symbols to numeric cell markings.
+    """
+    symbols = np.array([steps[index] for index in indices], dtype=object)
+    frames = np.zeros(symbols.shape, dtype=np.uint8)  # Unknown markings are open
+    for marking, value in MARKING_TO_NUMERIC.items():
+        frames[symbols == marking] = value
+    return frames
+
+
+def save_frames(frames, filename, fps=5, cell_pixels=None):
+    """
+    Writes numeric frames to a video, a GIF or a sequence of PNG images.
+
+    Parameters:
+    - frames (np.array or iterable): A 3D uint8 array of numeric cell markings, as returned by 'search_frames', or an iterable of such arrays, as yielded by 'iter_search_frames', which are written one at a time.
+    - filename (str): The file to write. Names ending in ".gif" are written as an animated GIF, and names ending in ".png" as one image per frame, numbered after the stem (e.g. "run_00000.png"). Any other name is encoded by ffmpeg, which picks the format from the extension.
+    - fps (int, optional): The number of frames per second. Default is 5.
+    - cell_pixels (int, optional): The side of a cell in pixels. Default is None (about 'FRAME_PIXELS' pixels for the longest side of the maze).
+
+    Returns:
+    None
+
+    Videos are encoded by streaming raw RGB frames with one pixel per cell to an ffmpeg subprocess, see 'find_ffmpeg', which enlarges them. GIF and PNG files are written with Pillow, which keeps the frames as palette images. PNG images are written as their chunk arrives, while an animated GIF needs all its images at once.
+    """
+    chunks = iter([frames] if isinstance(frames, np.ndarray) else frames)
+    first = next(chunks)
+    chunks = itertools.chain([first], chunks)
+    rows, columns = first.shape[1:]
+    if cell_pixels is None:
+        cell_pixels = max(1, FRAME_PIXELS // max(rows, columns))
+    height, width = rows * cell_pixels, columns * cell_pixels
+    extension = os.path.splitext(filename)[1].lower()
+
+    if extension in (".gif", ".png"):
+        from PIL import Image
+
+        stem = filename[: -len(extension)]
+        images = []
+        frames = itertools.chain.from_iterable(chunks)
+        for index, frame in enumerate(frames):
+            image = Image.fromarray(frame).resize((width, height), Image.NEAREST)
+            image.putpalette(PALETTE.tobytes())  # Turns the image into a palette image
+            if extension == ".png":
+                image.save(f"{stem}_{index:05d}.png")
+            else:
+                images.append(image)
+        if extension == ".gif":
+            images[0].save(
+                filename,
+                save_all=True,
+                append_images=images[1:],
+                duration=round(1000 / fps),
+            )
+        return
+
+    command = [
+        find_ffmpeg(),
+        "-y",
+        "-loglevel",
+        "error",
+        "-f",
+        "rawvideo",
+        "-pix_fmt",
+        "rgb24",
+        "-s",
+        f"{columns}x{rows}",
+        "-r",
+        str(fps),
+        "-i",
+        "-",
+        "-vf",
+        # Enlarge the cells, then pad to the even dimensions most encoders need
+        f"scale={width}:{height}:flags=neighbor,pad=ceil(iw/2)*2:ceil(ih/2)*2",
+        "-pix_fmt",
+        "yuv420p",
+        filename,
+    ]
+    with subprocess.Popen(command, stdin=subprocess.PIPE) as process:
+        for chunk in chunks:
+            for begin in range(0, len(chunk), FRAME_CHUNK):  # Bounds the RGB frames
+                process.stdin.write(
+                    PALETTE[chunk[begin : begin + FRAME_CHUNK]].tobytes()
+                )
+        process.stdin.close()
+        if process.wait():
+            raise subprocess.CalledProcessError(process.returncode, command)
+
+
+def _show_frames(indices, frames, algorithm, fps):
+    """
+    Displays numeric frames with matplotlib, updating a single image artist.
+    """
+    import matplotlib.pyplot as plt
+    from matplotlib.animation import FuncAnimation
+    from matplotlib.colors import ListedColormap
 
     fig, ax = plt.subplots(figsize=(5, 5))
+    image = ax.imshow(
+        frames[0],
+        cmap=ListedColormap(PALETTE / 255),
+        vmin=0,
+        vmax=len(PALETTE) - 1,
+        interpolation="nearest",
+    )
+    title = ax.set_title("")
+    ax.set_xticks([])
+    ax.set_yticks([])
 
     def update(frame):
-        def marking_to_numeric_value(key):
-            return marking_to_numeric.get(key, 0)
+        image.set_data(frames[frame])
+        title.set_text(f"Algo:{algorithm}Step: {indices[frame] + 1}")
+        return image, title
 
-        numeric_state = np.vectorize(marking_to_numeric_value)(steps[frame])
-        ax.clear()
-        ax.imshow(numeric_state, cmap=plt.cm.Dark2, interpolation="nearest")
-        ax.set_title(f"Algo:{algorithm}Step: {frame + 1}")
-        ax.set_xticks([])
-        ax.set_yticks([])
+    anim = FuncAnimation(
+        fig, update, frames=len(frames), interval=1000 / fps, repeat=False
+    )
+    plt.show()
+    plt.close(fig)
 
-    anim = FuncAnimation(fig, update, frames=len(steps), interval=200, repeat=False)
 
-    if save_animation:
-        writer = FFMpegWriter(fps=5)
-        anim.save(filename, writer=writer)
-    else:
-        plt.show()
-    plt.close(fig)
+def find_ffmpeg():
+    """
+    Finds the ffmpeg executable used to save animations.
+
+    Parameters:
+    None
+
+    Returns:
+    - str: The path given by the FFMPEG_PATH environment variable if it is set, otherwise the ffmpeg found on the PATH, otherwise "ffmpeg".
+    """
+    return os.environ.get("FFMPEG_PATH") or shutil.which("ffmpeg") or "ffmpeg"
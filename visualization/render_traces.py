@@ -0,0 +1,107 @@
+"""
+Renders search trace files into videos, in parallel over a pool of worker processes.
+
+Searches run by `run_search_algorithms` with a `trace_folder` write one trace file per run and
+algorithm (see `SearchTrace.save`). This command turns them into videos afterwards, so that the
+benchmark loop never waits on rendering and videos can be re-rendered without rerunning any search.
+
+Example usage:
+python -m visualization.render_traces search_traces/*.npz
+python -m visualization.render_traces search_traces --output-folder search_gifs --extension .gif
+"""
+
+import argparse
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.search_trace import SearchTrace
+from visualization.animate_search import iter_search_frames, save_frames
+
+OUTPUT_FOLDER = "search_videos"
+
+
+def render_trace_files(
+    paths,
+    output_folder=OUTPUT_FOLDER,
+    extension=".mp4",
+    max_frames=None,
+    fps=5,
+    workers=None,
+):
+    """
+    Renders trace files into videos, one per trace file.
+
+    Parameters:
+    - paths (list): The trace files to render, or folders whose .npz files are all rendered.
+    - output_folder (str, optional): The folder to write the videos to, created if needed. Default is "search_videos".
+    - extension (str, optional): The extension of the videos, which selects their format, see `save_frames`. Default is ".mp4".
+    - max_frames (int, optional): If given, only this many evenly spaced steps of each search are rendered. Default is None (every step).
+    - fps (int, optional): The number of frames per second. Default is 5.
+    - workers (int, optional): The number of worker processes. With 1 everything runs in the current process. Default is None (one worker per CPU).
+
+    Returns:
+    - list: The paths of the rendered videos, in the order of the trace files. Each video is named after its trace file.
+    """
+    traces = []
+    for path in paths:
+        if os.path.isdir(path):
+            traces.extend(sorted(glob.glob(os.path.join(path, "*.npz"))))
+        else:
+            traces.append(path)
+
+    os.makedirs(output_folder, exist_ok=True)
+    jobs = [
+        (
+            trace,
+            os.path.join(
+                output_folder, os.path.splitext(os.path.basename(trace))[0] + extension
+            ),
+            max_frames,
+            fps,
+        )
+        for trace in traces
+    ]
+    if workers == 1:
+        return [_render_job(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_render_job, jobs))
+
+
+def _render_job(job):
+    """
+    Renders one trace file into one video and returns the path of the video.
+    """
+    trace_path, filename, max_frames, fps = job
+    save_frames(
+        iter_search_frames(SearchTrace.load(trace_path), max_frames), filename, fps=fps
+    )
+    return filename
+
+
+def main():
+    """
+    Renders the trace files given on the command line.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("paths", nargs="+", help="trace files or folders of them")
+    parser.add_argument("--output-folder", default=OUTPUT_FOLDER)
+    parser.add_argument("--extension", default=".mp4")
+    parser.add_argument("--max-frames", type=int, default=None)
+    parser.add_argument("--fps", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    filenames = render_trace_files(
+        args.paths,
+        args.output_folder,
+        args.extension,
+        args.max_frames,
+        args.fps,
+        args.workers,
+    )
+    print(f"Rendered {len(filenames)} videos to {args.output_folder}")
+
+
+if __name__ == "__main__":
+    main()